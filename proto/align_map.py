@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+轨迹对齐视图的几何数据
+GPX 加载时把轨迹点做一次等距圆柱投影 (x = 经度差 * cos(中纬度), y = 纬度差，单位为度)，
+之后的缩放/平移只是线性变换；右键定位使用均匀网格空间索引查找最近点。
+绘制时按缩放选择 Douglas-Peucker 简化层级，并只输出与视口相交的折线段；
+超长轨迹可改为栅格化瓦片 (TrackTileRenderer)，平移时只移动已缓存的瓦片。
+"""
+
+import bisect
+import math
+import queue
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import cv2
+    HAS_CV2 = True
+except ImportError:
+    HAS_CV2 = False
+
+TILE_SIZE = 256
+TILE_MODE_MIN_POINTS = 20000  # 轨迹点数超过该值时对齐视图使用栅格瓦片
+
+
+class GridIndex:
+    """均匀网格空间索引
+
+    点按所在网格编号排序 (CSR 布局)，cell_start[c]:cell_start[c+1] 为第 c 格内的点在 order 中的范围。
+    一个矩形网格块每行对应 order 中的一段连续区间，查询只需按行切片。
+    """
+
+    def __init__(self, xs, ys, points_per_cell=4):
+        self.xs = np.asarray(xs, dtype=np.float64)
+        self.ys = np.asarray(ys, dtype=np.float64)
+        n = len(self.xs)
+        self.x0 = float(self.xs.min()) if n else 0.0
+        self.y0 = float(self.ys.min()) if n else 0.0
+        w = float(self.xs.max()) - self.x0 if n else 0.0
+        h = float(self.ys.max()) - self.y0 if n else 0.0
+
+        # 网格数约为 n / points_per_cell；细长轨迹按长边限制格数，保证总格数为 O(n)
+        n_cells = max(1, n // points_per_cell)
+        self.cell = max(math.sqrt(w * h / n_cells), max(w, h) / n_cells, 1e-12)
+        self.nx = int(w / self.cell) + 1
+        self.ny = int(h / self.cell) + 1
+
+        gx = np.minimum(((self.xs - self.x0) / self.cell).astype(np.int64), self.nx - 1)
+        gy = np.minimum(((self.ys - self.y0) / self.cell).astype(np.int64), self.ny - 1)
+        cell_id = gy * self.nx + gx
+        self.order = np.argsort(cell_id, kind='stable')
+        self.cell_start = np.searchsorted(cell_id[self.order], np.arange(self.nx * self.ny + 1))
+
+    def _block(self, gx0, gx1, gy0, gy1):
+        """返回网格块 [gx0, gx1] x [gy0, gy1] 内的点下标 (超出网格的部分忽略)"""
+        gx0, gx1 = max(gx0, 0), min(gx1, self.nx - 1)
+        gy0, gy1 = max(gy0, 0), min(gy1, self.ny - 1)
+        if gx0 > gx1 or gy0 > gy1:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(gy0, gy1 + 1) * self.nx
+        starts = self.cell_start[rows + gx0]
+        ends = self.cell_start[rows + gx1 + 1]
+        return np.concatenate([self.order[s:e] for s, e in zip(starts, ends)])
+
+    def nearest(self, x, y, tol=0.0, times=None, prefer_time=None):
+        """查找离 (x, y) 最近的点下标
+
+        tol > 0 且给出 times/prefer_time 时，距离不超过 最近距离 + tol 的点按连续下标分为若干段
+        (轨迹自交处的不同经过)，每段取最近点，再选时间最接近 prefer_time 的一段。
+        """
+        if len(self.xs) == 0:
+            return -1
+        gx = int(math.floor((x - self.x0) / self.cell))
+        gy = int(math.floor((y - self.y0) / self.cell))
+        # 点击位于中心格内，半径 r 格的块覆盖了距离 r*cell 以内的所有点
+        r = 1
+        while True:
+            idx = self._block(gx - r, gx + r, gy - r, gy + r)
+            covers_all = (gx - r <= 0 and gy - r <= 0 and
+                          gx + r >= self.nx - 1 and gy + r >= self.ny - 1)
+            if idx.size:
+                d2 = (self.xs[idx] - x) ** 2 + (self.ys[idx] - y) ** 2
+                best = math.sqrt(float(d2.min()))
+                if best + tol <= r * self.cell or covers_all:
+                    break
+            elif covers_all:
+                return -1
+            r *= 2
+
+        if tol <= 0 or times is None or prefer_time is None:
+            return int(idx[np.argmin(d2)])
+
+        mask = d2 <= (best + tol) ** 2
+        cand = idx[mask]
+        cand_d2 = d2[mask]
+        sort = np.argsort(cand)
+        cand, cand_d2 = cand[sort], cand_d2[sort]
+        # 连续下标为同一次经过
+        breaks = np.flatnonzero(np.diff(cand) > 1) + 1
+        best_idx = -1
+        best_dt = float('inf')
+        for run, run_d2 in zip(np.split(cand, breaks), np.split(cand_d2, breaks)):
+            i = int(run[np.argmin(run_d2)])
+            dt = abs(float(times[i]) - prefer_time)
+            if dt < best_dt:
+                best_dt = dt
+                best_idx = i
+        return best_idx
+
+
+def dp_significance(xs, ys, eps_min):
+    """Douglas-Peucker 显著度：每个点在容差小于该值时会被保留
+
+    一次迭代式 DP 得到所有层级：层级容差为 eps 时保留 significance >= eps 的点。
+    子区间的显著度不超过父区间 (保证层级单调嵌套)；偏差小于 eps_min 的区间不再细分。
+    """
+    n = len(xs)
+    sig = np.zeros(n)
+    if n == 0:
+        return sig
+    sig[0] = sig[-1] = np.inf
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        a, b, parent = stack.pop()
+        if b - a < 2:
+            continue
+        px = xs[a + 1:b] - xs[a]
+        py = ys[a + 1:b] - ys[a]
+        dx = xs[b] - xs[a]
+        dy = ys[b] - ys[a]
+        length = math.hypot(dx, dy)
+        if length > 0:
+            d = np.abs(dx * py - dy * px) / length
+        else:
+            d = np.hypot(px, py)
+        k = int(np.argmax(d))
+        dmax = float(d[k])
+        if dmax < eps_min:
+            continue
+        m = a + 1 + k
+        s = min(dmax, parent)
+        sig[m] = s
+        stack.append((a, m, s))
+        stack.append((m, b, s))
+    return sig
+
+
+class AlignTrack:
+    """投影后的轨迹点 (GPX 加载时构建一次)"""
+
+    def __init__(self, lats, lons, times):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.times = np.asarray(times, dtype=np.float64)
+
+        self.min_lat, max_lat = float(self.lats.min()), float(self.lats.max())
+        self.min_lon, max_lon = float(self.lons.min()), float(self.lons.max())
+        if max_lat != self.min_lat:
+            self.lon_corr = math.cos(math.radians((self.min_lat + max_lat) / 2))
+        else:
+            self.lon_corr = 1.0
+        self.lat_range = max(1e-9, max_lat - self.min_lat)
+        self.lon_range = max(1e-9, (max_lon - self.min_lon) * self.lon_corr)
+
+        self.xs = (self.lons - self.min_lon) * self.lon_corr
+        self.ys = self.lats - self.min_lat
+        self.index = GridIndex(self.xs, self.ys)
+        self._build_lod()
+
+    def _build_lod(self, min_points=256):
+        """构建简化层级：容差从 eps_min 起逐级翻倍，直到剩余点数不超过 min_points
+
+        eps_min 取轨迹范围的 1e-5 (约为最大缩放下半个像素)，更小的容差直接使用全部点。
+        """
+        n = len(self.xs)
+        self.lod_eps_min = max(self.lon_range, self.lat_range) * 1e-5
+        sig = dp_significance(self.xs, self.ys, self.lod_eps_min)
+        self.lod_eps = []
+        self.lod_levels = []
+        eps = self.lod_eps_min
+        while True:
+            idx = np.flatnonzero(sig >= eps)
+            self.lod_eps.append(eps)
+            self.lod_levels.append(idx)
+            if len(idx) <= min_points or len(idx) <= 2:
+                break
+            eps *= 2.0
+        self.lod_full = np.arange(n)
+
+    def level_indices(self, eps):
+        """容差 eps (投影单位) 下应绘制的点下标"""
+        if eps < self.lod_eps_min:
+            return self.lod_full
+        k = bisect.bisect_right(self.lod_eps, eps) - 1
+        return self.lod_levels[k]
+
+    def polylines(self, view, tol_px=0.5, margin=20):
+        """当前视图下需要绘制的折线 (每条为扁平的屏幕坐标列表)
+
+        按 tol_px 像素容差选择层级；只保留与视口 (外扩 margin) 相交的线段，连续的可见线段合并为一条折线。
+        """
+        if view['scale'] <= 0:
+            return []
+        idx = self.level_indices(tol_px / view['scale'])
+        if len(idx) < 2:
+            return []
+        sx, sy = self.to_screen(view, self.xs[idx], self.ys[idx])
+        x0 = np.minimum(sx[:-1], sx[1:])
+        x1 = np.maximum(sx[:-1], sx[1:])
+        y0 = np.minimum(sy[:-1], sy[1:])
+        y1 = np.maximum(sy[:-1], sy[1:])
+        visible = np.flatnonzero((x1 >= -margin) & (x0 <= view['w'] + margin) &
+                                 (y1 >= -margin) & (y0 <= view['h'] + margin))
+        if not visible.size:
+            return []
+        lines = []
+        breaks = np.flatnonzero(np.diff(visible) > 1) + 1
+        for run in np.split(visible, breaks):
+            a, b = int(run[0]), int(run[-1]) + 2
+            lines.append(np.column_stack((sx[a:b], sy[a:b])).ravel().tolist())
+        return lines
+
+    def __len__(self):
+        return len(self.xs)
+
+    def view(self, w, h, zoom=1.0, off_x=0.0, off_y=0.0, padding=20):
+        """计算画布变换参数：屏幕 x = x * scale + tx，屏幕 y = -y * scale + ty"""
+        base_scale = min((w - 2 * padding) / self.lon_range, (h - 2 * padding) / self.lat_range)
+        scale = base_scale * zoom
+        return {
+            'base_scale': base_scale, 'zoom': zoom, 'scale': scale,
+            'off_x': off_x, 'off_y': off_y, 'w': w, 'h': h,
+            'tx': w / 2 - self.lon_range / 2 * scale + off_x,
+            'ty': h / 2 + self.lat_range / 2 * scale + off_y,
+        }
+
+    def project(self, lat, lon):
+        """经纬度 -> 投影坐标"""
+        return (lon - self.min_lon) * self.lon_corr, lat - self.min_lat
+
+    @staticmethod
+    def to_screen(view, x, y):
+        """投影坐标 -> 屏幕坐标 (标量或数组)"""
+        return x * view['scale'] + view['tx'], view['ty'] - y * view['scale']
+
+    @staticmethod
+    def from_screen(view, sx, sy):
+        """屏幕坐标 -> 投影坐标"""
+        return (sx - view['tx']) / view['scale'], (view['ty'] - sy) / view['scale']
+
+    def time_at_screen(self, view, sx, sy, prefer_time=None, tol_px=8.0):
+        """屏幕位置对应的最近轨迹点时间；轨迹自交时在 tol_px 像素内选时间最接近 prefer_time 的一次经过"""
+        if view['scale'] <= 0:
+            return None
+        x, y = self.from_screen(view, sx, sy)
+        i = self.index.nearest(x, y, tol=tol_px / view['scale'], times=self.times, prefer_time=prefer_time)
+        if i < 0:
+            return None
+        return float(self.times[i])
+
+
+class TrackTileRenderer:
+    """把轨迹栅格化为 TILE_SIZE 像素的瓦片
+
+    连续的缩放比例吸附到离散层级 (相邻层级相差 √2 倍)，瓦片以 (层级, tx, ty) 为键，
+    tx/ty 为该层级世界像素坐标 (x * scale, -y * scale) 下的瓦片编号，与平移无关：
+    平移和层级内的缩放都复用同一组瓦片，显示时按当前比例缩放。
+    瓦片为 RGB numpy 图像，LRU 淘汰；只在后台线程渲染，渲染完成后调用 on_ready 通知重绘。
+    """
+
+    def __init__(self, track, max_tiles=256, color=(0, 255, 0), background=(30, 30, 30), thickness=2,
+                 on_ready=None):
+        self.track = track
+        self.max_tiles = max_tiles
+        self.color = color
+        self.background = background
+        self.thickness = thickness
+        self.on_ready = on_ready
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._thread = None
+
+    @staticmethod
+    def zoom_level(scale):
+        """缩放比例 -> 最近的离散层级"""
+        return int(round(2 * math.log2(scale)))
+
+    @staticmethod
+    def level_scale(level):
+        """离散层级 -> 渲染瓦片时使用的缩放比例"""
+        return 2.0 ** (level / 2)
+
+    @classmethod
+    def visible_tiles(cls, view, level, margin=0):
+        """视图内 (外扩 margin 个瓦片) 的瓦片编号及其屏幕矩形：[(i, j, x0, y0, x1, y1)]
+
+        层级瓦片在屏幕上按 view['scale'] / level_scale(level) 缩放，矩形边界取整到像素，相邻瓦片无缝。
+        """
+        step = TILE_SIZE * view['scale'] / cls.level_scale(level)
+        tx, ty = view['tx'], view['ty']
+        i0 = int(math.floor(-tx / step)) - margin
+        i1 = int(math.floor((view['w'] - tx) / step)) + margin
+        j0 = int(math.floor(-ty / step)) - margin
+        j1 = int(math.floor((view['h'] - ty) / step)) + margin
+        return [(i, j, round(i * step + tx), round(j * step + ty), round((i + 1) * step + tx), round((j + 1) * step + ty))
+                for j in range(j0, j1 + 1) for i in range(i0, i1 + 1)]
+
+    def _render(self, level, i, j):
+        """渲染单个瓦片 (cv2 绘制时释放 GIL，在后台线程调用)"""
+        scale = self.level_scale(level)
+        img = np.empty((TILE_SIZE, TILE_SIZE, 3), dtype=np.uint8)
+        img[:] = self.background
+        track = self.track
+        idx = track.level_indices(0.5 / scale)
+        if len(idx) < 2:
+            return img
+        px = track.xs[idx] * scale - i * TILE_SIZE
+        py = -track.ys[idx] * scale - j * TILE_SIZE
+        pad = self.thickness + 1
+        x0 = np.minimum(px[:-1], px[1:])
+        x1 = np.maximum(px[:-1], px[1:])
+        y0 = np.minimum(py[:-1], py[1:])
+        y1 = np.maximum(py[:-1], py[1:])
+        visible = np.flatnonzero((x1 >= -pad) & (x0 <= TILE_SIZE + pad) &
+                                 (y1 >= -pad) & (y0 <= TILE_SIZE + pad))
+        if not visible.size:
+            return img
+        # 亚像素定点坐标 (shift=4)
+        pts = np.column_stack((np.round(px * 16), np.round(py * 16))).astype(np.int32)
+        breaks = np.flatnonzero(np.diff(visible) > 1) + 1
+        runs = [pts[int(run[0]):int(run[-1]) + 2] for run in np.split(visible, breaks)]
+        cv2.polylines(img, runs, False, self.color, self.thickness, cv2.LINE_AA, shift=4)
+        return img
+
+    def _store(self, key, img):
+        with self._lock:
+            self._tiles[key] = img
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+    def cached(self, level, i, j):
+        """已缓存的瓦片，未命中返回 None (不渲染)"""
+        key = (level, i, j)
+        with self._lock:
+            img = self._tiles.get(key)
+            if img is not None:
+                self._tiles.move_to_end(key)
+            return img
+
+    def fallback(self, level, i, j, max_levels=2):
+        """瓦片未渲染时，用相邻层级 (最多相差 max_levels 级) 的已缓存瓦片拼接缩放出近似图像；都没有时返回 None"""
+        with self._lock:
+            levels = {key[0] for key in self._tiles}
+        for m in sorted(levels, key=lambda m: (abs(m - level), m)):
+            if m == level or abs(m - level) > max_levels:
+                continue
+            # 瓦片 (i, j) 在层级 m 世界像素中的范围
+            r = self.level_scale(m) / self.level_scale(level)
+            x0, y0 = i * TILE_SIZE * r, j * TILE_SIZE * r
+            x1, y1 = x0 + TILE_SIZE * r, y0 + TILE_SIZE * r
+            i0, i1 = int(math.floor(x0 / TILE_SIZE)), int(math.ceil(x1 / TILE_SIZE))
+            j0, j1 = int(math.floor(y0 / TILE_SIZE)), int(math.ceil(y1 / TILE_SIZE))
+            with self._lock:
+                parts = [[self._tiles.get((m, ti, tj)) for ti in range(i0, i1)] for tj in range(j0, j1)]
+            if any(part is None for row in parts for part in row):
+                continue
+            mosaic = np.vstack([np.hstack(row) for row in parts])
+            crop = mosaic[int(round(y0 - j0 * TILE_SIZE)):int(round(y1 - j0 * TILE_SIZE)),
+                          int(round(x0 - i0 * TILE_SIZE)):int(round(x1 - i0 * TILE_SIZE))]
+            return cv2.resize(crop, (TILE_SIZE, TILE_SIZE), interpolation=cv2.INTER_LINEAR)
+        return None
+
+    def prefetch(self, level, tiles, urgent=None):
+        """后台渲染瓦片 (只处理最新一次请求)；前 urgent 个 (可见瓦片) 完成后及全部完成后各通知一次 on_ready"""
+        self._requests.put((level, [tile[:2] for tile in tiles], len(tiles) if urgent is None else urgent))
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._prefetch_worker, daemon=True)
+            self._thread.start()
+
+    def _prefetch_worker(self):
+        while True:
+            try:
+                level, tiles, urgent = self._requests.get(timeout=5.0)
+            except queue.Empty:
+                return
+            while True:
+                try:
+                    level, tiles, urgent = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+            rendered = 0
+            for n, (i, j) in enumerate(tiles):
+                if not self._requests.empty():
+                    break
+                if n == urgent and rendered and self.on_ready is not None:
+                    self.on_ready()
+                    rendered = 0
+                with self._lock:
+                    cached = (level, i, j) in self._tiles
+                if not cached:
+                    self._store((level, i, j), self._render(level, i, j))
+                    rendered += 1
+            if rendered and self.on_ready is not None:
+                self.on_ready()
@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""
+进程内音频播放引擎
+通过 ffmpeg 管道一次性解码音轨到内存映射的 PCM 缓存，再由回调式输出流播放，
+支持采样级精确的跳转、变速与音量调节。
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import hashlib
+import platform
+import time
+
+import numpy as np
+
+try:
+    from .thumbnail_cache import find_ffmpeg
+except ImportError:
+    from thumbnail_cache import find_ffmpeg
+
+# 可选依赖：sounddevice (PortAudio) 提供真实的声卡输出
+try:
+    import sounddevice as sd
+    HAS_SOUNDDEVICE = True
+except Exception:  # ImportError 或 PortAudio 缺失时的 OSError
+    sd = None
+    HAS_SOUNDDEVICE = False
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BLOCK_SIZE = 1024
+BYTES_PER_SAMPLE = 2  # s16le
+# PCM 缓存目录的容量上限 (约 3 小时立体声 44.1kHz)，超出时按最近使用时间淘汰旧文件
+PCM_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def has_output_device():
+    """是否有可用的真实音频输出后端"""
+    return HAS_SOUNDDEVICE
+
+
+def _default_cache_dir():
+    return os.path.join(tempfile.gettempdir(), 'gpxVideoEditor', 'audio')
+
+
+def prune_pcm_cache(cache_dir, max_bytes, keep=None):
+    """按修改时间 (复用时会刷新) 从旧到新删除 .pcm 缓存文件，直到总大小不超过 max_bytes；keep 不删除"""
+    try:
+        names = [n for n in os.listdir(cache_dir) if n.endswith('.pcm')]
+    except OSError:
+        return
+    entries = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            # Windows 下仍被映射的文件无法删除，留到下次
+            pass
+
+
+class PcmCache:
+    """解码后的 PCM 缓存 (int16 交错)
+
+    解码在后台线程中进行，解码过程中可以读取已解码的部分；
+    解码完成后文件以 np.memmap 方式映射，之后的读取不再产生系统调用。
+    缓存文件以 (路径, 大小, 修改时间, 采样率, 声道) 为键，重复打开同一文件时直接复用；
+    缓存目录总大小超过 max_cache_bytes 时淘汰最久未使用的文件。
+    """
+
+    def __init__(self, src, sample_rate=SAMPLE_RATE, channels=CHANNELS, cache_dir=None,
+                 max_cache_bytes=PCM_CACHE_MAX_BYTES):
+        self.src = src
+        self.max_cache_bytes = max_cache_bytes
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.cache_dir = cache_dir or _default_cache_dir()
+        self.frame_bytes = channels * BYTES_PER_SAMPLE
+
+        st = os.stat(src)
+        key_src = f"{os.path.abspath(src)}|{st.st_size}|{st.st_mtime_ns}|{sample_rate}|{channels}"
+        key = hashlib.sha1(key_src.encode('utf-8')).hexdigest()
+        self.path = os.path.join(self.cache_dir, key + '.pcm')
+
+        self.frames_decoded = 0
+        self.complete = False
+        self.error = None
+        self._mm = None
+        self._part_file = None
+        self._proc = None
+        self._thread = None
+        self._closed = False
+        self._io_lock = threading.Lock()
+
+    def start(self):
+        """开始解码 (若缓存已存在则直接映射)"""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            try:
+                os.utime(self.path)  # 记录最近使用时间，供淘汰时参考
+            except OSError:
+                pass
+            self._map_complete()
+            prune_pcm_cache(self.cache_dir, self.max_cache_bytes, keep=self.path)
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        prune_pcm_cache(self.cache_dir, self.max_cache_bytes)
+        self._thread = threading.Thread(target=self._decode_worker, daemon=True)
+        self._thread.start()
+
+    def _map_complete(self):
+        size = os.path.getsize(self.path)
+        frames = size // self.frame_bytes
+        if frames > 0:
+            self._mm = np.memmap(self.path, dtype=np.int16, mode='r', shape=(frames, self.channels))
+        self.frames_decoded = frames
+        self.complete = True
+
+    def _decode_worker(self):
+        ffmpeg = find_ffmpeg()
+        part_path = f"{self.path}.{os.getpid()}.{id(self)}.part"
+        if not ffmpeg:
+            self.error = "未找到 ffmpeg"
+            self.complete = True
+            return
+        cmd = [
+            ffmpeg, '-v', 'error', '-nostdin',
+            '-i', self.src,
+            '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ac', str(self.channels), '-ar', str(self.sample_rate),
+            '-'
+        ]
+        startupinfo = None
+        if platform.system() == 'Windows':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        try:
+            self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                          startupinfo=startupinfo)
+            with open(part_path, 'wb') as wf:
+                with self._io_lock:
+                    self._part_file = open(part_path, 'rb')
+                pending = b''
+                chunk_size = self.frame_bytes * self.sample_rate // 4  # 约 0.25 秒
+                while not self._closed:
+                    data = self._proc.stdout.read(chunk_size)
+                    if not data:
+                        break
+                    data = pending + data
+                    usable = len(data) - len(data) % self.frame_bytes
+                    pending = data[usable:]
+                    wf.write(data[:usable])
+                    wf.flush()
+                    self.frames_decoded += usable // self.frame_bytes
+            self._proc.wait()
+            if self._closed:
+                return
+            if self._proc.returncode != 0:
+                # 解码失败或提前退出：不完整的 .part 不能进入缓存 (finally 中删除)
+                raise RuntimeError(f"ffmpeg 退出码 {self._proc.returncode}")
+            with self._io_lock:
+                if self._part_file is not None:
+                    self._part_file.close()
+                    self._part_file = None
+                os.replace(part_path, self.path)
+                self._map_complete()
+        except Exception as e:
+            print(f"音频解码失败: {e}")
+            self.error = str(e)
+            self.complete = True
+        finally:
+            if self._proc is not None and self._proc.poll() is None:
+                try:
+                    self._proc.kill()
+                except Exception:
+                    pass
+            if os.path.exists(part_path) and (self._closed or self.error):
+                try:
+                    with self._io_lock:
+                        if self._part_file is not None:
+                            self._part_file.close()
+                            self._part_file = None
+                    os.remove(part_path)
+                except Exception:
+                    pass
+
+    def read(self, start_frame, count):
+        """读取 [start_frame, start_frame+count) 的已解码样本，返回 (k, channels) int16，k 可能小于 count"""
+        if count <= 0 or start_frame < 0:
+            return np.zeros((0, self.channels), dtype=np.int16)
+        end = min(start_frame + count, self.frames_decoded)
+        if end <= start_frame:
+            return np.zeros((0, self.channels), dtype=np.int16)
+        mm = self._mm
+        if mm is not None:
+            return mm[start_frame:end]
+        with self._io_lock:
+            f = self._part_file
+            if f is None:
+                mm = self._mm
+                return mm[start_frame:end] if mm is not None else np.zeros((0, self.channels), dtype=np.int16)
+            f.seek(start_frame * self.frame_bytes)
+            buf = f.read((end - start_frame) * self.frame_bytes)
+        k = len(buf) // self.frame_bytes
+        return np.frombuffer(buf[:k * self.frame_bytes], dtype=np.int16).reshape(k, self.channels)
+
+    @property
+    def duration(self):
+        return self.frames_decoded / float(self.sample_rate)
+
+    def close(self):
+        self._closed = True
+        if self._proc is not None and self._proc.poll() is None:
+            try:
+                self._proc.kill()
+            except Exception:
+                pass
+        with self._io_lock:
+            if self._part_file is not None:
+                self._part_file.close()
+                self._part_file = None
+        self._mm = None
+
+
+class NullAudioOutput:
+    """无声输出后端：按实时节奏拉取回调数据并丢弃 (用于无声卡/无头环境与测试)"""
+
+    def __init__(self, callback, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocksize=BLOCK_SIZE):
+        self._callback = callback
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self._running = False
+        self._thread = None
+        self.blocks_rendered = 0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        buf = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+        interval = self.blocksize / float(self.sample_rate)
+        next_ts = time.monotonic()
+        while self._running:
+            self._callback(buf, self.blocksize)
+            self.blocks_rendered += 1
+            next_ts += interval
+            delay = next_ts - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_ts = time.monotonic()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=0.5)
+        self._thread = None
+
+    def close(self):
+        self.stop()
+
+
+class SoundDeviceOutput:
+    """sounddevice (PortAudio) 回调输出流"""
+
+    def __init__(self, callback, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocksize=BLOCK_SIZE):
+        self._callback = callback
+        self._stream = sd.OutputStream(samplerate=sample_rate, channels=channels, dtype='float32',
+                                       blocksize=blocksize, callback=self._sd_callback)
+
+    def _sd_callback(self, outdata, frames, time_info, status):
+        self._callback(outdata, frames)
+
+    def start(self):
+        if not self._stream.active:
+            self._stream.start()
+
+    def stop(self):
+        if self._stream.active:
+            self._stream.stop()
+
+    def close(self):
+        try:
+            self._stream.close()
+        except Exception:
+            pass
+
+
+class AudioEngine:
+    """音频播放引擎
+
+    output: 'auto' (有声卡时使用 sounddevice，否则静音输出), 'sounddevice' 或 'null'
+    播放位置以采样帧 (浮点) 记录，seek 精确到单个采样；变速通过线性插值重采样实现 (会改变音调)。
+    """
+
+    def __init__(self, output='auto', sample_rate=SAMPLE_RATE, channels=CHANNELS,
+                 blocksize=BLOCK_SIZE, cache_dir=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.cache_dir = cache_dir
+        self.output_kind = output
+        self.src = None
+        self.cache = None
+        self.playing = False
+        self._pos = 0.0       # 当前播放位置 (采样帧)
+        self._speed = 1.0
+        self._volume = 1.0
+        self._lock = threading.Lock()
+        self._output = None
+
+    @staticmethod
+    def is_supported():
+        """是否可以用引擎替代 ffplay (需要 ffmpeg 与真实输出设备)"""
+        return find_ffmpeg() is not None and has_output_device()
+
+    def _ensure_output(self):
+        if self._output is not None:
+            return self._output
+        kind = self.output_kind
+        if kind == 'auto':
+            kind = 'sounddevice' if HAS_SOUNDDEVICE else 'null'
+        if kind == 'sounddevice':
+            self._output = SoundDeviceOutput(self._render, self.sample_rate, self.channels, self.blocksize)
+        else:
+            self._output = NullAudioOutput(self._render, self.sample_rate, self.channels, self.blocksize)
+        return self._output
+
+    def open(self, src):
+        """打开音源 (同一文件重复打开时直接复用已解码缓存)"""
+        if src == self.src and self.cache is not None and self.cache.error is None:
+            return self
+        old = self.cache
+        cache = PcmCache(src, self.sample_rate, self.channels, self.cache_dir)
+        cache.start()
+        with self._lock:
+            self.src = src
+            self.cache = cache
+            self._pos = 0.0
+        if old is not None:
+            old.close()
+        return self
+
+    def play(self, start_time=None):
+        if start_time is not None:
+            self.seek(start_time)
+        with self._lock:
+            self.playing = True
+        self._ensure_output().start()
+
+    def pause(self):
+        with self._lock:
+            self.playing = False
+        if self._output is not None:
+            self._output.stop()
+
+    def seek(self, t):
+        with self._lock:
+            self._pos = max(0.0, float(t)) * self.sample_rate
+
+    def set_speed(self, speed):
+        with self._lock:
+            self._speed = max(0.1, float(speed))
+
+    def set_volume(self, volume):
+        with self._lock:
+            self._volume = max(0.0, float(volume))
+
+    @property
+    def position(self):
+        """当前播放位置 (秒)"""
+        return self._pos / float(self.sample_rate)
+
+    def _render(self, out, frames):
+        """输出流回调：填充 out[:frames] (float32, -1..1)"""
+        with self._lock:
+            cache = self.cache
+            if not self.playing or cache is None:
+                out.fill(0)
+                return
+            pos = self._pos
+            step = self._speed
+            vol = self._volume
+            self._pos = pos + step * frames
+
+        idx = pos + step * np.arange(frames, dtype=np.float64)
+        i0 = np.floor(idx).astype(np.int64)
+        frac = (idx - i0).astype(np.float32)[:, None]
+        first = int(i0[0])
+        span = int(i0[-1]) - first + 2
+        block = cache.read(first, span)
+        n = len(block)
+        if n == 0:
+            out.fill(0)
+            return
+        rel = i0 - first
+        valid = rel + 1 < n
+        a = np.zeros((frames, self.channels), dtype=np.float32)
+        b = np.zeros((frames, self.channels), dtype=np.float32)
+        a[valid] = block[rel[valid]]
+        b[valid] = block[rel[valid] + 1]
+        out[:frames] = (a + (b - a) * frac) * (vol / 32768.0)
+
+    def close(self):
+        self.pause()
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        self.src = None
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+DEM 按需解码的基准测试与一致性检查
+1. 随附的 DEM：对同名 GPX 采样，与 Pillow 整幅解码后的双线性插值结果比较；
+2. 合成的大幅分块 GeoTIFF (Deflate)：比较整幅解码与只解码轨迹走廊瓦片的耗时，以及共享缓存命中后的耗时。
+
+用法: python proto/benchmarks/bench_dem.py [合成栅格边长 (像素)，默认 8192]
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import dem  # noqa: E402
+from bench_gpx_track import load_points  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+PAIRS = [
+    (os.path.join(ROOT, 'gpxData', 'wutong.gpx'), os.path.join(ROOT, 'gpxData', 'wutong_dem.tif')),
+    (os.path.join(ROOT, 'proto', 'activity_568800914.gpx'), os.path.join(ROOT, 'proto', 'activity_568800914_dem.tif')),
+]
+
+
+def reference_sample(data, raster, lats, lons):
+    """整幅栅格上的双线性插值 (逐点，作为对照)"""
+    out = np.full(len(lats), np.nan)
+    h, w = data.shape
+    for i, (lat, lon) in enumerate(zip(lats, lons)):
+        fx = (lon - raster.origin_x) / raster.pixel_w - 0.5
+        fy = (raster.origin_y - lat) / raster.pixel_h - 0.5
+        if not (0 <= fx <= w - 1 and 0 <= fy <= h - 1):
+            continue
+        x0 = min(int(fx), w - 2)
+        y0 = min(int(fy), h - 2)
+        ax, ay = fx - x0, fy - y0
+        q = data[y0:y0 + 2, x0:x0 + 2].astype(np.float64)
+        if raster.nodata is not None and np.any(q == raster.nodata):
+            continue
+        out[i] = (q[0, 0] * (1 - ax) * (1 - ay) + q[0, 1] * ax * (1 - ay)
+                  + q[1, 0] * (1 - ax) * ay + q[1, 1] * ax * ay)
+    return out
+
+
+def write_tiled_tiff(path, data, origin, pixel, tile=256):
+    """写出 Deflate 压缩的分块 GeoTIFF (int16，小端)"""
+    h, w = data.shape
+    across, down = -(-w // tile), -(-h // tile)
+    blobs = []
+    for r in range(down):
+        for c in range(across):
+            block = np.zeros((tile, tile), dtype='<i2')
+            part = data[r * tile:(r + 1) * tile, c * tile:(c + 1) * tile]
+            block[:part.shape[0], :part.shape[1]] = part
+            blobs.append(zlib.compress(block.tobytes(), 1))
+    n = len(blobs)
+    entries = []
+    extra = bytearray()
+    ifd_size = 2 + 14 * 12 + 4
+    extra_base = 8 + ifd_size
+
+    def add(tag, ftype, values, fmt):
+        raw = struct.pack('<' + fmt * len(values), *values)
+        if len(raw) <= 4:
+            entries.append(struct.pack('<HHI', tag, ftype, len(values)) + raw.ljust(4, b'\0'))
+        else:
+            entries.append(struct.pack('<HHII', tag, ftype, len(values), extra_base + len(extra)))
+            extra.extend(raw)
+
+    data_base = extra_base + 8 * n + 128
+    offsets = []
+    pos = data_base
+    for b in blobs:
+        offsets.append(pos)
+        pos += len(b)
+    add(256, 4, [w], 'I')
+    add(257, 4, [h], 'I')
+    add(258, 3, [16], 'H')
+    add(259, 3, [8], 'H')
+    add(262, 3, [1], 'H')
+    add(277, 3, [1], 'H')
+    add(322, 3, [tile], 'H')
+    add(323, 3, [tile], 'H')
+    add(324, 4, offsets, 'I')
+    add(325, 4, [len(b) for b in blobs], 'I')
+    add(339, 3, [2], 'H')
+    add(33550, 12, [pixel, pixel, 0.0], 'd')
+    add(33922, 12, [0.0, 0.0, 0.0, origin[0], origin[1], 0.0], 'd')
+    nodata = b'-32768\0'
+    entries.append(struct.pack('<HHII', 42113, 2, len(nodata), extra_base + len(extra)))
+    extra.extend(nodata)
+    assert len(entries) == 14 and extra_base + len(extra) <= data_base
+    with open(path, 'wb') as f:
+        f.write(b'II' + struct.pack('<HI', 42, 8))
+        f.write(struct.pack('<H', len(entries)) + b''.join(entries) + struct.pack('<I', 0))
+        f.write(bytes(extra).ljust(data_base - extra_base, b'\0'))
+        for b in blobs:
+            f.write(b)
+
+
+def check_bundled():
+    for gpx_path, dem_path in PAIRS:
+        points = load_points(gpx_path)
+        lats = np.array([p[0] for p in points])
+        lons = np.array([p[1] for p in points])
+        raster = dem.DemRaster(dem_path, cache=dem.BlockCache())
+        t0 = time.perf_counter()
+        ele = raster.sample(lats, lons)
+        t = time.perf_counter() - t0
+        ref = reference_sample(np.array(Image.open(dem_path)), raster, lats, lons)
+        np.testing.assert_allclose(ele, ref, rtol=0, atol=1e-6)
+        total = raster.raster.blocks_across * raster.raster.blocks_down
+        raster.close()
+        print(f"{os.path.basename(dem_path)}: {len(lats)} 点  解码 {raster.blocks_read}/{total} 瓦片  {t * 1000:.1f} ms")
+
+
+def bench_synthetic(size):
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    data = (500 + 400 * np.sin(xx * 7.0) * np.cos(yy * 5.0) + 50 * np.sin(xx * 60) * np.sin(yy * 45)).astype('<i2')
+    origin, pixel = (114.0, 23.0), 1.0 / 3600
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic_dem.tif')
+        write_tiled_tiff(path, data, origin, pixel)
+        mb = os.path.getsize(path) / 1e6
+
+        # 一条穿过栅格的蜿蜒轨迹
+        t = np.linspace(0, 1, 20000)
+        lons = origin[0] + (0.1 + 0.8 * t) * size * pixel
+        lats = origin[1] - (0.5 + 0.3 * np.sin(t * 9)) * size * pixel
+
+        raster = dem.DemRaster(path, cache=dem.BlockCache())
+        total = raster.raster.blocks_across * raster.raster.blocks_down
+        t0 = time.perf_counter()
+        full = np.empty_like(data)
+        tile = raster.raster.block_w
+        for i in range(total):
+            r, c = divmod(i, raster.raster.blocks_across)
+            part = full[r * tile:(r + 1) * tile, c * tile:(c + 1) * tile]
+            part[:] = raster.raster.read_block(i)[:part.shape[0], :part.shape[1]]
+        t_full = time.perf_counter() - t0
+        assert np.array_equal(full, data)
+
+        t0 = time.perf_counter()
+        ele = raster.sample(lats, lons)
+        t_corridor = time.perf_counter() - t0
+        decoded = raster.cache.misses
+
+        # 同一 DEM 再处理一条 GPX (批量导出)：瓦片全部命中共享缓存
+        other = dem.DemRaster(path, cache=raster.cache)
+        t0 = time.perf_counter()
+        other.sample(lats[::-1], lons[::-1])
+        t_cached = time.perf_counter() - t0
+        other.close()
+        raster.close()
+
+        fx = (lons - origin[0]) / pixel - 0.5
+        fy = (origin[1] - lats) / pixel - 0.5
+        x0, y0 = np.floor(fx).astype(int), np.floor(fy).astype(int)
+        ax, ay = fx - x0, fy - y0
+        d = data.astype(np.float64)
+        ref = (d[y0, x0] * (1 - ax) * (1 - ay) + d[y0, x0 + 1] * ax * (1 - ay)
+               + d[y0 + 1, x0] * (1 - ax) * ay + d[y0 + 1, x0 + 1] * ax * ay)
+        np.testing.assert_allclose(ele, ref, rtol=0, atol=1e-6)
+
+        print(f"合成栅格 {size}x{size} ({mb:.1f} MB, {total} 瓦片), {len(lats)} 点")
+        print(f"  整幅解码      {t_full * 1000:8.1f} ms")
+        print(f"  走廊按需解码  {t_corridor * 1000:8.1f} ms  ({decoded} 瓦片)")
+        print(f"  共享缓存命中  {t_cached * 1000:8.1f} ms  (新解码 {raster.cache.misses - decoded} 瓦片)")
+
+
+if __name__ == '__main__':
+    check_bundled()
+    bench_synthetic(int(sys.argv[1]) if len(sys.argv) > 1 else 8192)
+    print("数值一致性检查通过")
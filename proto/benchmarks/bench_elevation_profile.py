@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+高程剖面按像素列抽稀 (hud.decimate.column_envelope) 的基准测试与一致性检查
+1. 与逐列循环的参考实现比较 min/max/last；
+2. 合成多日长轨迹：测量抽稀、ElevationPanel 首次绘制、偏移微调后重绘与缓存命中的耗时；
+3. 长轨迹上的短视频 (列宽很小)：剖面只按可见窗口附近分块构建，列数与轨迹长度无关。
+
+用法: python proto/benchmarks/bench_elevation_profile.py [合成轨迹点数，默认 500000]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gpx_track import TrackSegments  # noqa: E402
+from hud.altitude.elevation import ElevationPanel  # noqa: E402
+from hud.decimate import column_envelope  # noqa: E402
+
+
+def reference_envelope(times, values, dt):
+    """逐列循环 (作为对照)"""
+    cols = np.floor(times / dt).astype(np.int64)
+    col0 = cols[0]
+    n = cols[-1] - col0 + 1
+    lo, hi, last = np.empty(n), np.empty(n), np.empty(n)
+    for k in range(n):
+        sel = values[cols - col0 == k]
+        if len(sel):
+            lo[k], hi[k], last[k] = sel.min(), sel.max(), sel[-1]
+        else:
+            lo[k] = hi[k] = last[k] = np.interp((k + col0 + 0.5) * dt, times, values)
+    return col0, lo, hi, last
+
+
+def synthetic_track(n):
+    rng = np.random.default_rng(0)
+    times = np.cumsum(rng.uniform(0.5, 1.5, n))
+    eles = 300 + 250 * np.sin(times / 5000.0) + rng.normal(0, 2, n)
+    eles[rng.integers(0, n, 20)] += 80  # 孤立尖峰，抽稀后仍应可见
+    columns = {'time': times, 'ele': eles, 'lat': np.zeros(n), 'lon': np.zeros(n), 'hr': np.zeros(n, dtype=np.int16)}
+    return columns, TrackSegments(columns, np.zeros(n - 1))
+
+
+def main(n):
+    columns, segments = synthetic_track(n)
+    times, eles = columns['time'], columns['ele']
+
+    for dt in (0.3, 7.0, 120.0):
+        got = column_envelope(times[:20000], eles[:20000], dt)
+        ref = reference_envelope(times[:20000], eles[:20000], dt)
+        assert got[0] == ref[0]
+        for a, b in zip(got[1:], ref[1:]):
+            np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+        # 只构建部分列时与完整结果的对应切片一致
+        for first, count in ((got[0] - 50, 300), (got[0] + 1000, 500), (got[0] + len(got[1]) - 100, 400)):
+            part = column_envelope(times[:20000], eles[:20000], dt, first, count)
+            k = part[0] - got[0]
+            for a, b in zip(part[1:], got[1:]):
+                assert np.array_equal(a, b[k:k + len(a)])
+
+    duration = times[-1]
+    print(f"合成轨迹 {n} 点, 时长 {duration / 3600:.1f} h")
+    gpx_data = {'segments': segments}
+    panel = ElevationPanel()
+    frame = np.zeros((240, 700, 3), dtype=np.uint8)
+    ctx = {'rect': (20, 20, 640, 160), 'current_seconds': 10.0, 'gpx_data': gpx_data,
+           'video_duration': duration, 'gpx_offset': 0.0, 'ele': 300.0}
+
+    t0 = time.perf_counter()
+    col0, lo, hi, last = column_envelope(times, eles, duration / 640)
+    t_env = time.perf_counter() - t0
+    assert hi.max() == eles.max()
+
+    t0 = time.perf_counter()
+    panel.draw(frame, ctx)
+    t_first = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(1, 21):
+        panel.draw(frame, dict(ctx, gpx_offset=i * 30.0))
+    t_shift = (time.perf_counter() - t0) / 20
+
+    t0 = time.perf_counter()
+    panel.draw(frame, ctx)
+    t_cached = time.perf_counter() - t0
+
+    print(f"  抽稀 ({len(lo)} 列)   {t_env * 1000:8.2f} ms")
+    print(f"  首次绘制         {t_first * 1000:8.2f} ms")
+    print(f"  偏移微调后重绘   {t_shift * 1000:8.2f} ms")
+    print(f"  缓存命中         {t_cached * 1000:8.2f} ms")
+
+    for clip, width in ((10.0, 800), (1.0, 1920)):
+        panel = ElevationPanel()
+        frame = np.zeros((240, width + 60, 3), dtype=np.uint8)
+        ctx = {'rect': (20, 20, width, 160), 'current_seconds': 0.0, 'gpx_data': gpx_data,
+               'video_duration': clip, 'gpx_offset': duration / 2, 'ele': 300.0}
+        t0 = time.perf_counter()
+        for i in range(30):
+            panel.draw(frame, dict(ctx, current_seconds=i * clip / 30))
+        t_play = (time.perf_counter() - t0) / 30
+        t0 = time.perf_counter()
+        for i in range(30):
+            panel.draw(frame, dict(ctx, gpx_offset=duration / 2 + i * clip))
+        t_scrub = (time.perf_counter() - t0) / 30
+        stats = panel.cache_stats()
+        print(f"  {clip:g} s 视频 / {width} px: 剖面 {len(panel._profile['lo'])} 列 (全轨迹 {duration * width / clip:.3g} 列)"
+              f"  播放 {t_play * 1000:.2f} ms/帧  逐段平移 {t_scrub * 1000:.2f} ms/帧"
+              f"  窗口缓存 命中 {stats['hits']} / 未命中 {stats['misses']}")
+    print("数值一致性检查通过")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+表盘标定侧车 (hud.calibration) 的基准测试
+模拟用户连续调整表盘尺寸：比较旧方式 (每个新尺寸重新 HoughCircles 检测 / cv2.inpaint) 与
+原生分辨率标定一次、按比例换算到各尺寸的耗时，并给出各尺寸检测结果与原生结果的偏差；
+911 表盘另外给出原生分辨率去指针后，各尺寸背景从 mip 层级缩放构建的耗时。
+
+用法: python proto/benchmarks/bench_gauge_calibration.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import hud.assets  # noqa: E402
+from hud.assets import AssetCache  # noqa: E402
+from hud.speed import porsche911, white_speed  # noqa: E402
+from hud.speed.porsche911 import Porsche911Panel  # noqa: E402
+from hud.speed.white_speed import WhiteSpeedPanel  # noqa: E402
+
+SIZES = list(range(180, 421, 20))
+
+
+def fresh_assets():
+    """新的进程级缓存 (临时目录)，排除磁盘变体的影响"""
+    hud.assets.assets = AssetCache(cache_dir=tempfile.mkdtemp())
+    white_speed.assets = porsche911.assets = hud.assets.assets
+
+
+def bench_white():
+    panel = WhiteSpeedPanel()
+    img = cv2.imread(panel.config['bg_image_path'], cv2.IMREAD_UNCHANGED)
+    approx = (panel.config['dial_left_center'], panel.config['dial_right_center'])
+
+    # 旧方式：每个尺寸缩放后重新检测
+    t0 = time.perf_counter()
+    per_size = {}
+    for h in SIZES:
+        w = int(round(h * img.shape[1] / img.shape[0]))
+        per_size[h] = WhiteSpeedPanel._detect_dials(cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA), *approx)
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    native = WhiteSpeedPanel._detect_dials(img, *approx)
+    t_native = time.perf_counter() - t0
+
+    # 新方式：侧车命中后只需读 JSON，各尺寸按比例换算
+    t0 = time.perf_counter()
+    for h in SIZES:
+        WhiteSpeedPanel()._dial_geometry()
+    t_new = time.perf_counter() - t0
+
+    worst = 0.0
+    for h, r in per_size.items():
+        if r:
+            worst = max(worst, max(abs(a - b) * h for a, b in zip(r['dial_left_center'], native['dial_left_center'])))
+    print(f"white.png: {len(SIZES)} 个尺寸")
+    print(f"  逐尺寸检测          {t_old * 1000:8.1f} ms")
+    print(f"  原生分辨率检测一次  {t_native * 1000:8.1f} ms  (各尺寸圆心偏差最大 {worst:.1f} px)")
+    print(f"  读取侧车 (逐尺寸)   {t_new * 1000:8.1f} ms")
+
+
+def bench_porsche():
+    # 没有干净底图时才需要去指针 (inpaint)
+    panel = Porsche911Panel({'bg_clean_image_path': None})
+    img = cv2.imread(panel.config['bg_image_path'], cv2.IMREAD_UNCHANGED)
+    n = min(img.shape[:2])
+    y1, x1 = (img.shape[0] - n) // 2, (img.shape[1] - n) // 2
+    crop = img[y1:y1 + n, x1:x1 + n]
+
+    # 旧方式：每个尺寸缩放后 inpaint
+    t0 = time.perf_counter()
+    for size in SIZES:
+        bgr = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)[:, :, :3].copy()
+        cv2.inpaint(bgr, panel._needle_mask(size), 2, cv2.INPAINT_TELEA)
+    t_old = time.perf_counter() - t0
+
+    # 新方式：原生分辨率 inpaint 一次 (存为磁盘变体)，之后各尺寸从最近的 mip 层级缩放
+    fresh_assets()
+    t0 = time.perf_counter()
+    clean = panel._inpainted_crop(crop)
+    t_native = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for size in SIZES:
+        cv2.resize(clean, (size, size), interpolation=cv2.INTER_AREA)
+    t_direct = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    panel._build_bg(SIZES[-1])
+    t_first = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for size in SIZES:
+        panel._build_bg(size)
+    t_new = time.perf_counter() - t0
+    print(f"911.png (无干净底图): {len(SIZES)} 个尺寸")
+    print(f"  逐尺寸 inpaint      {t_old * 1000:8.1f} ms")
+    print(f"  原生 inpaint 一次   {t_native * 1000:8.1f} ms  (之后存为磁盘变体)")
+    print(f"  从原生分辨率缩放    {t_direct * 1000:8.1f} ms")
+    print(f"  首次构建背景        {t_first * 1000:8.1f} ms  (读取底图、构建 mip 层级)")
+    print(f"  之后逐尺寸构建背景  {t_new * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    bench_white()
+    bench_porsche()
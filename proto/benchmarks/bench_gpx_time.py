@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+GPX 时间戳批量解析的基准测试与一致性检查
+对比逐点调用 _parse_to_utc_datetime 再逐个相减的原实现与 gpx_track.parse_timestamps。
+
+用法: python proto/benchmarks/bench_gpx_time.py [gpx文件 ...]
+默认使用 gpxData 目录下全部 GPX 文件。
+"""
+
+import glob
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from gpx_track import parse_timestamps  # noqa: E402
+
+GPX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'gpxData')
+
+
+def load_time_strings(path):
+    """按 trkpt 顺序取出 <time> 文本 (缺失为空字符串)"""
+    times = []
+    for el in ET.parse(path).getroot().iter():
+        if not el.tag.endswith('trkpt'):
+            continue
+        text = ''
+        for child in el:
+            if child.tag.rsplit('}', 1)[-1] == 'time' and child.text:
+                text = child.text.strip()
+                break
+        times.append(text)
+    return times
+
+
+# ---- 原实现 (VideoEditorApp._parse_to_utc_datetime，逐点调用) ----
+
+def legacy_parse_to_utc_datetime(time_str):
+    if not time_str:
+        return None
+    try:
+        if time_str.endswith('Z'):
+            time_str = time_str[:-1] + '+00:00'
+        try:
+            dt = datetime.fromisoformat(time_str)
+        except ValueError:
+            if '.' in time_str:
+                main_part, rest = time_str.split('.', 1)
+                tz_part = ''
+                if '+' in rest:
+                    frac, tz_part = rest.split('+', 1)
+                    tz_part = '+' + tz_part
+                elif '-' in rest:
+                    frac, tz_part = rest.split('-', 1)
+                    tz_part = '-' + tz_part
+                else:
+                    frac = rest
+                if len(frac) > 6:
+                    frac = frac[:6]
+                dt = datetime.fromisoformat(f"{main_part}.{frac}{tz_part}")
+            else:
+                for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S']:
+                    try:
+                        dt = datetime.strptime(time_str, fmt)
+                        break
+                    except ValueError:
+                        continue
+                if 'dt' not in locals():
+                    raise ValueError(f"Unknown format: {time_str}")
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
+    except Exception:
+        return None
+
+
+def legacy_seconds(time_strs):
+    dts = [legacy_parse_to_utc_datetime(t) for t in time_strs]
+    dts = [dt for dt in dts if dt is not None]
+    if not dts:
+        return np.zeros(0), None
+    t0 = dts[0]
+    return np.array([(dt - t0).total_seconds() for dt in dts]), t0
+
+
+def vectorized_seconds(time_strs):
+    seconds, t0 = parse_timestamps(time_strs, legacy_parse_to_utc_datetime)
+    return seconds[~np.isnan(seconds)], t0
+
+
+def bench(fn, *args, repeat=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(paths):
+    for path in paths:
+        time_strs = load_time_strings(path)
+        print(f"{os.path.basename(path)}: {len(time_strs)} 点")
+        t_old, (old, old_t0) = bench(legacy_seconds, time_strs)
+        t_new, (new, new_t0) = bench(vectorized_seconds, time_strs)
+        assert old_t0 == new_t0, f"起始时间不一致: {old_t0} != {new_t0}"
+        np.testing.assert_allclose(new, old, rtol=0, atol=1e-6)
+        print(f"  时间解析  旧 {t_old * 1000:8.2f} ms  新 {t_new * 1000:8.2f} ms  x{t_old / t_new:.1f}")
+
+    # 混合格式：时区偏移、无时区、超长小数位及无法解析的字符串
+    mixed = ['2025-12-19T04:57:30.000Z', '2025-12-19T12:57:31+08:00', '2025-12-18T23:57:32-05:00',
+             '2025-12-19T04:57:33', '2025-12-19 04:57:34.5', '2025-12-19T04:57:35.1234567Z', 'bad', '']
+    old, old_t0 = legacy_seconds(mixed)
+    new, new_t0 = vectorized_seconds(mixed)
+    assert old_t0 == new_t0
+    np.testing.assert_allclose(new, old, rtol=0, atol=1e-6)
+    print("数值一致性检查通过")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or sorted(glob.glob(os.path.join(GPX_DIR, '*.gpx'))))
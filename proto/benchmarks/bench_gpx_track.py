@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+gpx_track 向量化实现的基准测试
+对比 VideoEditorApp 原先的逐点循环实现 (_calculate_speeds / _smooth_gpx_data)；
+参照实现与数值一致性检查见 proto/tests/test_gpx_track.py。
+
+用法: python proto/benchmarks/bench_gpx_track.py [gpx文件 ...]
+默认使用 gpxData/gps.gpx。
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+from gpx_track import smooth_track  # noqa: E402
+from test_gpx_track import load_points, legacy_calculate_speeds, legacy_smooth, vectorized_speeds  # noqa: E402
+
+DEFAULT_GPX = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'gpxData', 'gps.gpx')
+
+
+def bench(fn, *args, repeat=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(paths):
+    for path in paths:
+        points = load_points(path)
+        lats = [p[0] for p in points]
+        lons = [p[1] for p in points]
+        print(f"{os.path.basename(path)}: {len(points)} 点")
+
+        t_old, _ = bench(legacy_calculate_speeds, points)
+        t_new, _ = bench(vectorized_speeds, points)
+        print(f"  速度计算  旧 {t_old * 1000:8.2f} ms  新 {t_new * 1000:8.2f} ms  x{t_old / t_new:.1f}")
+
+        t_old, _ = bench(legacy_smooth, lats, lons)
+        t_new, _ = bench(smooth_track, lats, lons)
+        print(f"  平滑/航向  旧 {t_old * 1000:8.2f} ms  新 {t_new * 1000:8.2f} ms  x{t_old / t_new:.1f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or [DEFAULT_GPX])
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+HUD 资源共享缓存 (hud.assets) 的基准测试与一致性检查
+1. 多个表盘实例：每个实例各自 cv2.imread 与共享解码缓存的耗时和解码次数；
+2. 预处理背景：首次构建与再次启动 (新的缓存实例，只有与尺寸无关的中间结果如 911 去指针表盘存盘) 的耗时，
+   结果逐像素一致；模拟拖动缩放表盘，确认按尺寸的背景不写磁盘；
+3. 共享内存：子进程 attach 后直接取得解码后的图像，不再解码。
+
+用法: python proto/benchmarks/bench_hud_assets.py [每种表盘的实例数，默认 4]
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import hud.assets  # noqa: E402
+from hud.assets import AssetCache  # noqa: E402
+from hud.speed.porsche911 import Porsche911Panel  # noqa: E402
+from hud.speed.black_speed import BlackSpeedPanel  # noqa: E402
+from hud.speed.black2_speed import Black2SpeedPanel  # noqa: E402
+from hud.speed.back import BackPanel  # noqa: E402
+
+PANELS = (Porsche911Panel, BlackSpeedPanel, Black2SpeedPanel, BackPanel)
+SIZE = 320
+
+
+def image_paths():
+    paths = []
+    for cls in PANELS:
+        p = cls()
+        for k in ('bg_image_path', 'bg_clean_image_path'):
+            path = p.config.get(k)
+            if path and os.path.exists(path) and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def bench_decode(n):
+    paths = image_paths()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        for path in paths:
+            cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    t_old = time.perf_counter() - t0
+
+    cache = AssetCache(cache_dir=tempfile.mkdtemp())
+    t0 = time.perf_counter()
+    for _ in range(n):
+        for path in paths:
+            cache.image(path)
+    t_new = time.perf_counter() - t0
+    mb = cache.stats()['image_bytes'] / 1e6
+    print(f"{len(paths)} 张背景图 x {n} 个实例")
+    print(f"  各自解码  {t_old * 1000:8.1f} ms  ({len(paths) * n} 次解码)")
+    print(f"  共享缓存  {t_new * 1000:8.1f} ms  ({cache.decodes} 次解码, 常驻 {mb:.1f} MB)")
+
+
+def render_all():
+    out = []
+    for cls in PANELS:
+        frame = np.zeros((SIZE + 20, SIZE + 20, 3), dtype=np.uint8)
+        cls().draw(frame, {'speed': 88.0, 'rect': (10, 10, SIZE, SIZE)})
+        out.append(frame)
+    return out
+
+
+def bench_variants(cache_dir):
+    hud.assets.assets = AssetCache(cache_dir=cache_dir)
+    _patch_panels()
+    t0 = time.perf_counter()
+    first = render_all()
+    t_cold = time.perf_counter() - t0
+
+    # 模拟再次启动：新的进程级缓存，只剩磁盘上的变体
+    hud.assets.assets = AssetCache(cache_dir=cache_dir)
+    _patch_panels()
+    t0 = time.perf_counter()
+    second = render_all()
+    t_warm = time.perf_counter() - t0
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+    stats = hud.assets.assets.stats()
+    print(f"预处理背景 ({len(PANELS)} 种表盘, {SIZE}px)")
+    print(f"  首次构建  {t_cold * 1000:8.1f} ms")
+    print(f"  再次启动  {t_warm * 1000:8.1f} ms  (解码 {stats['decodes']} 次, 磁盘命中 {stats['disk_hits']} 个)")
+
+    # 拖动缩放：每个中间尺寸只在内存中构建背景
+    files = set(os.listdir(cache_dir))
+    t0 = time.perf_counter()
+    panels = [cls() for cls in PANELS]
+    for size in range(200, 400, 8):
+        frame = np.zeros((size + 20, size + 20, 3), dtype=np.uint8)
+        for p in panels:
+            p.draw(frame, {'speed': 88.0, 'rect': (10, 10, size, size)})
+    t_drag = time.perf_counter() - t0
+    new_files = set(os.listdir(cache_dir)) - files
+    assert not new_files, new_files
+    print(f"  拖动缩放  {t_drag * 1000 / 25:8.1f} ms/尺寸  (25 个尺寸, 新写入磁盘 {len(new_files)} 个文件, 磁盘共 {len(files)} 个)")
+
+
+def _patch_panels():
+    """各表盘模块在导入时绑定了 assets，替换为当前的缓存实例"""
+    for cls in PANELS:
+        sys.modules[cls.__module__].assets = hud.assets.assets
+
+
+def _worker(descriptors, path, queue):
+    cache = AssetCache(cache_dir=tempfile.mkdtemp())
+    cache.attach(descriptors)
+    img = cache.image(path)
+    queue.put((cache.decodes, int(img.sum(dtype=np.int64)), img.shape))
+    del img
+    cache.close()
+
+
+def bench_shared():
+    paths = image_paths()
+    cache = AssetCache(cache_dir=tempfile.mkdtemp())
+    for path in paths:
+        cache.image(path)
+    descriptors = cache.share()
+    queue = mp.get_context('spawn').Queue()
+    proc = mp.get_context('spawn').Process(target=_worker, args=(descriptors, paths[0], queue))
+    t0 = time.perf_counter()
+    proc.start()
+    decodes, checksum, shape = queue.get()
+    proc.join()
+    t = time.perf_counter() - t0
+    ref = cache.image(paths[0])
+    assert decodes == 0 and shape == ref.shape and checksum == int(ref.sum(dtype=np.int64))
+    cache.close()
+    print(f"共享内存: 子进程取得 {os.path.basename(paths[0])} {shape}，解码 {decodes} 次 (含进程启动 {t * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    bench_decode(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_variants(tmp)
+    bench_shared()
+    print("一致性检查通过")
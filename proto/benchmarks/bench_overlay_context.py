@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+叠加层数据上下文按需组装的基准测试与一致性检查
+对不同的可见面板组合逐帧调用 VideoEditorApp._draw_overlay_on_frame：
+1. 与“组装全部字段后逐个绘制可见面板”的参照结果逐像素比较；
+2. 统计 _sample_gpx_segment / _get_smoothed_state 的调用次数与每帧耗时。
+
+用法: python proto/benchmarks/bench_overlay_context.py [GPX 文件，默认 proto/activity_568800914.gpx]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from video_editor import VideoEditorApp, TrackSegments  # noqa: E402
+from hud import create_panels  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_GPX = os.path.join(ROOT, 'activity_568800914.gpx')
+PANELS = ('track', 'telemetry', 'speedometer', 'elevation')
+CASES = [
+    ('全部面板', PANELS),
+    ('仅速度表', ('speedometer',)),
+    ('仅轨迹', ('track',)),
+    ('速度表+高程', ('speedometer', 'elevation')),
+]
+FRAME_W, FRAME_H = 1280, 720
+
+
+def make_app(gpx_path):
+    """不创建窗口，只准备叠加层绘制所需的状态"""
+    app = VideoEditorApp.__new__(VideoEditorApp)
+    app.grade_window_m = 50.0
+    app.elevation_source = 'gps'
+    app._frame_gpx_cache = None
+    app._last_gpx_seg_idx = 0
+    app.gpx_offset = 0.0
+    app.debug_overlay_enabled = False
+    app.playing = True
+    app.telemetry_rect_rel = [0.72, 0.72, 0.25, 0.22]
+    app.speedometer_rect_rel = [0.05, 0.65, 0.20, 0.20]
+    app.hud_panels = create_panels(('elevation', 'telemetry', 'track', 'speedometer', 'porsche911'))
+    app._overlay_context = {}
+    app.gpx_track = app._load_gpx_track(gpx_path)
+    app.dem_path = None
+    app.gpx_dem_ele = None
+    segments = TrackSegments(app._track_columns(), app.gpx_track['speed'])
+    app.gpx_data = {'segments': segments, 'name': os.path.basename(gpx_path), 'start_time': None}
+    app._build_gpx_arrays()
+    app._smooth_gpx_data()
+    app.video_info = {'duration': float(segments[len(segments) - 1]['end'])}
+    return app
+
+
+def reference_overlay(app, frame, current_seconds):
+    """参照实现：每帧采样并组装全部字段，再绘制可见面板"""
+    h, w = frame.shape[:2]
+    target_time = current_seconds + app.gpx_offset
+    sample = app._sample_gpx_segment(target_time)
+    speed, ele, grade = (0.0, None, None) if sample is None else (sample['speed'], sample['ele'], sample['grade'])
+    full = {
+        'gpx_data': app.gpx_data,
+        'current_seconds': current_seconds,
+        'gpx_offset': app.gpx_offset,
+        'video_duration': app.video_info.get('duration', 0),
+        'current_state': app._get_smoothed_state(target_time),
+        'smooth_lats': app.smooth_lats,
+        'smooth_lons': app.smooth_lons,
+        'last_idx': app._last_idx,
+        'speed': speed,
+        'ele': ele,
+        'grade': grade,
+    }
+    rects = {
+        'telemetry': app._get_telemetry_rect_px(w, h),
+        'speedometer': app._get_speedometer_rect_px(w, h),
+        'elevation': app._get_ele_profile_rect_px(w, h),
+    }
+    for name in PANELS:
+        if app.hud_panels[name].visible:
+            ctx = dict(full)
+            if name in rects:
+                ctx['rect'] = rects[name]
+            app.hud_panels[name].draw(frame, ctx)
+
+
+def count_calls(app, attr):
+    """包装实例方法以统计调用次数"""
+    fn = getattr(app, attr)
+    counter = [0]
+
+    def wrapper(*args):
+        counter[0] += 1
+        return fn(*args)
+    setattr(app, attr, wrapper)
+    return counter
+
+
+def run_case(app, visible, times):
+    for name in PANELS:
+        app.hud_panels[name].update_config({'visible': name in visible})
+    base = np.full((FRAME_H, FRAME_W, 3), 90, dtype=np.uint8)
+
+    for t in times[:20]:
+        got, ref = base.copy(), base.copy()
+        app._draw_overlay_on_frame(got, t)
+        reference_overlay(app, ref, t)
+        assert np.array_equal(got, ref), f"t={t:.2f}s 绘制结果与参照不一致"
+
+    samples = count_calls(app, '_sample_gpx_segment')
+    smoothed = count_calls(app, '_get_smoothed_state')
+    frame = base.copy()
+    t0 = time.perf_counter()
+    for t in times:
+        app._draw_overlay_on_frame(frame, t)
+    elapsed = time.perf_counter() - t0
+    del app._sample_gpx_segment, app._get_smoothed_state
+    return elapsed / len(times), samples[0], smoothed[0]
+
+
+def main(gpx_path):
+    app = make_app(gpx_path)
+    duration = app.video_info['duration']
+    times = np.arange(0.0, min(duration, 20.0), 1 / 30.0)
+    print(f"{os.path.basename(gpx_path)}: {len(app.gpx_data['segments'])} 段, {len(times)} 帧 ({FRAME_W}x{FRAME_H})")
+    for label, visible in CASES:
+        per_frame, samples, smoothed = run_case(app, visible, times)
+        print(f"  {label:<10} {per_frame * 1000:7.3f} ms/帧  采样 {samples:5d} 次  平滑状态 {smoothed:5d} 次")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_GPX)
+    print("绘制结果一致性检查通过")
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准测试 (每项都在新的解释器进程中测量，取多次中的最小值)
+1. HUD 面板：旧方式 (导入全部面板模块并实例化) 与惰性注册表 (只创建占位对象) 的耗时；
+2. import video_editor 的耗时；
+3. 有图形显示时：从启动进程到主窗口首次绘制完成 (time-to-first-window)。
+
+用法: python proto/benchmarks/bench_startup.py [重复次数，默认 5]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+PROTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PANELS = ('elevation', 'telemetry', 'track', 'speedometer', 'porsche911')
+
+PRELUDE = f"import sys, time; sys.path.insert(0, {PROTO!r}); import cv2, numpy; t0 = time.perf_counter()\n"
+
+SNIPPETS = {
+    'HUD 面板 (全部导入)': f"import hud\npanels = {{n: hud.load_panel_class(n)() for n in {PANELS!r}}}\n",
+    'HUD 面板 (惰性)': f"import hud\npanels = hud.create_panels({PANELS!r})\n",
+    'import video_editor': "import video_editor\n",
+}
+
+FIRST_WINDOW = f"""
+import sys, time
+sys.path.insert(0, {PROTO!r})
+import tkinter as tk
+import video_editor
+root = tk.Tk()
+app = video_editor.VideoEditorApp(root)
+root.update()
+print('ready', flush=True)
+root.destroy()
+"""
+
+
+def run_snippet(code):
+    out = subprocess.run([sys.executable, '-c', PRELUDE + code + "print(time.perf_counter() - t0)"],
+                         capture_output=True, text=True, cwd=PROTO, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def first_window():
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', FIRST_WINDOW], stdout=subprocess.PIPE, text=True, cwd=PROTO)
+    for line in proc.stdout:
+        if line.strip() == 'ready':
+            break
+    t = time.perf_counter() - t0
+    proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError('主窗口启动失败')
+    return t
+
+
+def main(repeat):
+    for label, code in SNIPPETS.items():
+        best = min(run_snippet(code) for _ in range(repeat))
+        print(f"  {label:<22} {best * 1000:8.1f} ms")
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        print("  time-to-first-window   跳过 (没有图形显示)")
+        return
+    best = min(first_window() for _ in range(repeat))
+    print(f"  time-to-first-window   {best * 1000:8.1f} ms (含解释器启动)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+DEM 高程栅格 (GeoTIFF) 读取与轨迹高程采样
+安装了 rasterio 时直接使用；否则使用最小的 TIFF 解析器：读取 IFD、GeoTIFF 仿射参数
+(ModelTiepoint + ModelPixelScale) 与 NoData，文件以 np.memmap 映射，按条带/瓦片解码
+(未压缩、LZW、Deflate，支持水平差分预测)。
+采样时只解码轨迹点邻近像素所在的条带/瓦片；解码结果放入进程内共享的 LRU 缓存，
+批量导出多个 GPX 时同一 DEM 的瓦片只解码一次。
+"""
+
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import rasterio
+    HAS_RASTERIO = True
+except ImportError:
+    HAS_RASTERIO = False
+
+# TIFF 标签
+TAG_IMAGE_WIDTH = 256
+TAG_IMAGE_LENGTH = 257
+TAG_BITS_PER_SAMPLE = 258
+TAG_COMPRESSION = 259
+TAG_STRIP_OFFSETS = 273
+TAG_SAMPLES_PER_PIXEL = 277
+TAG_ROWS_PER_STRIP = 278
+TAG_STRIP_BYTE_COUNTS = 279
+TAG_PLANAR_CONFIG = 284
+TAG_PREDICTOR = 317
+TAG_TILE_WIDTH = 322
+TAG_TILE_LENGTH = 323
+TAG_TILE_OFFSETS = 324
+TAG_TILE_BYTE_COUNTS = 325
+TAG_SAMPLE_FORMAT = 339
+TAG_MODEL_PIXEL_SCALE = 33550
+TAG_MODEL_TIEPOINT = 33922
+TAG_GEO_KEY_DIRECTORY = 34735
+TAG_GDAL_NODATA = 42113
+
+GEO_KEY_RASTER_TYPE = 1025
+RASTER_PIXEL_IS_POINT = 2
+
+# 字段类型 -> (struct 格式, 字节数)
+_FIELD_TYPES = {
+    1: ('B', 1), 2: ('s', 1), 3: ('H', 2), 4: ('I', 4), 5: ('II', 8),
+    6: ('b', 1), 7: ('B', 1), 8: ('h', 2), 9: ('i', 4), 10: ('ii', 8),
+    11: ('f', 4), 12: ('d', 8), 16: ('Q', 8), 17: ('q', 8),
+}
+
+DEM_SUFFIXES = ('_dem.tif', '_dem.tiff')
+
+# 共享瓦片缓存的容量 (字节)
+BLOCK_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def find_dem_for_gpx(gpx_path):
+    """查找与 GPX 同目录同名的 DEM 文件 (<名称>_dem.tif)，不存在时返回 None"""
+    stem = os.path.splitext(gpx_path)[0]
+    for suffix in DEM_SUFFIXES:
+        if os.path.exists(stem + suffix):
+            return stem + suffix
+    return None
+
+
+def lzw_decode(data):
+    """TIFF LZW 解码 (MSB 优先，9-12 位码长，提前一个码字增加位宽)"""
+    data = bytes(data) + b'\x00\x00\x00'
+    total_bits = (len(data) - 3) * 8
+    out = bytearray()
+    table = [bytes((i,)) for i in range(256)] + [b'', b'']
+    width = 9
+    bitpos = 0
+    prev = None
+    while bitpos + width <= total_bits:
+        b = bitpos >> 3
+        code = (((data[b] << 16) | (data[b + 1] << 8) | data[b + 2]) >> (24 - (bitpos & 7) - width)) & ((1 << width) - 1)
+        bitpos += width
+        if code == 257:
+            break
+        if code == 256:
+            del table[258:]
+            width = 9
+            prev = None
+            continue
+        if prev is None:
+            entry = table[code]
+        elif code < len(table):
+            entry = table[code]
+            table.append(prev + entry[:1])
+        else:
+            entry = prev + prev[:1]
+            table.append(entry)
+        out += entry
+        prev = entry
+        if len(table) >= (1 << width) - 1 and width < 12:
+            width += 1
+    return bytes(out)
+
+
+class TiffRaster:
+    """单波段 TIFF/GeoTIFF 的最小读取器 (首个 IFD)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode='r')
+        order = bytes(self._mm[:2])
+        if order == b'II':
+            self._bo = '<'
+        elif order == b'MM':
+            self._bo = '>'
+        else:
+            raise ValueError(f"不是 TIFF 文件: {path}")
+        magic, ifd_offset = struct.unpack(self._bo + 'HI', bytes(self._mm[2:8]))
+        if magic != 42:
+            raise ValueError(f"不支持的 TIFF 版本 (BigTIFF?): {path}")
+        tags = self._read_ifd(ifd_offset)
+
+        self.width = int(tags[TAG_IMAGE_WIDTH][0])
+        self.height = int(tags[TAG_IMAGE_LENGTH][0])
+        if int(tags.get(TAG_SAMPLES_PER_PIXEL, (1,))[0]) != 1:
+            raise ValueError("只支持单波段 DEM")
+        bits = int(tags.get(TAG_BITS_PER_SAMPLE, (8,))[0])
+        fmt = int(tags.get(TAG_SAMPLE_FORMAT, (1,))[0])
+        kind = {1: 'u', 2: 'i', 3: 'f'}.get(fmt)
+        if kind is None:
+            raise ValueError(f"不支持的采样格式: {fmt}")
+        self.dtype = np.dtype(f"{self._bo}{kind}{bits // 8}")
+        self.compression = int(tags.get(TAG_COMPRESSION, (1,))[0])
+        if self.compression not in (1, 5, 8, 32946):
+            raise ValueError(f"不支持的压缩方式: {self.compression}")
+        self.predictor = int(tags.get(TAG_PREDICTOR, (1,))[0])
+        if self.predictor not in (1, 2):
+            raise ValueError(f"不支持的预测器: {self.predictor}")
+
+        # 条带视为宽度等于图像宽度的瓦片
+        if TAG_TILE_OFFSETS in tags:
+            self.block_w = int(tags[TAG_TILE_WIDTH][0])
+            self.block_h = int(tags[TAG_TILE_LENGTH][0])
+            self.offsets = tags[TAG_TILE_OFFSETS]
+            self.byte_counts = tags[TAG_TILE_BYTE_COUNTS]
+        else:
+            self.block_w = self.width
+            self.block_h = min(int(tags.get(TAG_ROWS_PER_STRIP, (self.height,))[0]), self.height)
+            self.offsets = tags[TAG_STRIP_OFFSETS]
+            self.byte_counts = tags[TAG_STRIP_BYTE_COUNTS]
+        self.blocks_across = -(-self.width // self.block_w)
+        self.blocks_down = -(-self.height // self.block_h)
+
+        # 地理参考：左上角 + 像素大小 (北朝上)
+        scale = tags.get(TAG_MODEL_PIXEL_SCALE)
+        tie = tags.get(TAG_MODEL_TIEPOINT)
+        if scale is None or tie is None:
+            raise ValueError("缺少 GeoTIFF 地理参考 (ModelPixelScale/ModelTiepoint)")
+        self.pixel_w, self.pixel_h = float(scale[0]), float(scale[1])
+        self.origin_x = float(tie[3]) - float(tie[0]) * self.pixel_w
+        self.origin_y = float(tie[4]) + float(tie[1]) * self.pixel_h
+        self.pixel_is_point = False
+        keys = tags.get(TAG_GEO_KEY_DIRECTORY)
+        if keys is not None:
+            for k in range(4, len(keys) - 3, 4):
+                if keys[k] == GEO_KEY_RASTER_TYPE and keys[k + 1] == 0:
+                    self.pixel_is_point = keys[k + 3] == RASTER_PIXEL_IS_POINT
+
+        self.nodata = None
+        nodata = tags.get(TAG_GDAL_NODATA)
+        if nodata:
+            try:
+                self.nodata = float(nodata.strip('\x00 '))
+            except ValueError:
+                pass
+
+    def _read_ifd(self, offset):
+        bo = self._bo
+        mm = self._mm
+        (count,) = struct.unpack(bo + 'H', bytes(mm[offset:offset + 2]))
+        tags = {}
+        for k in range(count):
+            entry = bytes(mm[offset + 2 + k * 12:offset + 14 + k * 12])
+            tag, ftype, n = struct.unpack(bo + 'HHI', entry[:8])
+            if ftype not in _FIELD_TYPES:
+                continue
+            fmt, size = _FIELD_TYPES[ftype]
+            nbytes = size * n
+            if nbytes <= 4:
+                raw = entry[8:8 + nbytes]
+            else:
+                (pos,) = struct.unpack(bo + 'I', entry[8:12])
+                raw = bytes(mm[pos:pos + nbytes])
+            if ftype == 2:
+                tags[tag] = raw.decode('latin-1')
+            elif ftype in (5, 10):
+                v = struct.unpack(bo + fmt[0] * (2 * n), raw)
+                tags[tag] = tuple(v[i] / v[i + 1] if v[i + 1] else 0.0 for i in range(0, len(v), 2))
+            else:
+                tags[tag] = struct.unpack(bo + fmt * n, raw)
+        return tags
+
+    def read_block(self, index):
+        """解码第 index 个瓦片/条带，返回 (block_h, block_w) 数组 (末尾条带补齐)"""
+        off = int(self.offsets[index])
+        raw = self._mm[off:off + int(self.byte_counts[index])]
+        if self.compression == 5:
+            raw = lzw_decode(raw)
+        elif self.compression in (8, 32946):
+            raw = zlib.decompress(bytes(raw))
+        arr = np.frombuffer(raw, dtype=self.dtype)
+        block = np.zeros(self.block_h * self.block_w, dtype=self.dtype)
+        size = min(len(arr), len(block))
+        block[:size] = arr[:size]
+        block = block.reshape(self.block_h, self.block_w)
+        if self.predictor == 2:
+            block = np.cumsum(block, axis=1, dtype=self.dtype)
+        return block
+
+    def close(self):
+        # 解码后的瓦片是独立数组，不引用映射；释放引用即可关闭映射
+        self._mm = None
+
+
+class RasterioRaster:
+    """rasterio 数据集的按块读取接口 (与 TiffRaster 相同的属性)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._ds = rasterio.open(path)
+        ds = self._ds
+        self.width, self.height = ds.width, ds.height
+        self.block_h, self.block_w = ds.block_shapes[0]
+        self.blocks_across = -(-self.width // self.block_w)
+        self.blocks_down = -(-self.height // self.block_h)
+        t = ds.transform
+        self.origin_x, self.pixel_w = t.c, t.a
+        self.origin_y, self.pixel_h = t.f, -t.e
+        self.nodata = ds.nodata
+        # rasterio 的仿射变换以像素角点为原点
+        self.pixel_is_point = False
+
+    def read_block(self, index):
+        r, c = divmod(index, self.blocks_across)
+        block = self._ds.read(1, window=self._ds.block_window(1, r, c))
+        if block.shape != (self.block_h, self.block_w):
+            padded = np.zeros((self.block_h, self.block_w), dtype=block.dtype)
+            padded[:block.shape[0], :block.shape[1]] = block
+            block = padded
+        return block
+
+    def close(self):
+        self._ds.close()
+
+
+class BlockCache:
+    """解码后瓦片的 LRU 缓存 (按字节数限制，线程安全)，键为 (文件, 修改时间, 瓦片下标)"""
+
+    def __init__(self, max_bytes=BLOCK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return block
+            self.misses += 1
+        block = loader()
+        with self._lock:
+            if key not in self._blocks:
+                self._blocks[key] = block
+                self.nbytes += block.nbytes
+            while self.nbytes > self.max_bytes and len(self._blocks) > 1:
+                _, old = self._blocks.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return block
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self.nbytes = 0
+
+
+# 进程内所有 DemRaster 共享
+block_cache = BlockCache()
+
+
+class DemRaster:
+    """DEM 栅格：经纬度 -> 高程的双线性采样 (按需解码瓦片)"""
+
+    def __init__(self, path, cache=None):
+        self.path = os.path.abspath(path)
+        self.raster = RasterioRaster(path) if HAS_RASTERIO else TiffRaster(path)
+        self.cache = block_cache if cache is None else cache
+        self._key = (self.path, os.stat(path).st_mtime_ns)
+        r = self.raster
+        self.width, self.height = r.width, r.height
+        self.origin_x, self.origin_y = r.origin_x, r.origin_y
+        self.pixel_w, self.pixel_h = r.pixel_w, r.pixel_h
+        self.nodata = r.nodata
+        self.pixel_is_point = r.pixel_is_point
+        self.blocks_read = 0  # 本实例请求过的瓦片数 (含缓存命中)
+
+    def close(self):
+        """关闭底层文件 (rasterio 数据集或内存映射)；已缓存的瓦片仍可被其他实例复用"""
+        self.raster.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def block(self, index):
+        """获取解码后的瓦片 (经共享缓存)"""
+        return self.cache.get(self._key + (index,), lambda: self.raster.read_block(index))
+
+    def pixels(self, rows, cols):
+        """读取一组像素 (行列均在栅格范围内)：按所在瓦片分组，每个瓦片只取一次"""
+        r = self.raster
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        ids = (rows // r.block_h) * r.blocks_across + cols // r.block_w
+        order = np.argsort(ids, kind='stable')
+        ids_sorted = ids[order]
+        uniq, starts = np.unique(ids_sorted, return_index=True)
+        ends = np.append(starts[1:], len(ids_sorted))
+        out = None
+        for index, a, b in zip(uniq.tolist(), starts.tolist(), ends.tolist()):
+            block = self.block(index)
+            if out is None:
+                out = np.empty(len(ids), dtype=block.dtype)
+            sel = order[a:b]
+            br, bc = divmod(index, r.blocks_across)
+            out[sel] = block[rows[sel] - br * r.block_h, cols[sel] - bc * r.block_w]
+        self.blocks_read += len(uniq)
+        return out if out is not None else np.zeros(0)
+
+    def sample(self, lats, lons):
+        """对所有点一次性双线性插值，返回 float64 数组；超出范围或邻近像素为 NoData 时为 NaN
+
+        只有点的 2x2 邻域像素所在的瓦片会被解码 (即轨迹经过的走廊)。
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        ele = np.full(len(lats), np.nan)
+        # 栅格坐标 (以像素中心为整数)
+        half = 0.0 if self.pixel_is_point else 0.5
+        fx = (lons - self.origin_x) / self.pixel_w - half
+        fy = (self.origin_y - lats) / self.pixel_h - half
+        w, h = self.width, self.height
+        inside = np.flatnonzero((fx >= 0) & (fy >= 0) & (fx <= w - 1) & (fy <= h - 1))
+        if not inside.size:
+            return ele
+        fx = fx[inside]
+        fy = fy[inside]
+        x0 = np.minimum(np.floor(fx).astype(np.int64), max(w - 2, 0))
+        y0 = np.minimum(np.floor(fy).astype(np.int64), max(h - 2, 0))
+        x1 = np.minimum(x0 + 1, w - 1)
+        y1 = np.minimum(y0 + 1, h - 1)
+        ax = np.clip(fx - x0, 0.0, 1.0)
+        ay = np.clip(fy - y0, 0.0, 1.0)
+
+        n = len(inside)
+        v = self.pixels(np.concatenate((y0, y0, y1, y1)), np.concatenate((x0, x1, x0, x1))).astype(np.float64)
+        v00, v01, v10, v11 = v[:n], v[n:2 * n], v[2 * n:3 * n], v[3 * n:]
+        interp = (v00 * (1 - ax) * (1 - ay) + v01 * ax * (1 - ay)
+                  + v10 * (1 - ax) * ay + v11 * ax * ay)
+        valid = np.isfinite(interp)
+        if self.nodata is not None:
+            valid &= (v00 != self.nodata) & (v01 != self.nodata) & (v10 != self.nodata) & (v11 != self.nodata)
+        ele[inside] = np.where(valid, interp, np.nan)
+        return ele
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+剪辑片段索引 (Edit Decision List)
+片段按项目顺序保存在列表中 (与 VideoEditorApp.clips 为同一个列表)，
+索引维护项目帧偏移的前缀和，以及按源起始帧排序的区间，所有查询都用二分查找完成。
+"""
+
+import bisect
+from itertools import accumulate
+
+
+class EditDecisionList:
+    """片段列表的区间索引
+
+    offsets[i] 为第 i 个片段在项目时间轴上的起始帧 (长度 n+1，最后一项为项目总帧数)；
+    源区间按 start_frame 排序，并记录前缀最大 end_frame 以判断某帧是否落在任意片段内。
+    """
+
+    def __init__(self, clips=None):
+        self.clips = [] if clips is None else clips
+        self.rebuild()
+
+    def rebuild(self):
+        """从片段列表全量重建索引"""
+        clips = self.clips
+        self.offsets = [0]
+        self.offsets.extend(accumulate(c['end_frame'] - c['start_frame'] for c in clips))
+        starts = [c['start_frame'] for c in clips]
+        ends = [c['end_frame'] for c in clips]
+
+        # 由分割/删除得到的片段按源时间顺序排列且互不重叠，此时源索引与项目顺序一致，可增量维护
+        self.in_source_order = all(ends[i] <= starts[i + 1] for i in range(len(clips) - 1))
+        if self.in_source_order:
+            self._order = None
+        else:
+            self._order = sorted(range(len(clips)), key=starts.__getitem__)
+            starts = [starts[i] for i in self._order]
+            ends = [ends[i] for i in self._order]
+        self._starts = starts
+        self._max_end = list(accumulate(ends, max))
+
+    def __len__(self):
+        return len(self.clips)
+
+    def _clip_index(self, j):
+        """源索引位置 -> 片段在列表中的下标"""
+        return j if self._order is None else self._order[j]
+
+    # ============ 查询 ============
+
+    @property
+    def total_frames(self):
+        return self.offsets[-1]
+
+    def project_start_frame(self, index):
+        """第 index 个片段在项目时间轴上的起始帧"""
+        return self.offsets[index]
+
+    def clip_at_project_frame(self, project_frame):
+        """项目帧所在片段的下标 (超出范围时夹到首/尾片段)"""
+        if not self.clips:
+            return -1
+        i = bisect.bisect_right(self.offsets, project_frame) - 1
+        return min(max(i, 0), len(self.clips) - 1)
+
+    def clip_at_source_frame(self, source_frame):
+        """包含源帧的片段下标 (start_frame <= frame < end_frame)，不存在时返回 -1"""
+        j = bisect.bisect_right(self._starts, source_frame) - 1
+        if self._order is None:
+            if j >= 0 and source_frame < self.clips[j]['end_frame']:
+                return j
+            return -1
+        # 片段顺序被打乱时可能重叠：向前查找，前缀最大结束帧不超过该帧时即可停止
+        while j >= 0 and self._max_end[j] > source_frame:
+            i = self._order[j]
+            if source_frame < self.clips[i]['end_frame']:
+                return i
+            j -= 1
+        return -1
+
+    def contains(self, source_frame):
+        """源帧是否在任意片段内"""
+        j = bisect.bisect_right(self._starts, source_frame) - 1
+        return j >= 0 and self._max_end[j] > source_frame
+
+    def next_start_after(self, source_frame):
+        """起始帧大于 source_frame 的最近片段起始帧，没有时返回 None"""
+        j = bisect.bisect_right(self._starts, source_frame)
+        if j < len(self._starts):
+            return self._starts[j]
+        return None
+
+    def source_frame_at(self, project_time, fps):
+        """项目时间 -> 源视频帧 (超过范围返回最后一个片段的结束帧)"""
+        if not self.clips:
+            return 0
+        i = bisect.bisect_right(self.offsets, project_time * fps) - 1
+        if 0 <= i < len(self.clips):
+            offset_time = project_time - self.offsets[i] / fps
+            return self.clips[i]['start_frame'] + int(offset_time * fps)
+        return self.clips[-1]['end_frame']
+
+    def project_time_of(self, source_frame, fps):
+        """源视频帧 -> 项目时间 (不在任何片段内时返回项目总时长)"""
+        i = self.clip_at_source_frame(source_frame)
+        if i < 0:
+            return self.total_frames / fps
+        return (self.offsets[i] + source_frame - self.clips[i]['start_frame']) / fps
+
+    # ============ 编辑 ============
+
+    def split(self, index, frame, new_clip):
+        """在源帧 frame 处把第 index 个片段一分为二，new_clip 为后半段 (其起止帧由此设置)"""
+        clip = self.clips[index]
+        new_clip['start_frame'] = frame
+        new_clip['end_frame'] = clip['end_frame']
+        clip['end_frame'] = frame
+        self.clips.insert(index + 1, new_clip)
+        if not self.in_source_order:
+            self.rebuild()
+            return
+        # 总长度不变：后续片段的项目偏移不受影响，只需插入新片段的偏移
+        self.offsets.insert(index + 1, self.offsets[index] + frame - clip['start_frame'])
+        self._starts.insert(index + 1, frame)
+        self._max_end[index] = frame
+        self._max_end.insert(index + 1, new_clip['end_frame'])
+
+    def delete(self, index):
+        """删除第 index 个片段并返回它"""
+        clip = self.clips.pop(index)
+        if not self.in_source_order:
+            self.rebuild()
+            return clip
+        length = clip['end_frame'] - clip['start_frame']
+        del self.offsets[index + 1]
+        if length:
+            self.offsets[index + 1:] = [o - length for o in self.offsets[index + 1:]]
+        del self._starts[index]
+        del self._max_end[index]
+        return clip
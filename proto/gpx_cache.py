@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+已解析 GPX 轨迹的列式磁盘缓存
+每个 GPX 文件对应一个目录 (以 路径/大小/修改时间/解析版本 为键)：每列一个原始二进制文件，
+另附 meta.json 记录名称、起始时间、点数与各列类型 (写入新目录时删除同一文件的旧目录)。再次打开时跳过 XML 解析与速度计算，
+各列用 np.memmap 打开，只有实际访问到的部分才会读入内存，多日的长轨迹也不会生成逐点的 Python 对象。
+由其他数据源派生的附加列 (如 DEM 高程) 也保存在同一目录，并以数据源文件的 路径/大小/修改时间 校验。
+"""
+
+import os
+import json
+import hashlib
+import shutil
+
+import numpy as np
+
+try:
+    from .thumbnail_cache import user_cache_dir
+except ImportError:
+    from thumbnail_cache import user_cache_dir
+
+# 解析、派生数据或存储格式变化时递增，旧缓存随之失效
+PARSER_VERSION = 2
+
+# 按点的列 (长度 n) 与分段速度 speed (长度 n-1) 的存储类型
+COLUMN_DTYPES = {
+    'lat': '<f8',
+    'lon': '<f8',
+    'ele': '<f4',
+    'time': '<f8',
+    'hr': '<i2',
+    'ext_speed': '<f4',
+    'speed': '<f4',
+}
+
+
+class GpxTrackCache:
+    """单个 GPX 文件的列式缓存"""
+
+    def __init__(self, gpx_path, cache_dir=None):
+        self.gpx_path = os.path.abspath(gpx_path)
+        self.cache_dir = cache_dir or user_cache_dir('gpx')
+        st = os.stat(gpx_path)
+        self.key_src = f"{self.gpx_path}|{st.st_size}|{st.st_mtime_ns}|{PARSER_VERSION}"
+        key = hashlib.sha1(self.key_src.encode('utf-8')).hexdigest()
+        self.path = os.path.join(self.cache_dir, key + '.track')
+
+    def load(self):
+        """以 np.memmap 打开各列，返回列数组字典 (另含 name 与 start_us：起始时间的 UTC 微秒数)
+
+        缓存不存在或失效时返回 None。
+        """
+        meta_path = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('key') != self.key_src:
+                return None
+            n = meta['points']
+            track = {'name': meta['name'], 'start_us': meta['start_us']}
+            for col, dtype in meta['columns'].items():
+                length = n - 1 if col == 'speed' else n
+                if length > 0:
+                    track[col] = np.memmap(os.path.join(self.path, col + '.bin'), dtype=dtype, mode='r', shape=(length,))
+                else:
+                    track[col] = np.zeros(0, dtype=dtype)
+            return track
+        except Exception as e:
+            print(f"读取GPX缓存失败: {e}")
+            return None
+
+    def save(self, track):
+        """按列写入缓存 (写入临时目录后整体替换，meta.json 最后写入)，成功时返回 True"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            if os.path.exists(tmp_path):
+                shutil.rmtree(tmp_path)
+            os.makedirs(tmp_path)
+            for col, dtype in COLUMN_DTYPES.items():
+                np.ascontiguousarray(track[col], dtype=dtype).tofile(os.path.join(tmp_path, col + '.bin'))
+            meta = {
+                'key': self.key_src,
+                'name': track['name'],
+                'start_us': int(track['start_us']),
+                'points': len(track['time']),
+                'columns': COLUMN_DTYPES,
+            }
+            with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            if os.path.exists(self.path):
+                shutil.rmtree(self.path)
+            os.replace(tmp_path, self.path)
+            self._remove_stale()
+            return True
+        except Exception as e:
+            print(f"保存GPX缓存失败: {e}")
+            return False
+
+    def _remove_stale(self):
+        """删除同一 GPX 文件的旧缓存目录 (文件修改或解析版本变化后留下的)"""
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith('.track') or path == self.path:
+                continue
+            try:
+                with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+                    key = json.load(f).get('key', '')
+            except (OSError, ValueError):
+                continue
+            # 键为 路径|大小|修改时间|解析版本
+            if key.rsplit('|', 3)[0] == self.gpx_path:
+                # Windows 下仍被映射的列文件无法删除，留到下次
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _source_key(source_path):
+        st = os.stat(source_path)
+        return f"{os.path.abspath(source_path)}|{st.st_size}|{st.st_mtime_ns}"
+
+    def load_column(self, name, source_path):
+        """以 np.memmap 打开由 source_path 派生的附加列，不存在或数据源已变化时返回 None"""
+        meta_path = os.path.join(self.path, name + '.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('source') != self._source_key(source_path) or meta['length'] <= 0:
+                return None
+            return np.memmap(os.path.join(self.path, name + '.bin'), dtype=meta['dtype'], mode='r', shape=(meta['length'],))
+        except Exception as e:
+            print(f"读取GPX缓存失败: {e}")
+            return None
+
+    def save_column(self, name, array, source_path, dtype='<f4'):
+        """保存由 source_path 派生的附加列 (轨迹缓存目录不存在时跳过)，成功时返回 True"""
+        if not os.path.isdir(self.path):
+            return False
+        try:
+            np.ascontiguousarray(array, dtype=dtype).tofile(os.path.join(self.path, name + '.bin'))
+            with open(os.path.join(self.path, name + '.json'), 'w', encoding='utf-8') as f:
+                json.dump({'source': self._source_key(source_path), 'dtype': dtype, 'length': len(array)}, f,
+                          ensure_ascii=False)
+            return True
+        except Exception as e:
+            print(f"保存GPX缓存失败: {e}")
+            return False
@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+GPX 轨迹数值计算 (NumPy 向量化)
+时间戳解析、速度、坐标平滑、航向、累计距离与坡度都对整条轨迹一次计算，VideoEditorApp 中的对应方法只负责取数和保存结果。
+GPX 文件流式解析为紧凑的列数组，不为整个文档或每个点建立 Python 对象。
+"""
+
+import math
+import xml.etree.ElementTree as ET
+from array import array
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+
+
+_NAT = np.iinfo(np.int64).min
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _datetime_to_ns(dt):
+    delta = dt.astimezone(timezone.utc) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+
+
+def parse_timestamps(time_strs, fallback=None):
+    """批量解析 ISO-8601 时间字符串，返回 (相对首个有效时间的秒数数组, 首个有效时间的 UTC datetime)
+
+    快速路径：把整列字符串视为字符矩阵，按固定版式 YYYY-MM-DD[T ]HH:MM:SS[.f...][Z|±HH:MM]
+    直接取数字计算 (不生成 datetime 对象)；不符合版式的少数项先尝试 np.datetime64，
+    仍失败的交给 fallback (返回带时区 datetime 或 None)。
+    无时区的时间按 UTC 处理；无法解析的项为 NaN。没有任何有效时间时返回 (全 NaN, None)。
+    """
+    n = len(time_strs)
+    arr = np.asarray(time_strs, dtype=str).reshape(n)
+    width = arr.dtype.itemsize // 4
+    if n == 0 or width < 19:
+        ns = np.full(n, _NAT, dtype=np.int64)
+        fast = np.zeros(n, dtype=bool)
+    else:
+        codes = arr.view(np.uint32).reshape(n, width)
+        lengths = np.count_nonzero(codes, axis=1)
+        digits = codes.astype(np.int32) - ord('0')
+        is_digit = (digits >= 0) & (digits <= 9)
+
+        def number(a, b):
+            value = np.zeros(n, dtype=np.int64)
+            for k in range(a, b):
+                value = value * 10 + digits[:, k]
+            return value
+
+        fast = (np.all(is_digit[:, [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]], axis=1)
+                & (codes[:, 4] == ord('-')) & (codes[:, 7] == ord('-'))
+                & ((codes[:, 10] == ord('T')) | (codes[:, 10] == ord(' ')))
+                & (codes[:, 13] == ord(':')) & (codes[:, 16] == ord(':')))
+
+        # 小数秒：'.' 之后连续的数字
+        frac_ns = np.zeros(n, dtype=np.int64)
+        end = np.full(n, 19)
+        if width > 20:
+            has_frac = codes[:, 19] == ord('.')
+            run = np.cumprod(is_digit[:, 20:], axis=1).astype(bool) & has_frac[:, None]
+            run_len = run.sum(axis=1)
+            scale = 10 ** np.maximum(8 - np.arange(width - 20), 0)
+            scale[9:] = 0
+            frac_ns = np.where(run, digits[:, 20:], 0) @ scale
+            end = np.where(has_frac, 20 + run_len, 19)
+            fast &= ~has_frac | (run_len > 0)
+
+        # 时区后缀：无 / 'Z' / '±HH:MM'
+        rows = np.arange(n)
+        rest = lengths - end
+        first = codes[rows, np.minimum(end, width - 1)]
+        is_z = (rest == 1) & ((first == ord('Z')) | (first == ord('z')))
+        offset_min = np.zeros(n, dtype=np.int64)
+        is_off = (rest == 6) & ((first == ord('+')) | (first == ord('-')))
+        if is_off.any():
+            cols = np.minimum(end[:, None] + np.array([1, 2, 3, 4, 5]), width - 1)
+            tz = codes[rows[:, None], cols].astype(np.int64) - ord('0')
+            is_off &= (tz[:, 2] == ord(':') - ord('0')) & np.all((tz[:, [0, 1, 3, 4]] >= 0) & (tz[:, [0, 1, 3, 4]] <= 9), axis=1)
+            minutes = (tz[:, 0] * 10 + tz[:, 1]) * 60 + tz[:, 3] * 10 + tz[:, 4]
+            offset_min = np.where(is_off, np.where(first == ord('-'), -minutes, minutes), 0)
+        fast &= (rest == 0) | is_z | is_off
+
+        months = (number(0, 4) - 1970) * 12 + number(5, 7) - 1
+        days = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + number(8, 10) - 1
+        seconds = days * 86400 + number(11, 13) * 3600 + number(14, 16) * 60 + number(17, 19) - offset_min * 60
+        ns = np.where(fast, seconds * 10**9 + frac_ns, _NAT)
+
+    for i in np.flatnonzero(~fast):
+        text = str(arr[i])
+        try:
+            ns[i] = np.datetime64(text, 'ns').astype(np.int64)
+            continue
+        except ValueError:
+            pass
+        dt = fallback(text) if (fallback is not None and text) else None
+        ns[i] = _NAT if dt is None else _datetime_to_ns(dt)
+
+    valid = ns != _NAT
+    if not valid.any():
+        return np.full(n, np.nan), None
+    t0 = int(ns[valid][0])
+    seconds = np.full(n, np.nan)
+    seconds[valid] = (ns[valid] - t0) / 1e9
+    return seconds, _EPOCH + timedelta(microseconds=t0 // 1000)
+
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _first_text(elem, name):
+    """elem 子树中第一个本地名为 name 的元素的文本 (不存在或为空时返回 None)"""
+    for child in elem.iter():
+        if child is not elem and _local_name(child.tag) == name:
+            return child.text
+    return None
+
+
+def parse_gpx_columns(path, fallback=None, chunk=65536):
+    """流式解析 GPX 轨迹点，返回 (列数组字典, 轨迹名称, 首个有效时间的 UTC datetime)
+
+    列为 lat/lon/ele/time/hr/ext_speed (time 为相对首个有效时间的秒数，ext_speed 为扩展速度 km/h，缺失为 NaN)，
+    时间无效的点被丢弃。用 iterparse 逐点读取并随即释放元素，数值写入 array 缓冲区，
+    时间字符串每 chunk 个交给 parse_timestamps 整批解析，内存只随点数线性增长 (每点几十字节)。
+    没有有效轨迹点时返回 (None, None, None)。
+    """
+    lat, lon, ele, hr, ext_speed = array('d'), array('d'), array('d'), array('l'), array('d')
+    seconds = []
+    time_strs = []
+    start = [None]
+    name = None
+    in_trk = 0
+    trk_seen = False
+    parents = []
+
+    def flush():
+        secs, t0 = parse_timestamps(time_strs, fallback)
+        if t0 is not None:
+            if start[0] is None:
+                start[0] = t0
+            else:
+                secs = secs + (t0 - start[0]).total_seconds()
+        seconds.append(secs)
+        time_strs.clear()
+
+    for event, elem in ET.iterparse(path, events=('start', 'end')):
+        tag = _local_name(elem.tag)
+        if event == 'start':
+            parents.append(elem)
+            if tag == 'trk':
+                in_trk += 1
+            continue
+        parents.pop()
+        if tag == 'trk':
+            in_trk -= 1
+            trk_seen = True
+        elif tag == 'name' and in_trk and not trk_seen and name is None:
+            # 第一条 trk 中的名称
+            name = elem.text if elem.text else 'Unknown'
+        elif tag == 'trkpt':
+            lat.append(float(elem.get('lat')))
+            lon.append(float(elem.get('lon')))
+            text = _first_text(elem, 'ele')
+            ele.append(float(text) if text else 0.0)
+            text = _first_text(elem, 'time')
+            time_strs.append(text.strip() if text else '')
+            hr_value = 0
+            spd_kph = math.nan
+            ext = next((c for c in elem.iter() if _local_name(c.tag) == 'extensions'), None)
+            if ext is not None:
+                text = _first_text(ext, 'hr')
+                if text:
+                    hr_value = int(text)
+                text = _first_text(ext, 'speed')
+                if text:
+                    try:
+                        spd_kph = float(text) * 3.6  # 单位多为 m/s
+                    except ValueError:
+                        pass
+            hr.append(hr_value)
+            ext_speed.append(spd_kph)
+            if len(time_strs) >= chunk:
+                flush()
+            # 释放已读完的轨迹点 (清空其父元素即可，不在子元素列表中逐个查找删除)
+            if parents:
+                parents[-1].clear()
+    if time_strs:
+        flush()
+    if not len(lat) or start[0] is None:
+        return None, None, None
+
+    secs = np.concatenate(seconds)
+    valid = ~np.isnan(secs)
+    columns = {
+        'lat': np.frombuffer(lat, dtype=np.float64)[valid],
+        'lon': np.frombuffer(lon, dtype=np.float64)[valid],
+        'ele': np.frombuffer(ele, dtype=np.float64)[valid],
+        'time': secs[valid],
+        'hr': np.asarray(hr, dtype=np.int32)[valid],
+        'ext_speed': np.frombuffer(ext_speed, dtype=np.float64)[valid],
+    }
+    return columns, name or 'Unknown', start[0]
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """两点间球面距离 (米)，参数可为标量或数组"""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = np.radians(np.subtract(lat2, lat1))
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def moving_average(values, window, mode='edge'):
+    """基于前缀和的居中滑动平均
+
+    mode='edge'  : 两端按边缘值填充后取完整窗口 (等价于 np.pad(mode='edge') + np.convolve(mode='valid'))
+    mode='shrink': 两端窗口截断，只对实际存在的元素取平均
+    前缀和前先减去首元素，避免长轨迹上累加值过大损失精度。
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    half = window // 2
+    base = values[0]
+    if mode == 'edge':
+        padded = np.pad(values - base, (half, half), mode='edge')
+        cs = np.concatenate(([0.0], np.cumsum(padded)))
+        return ((cs[window:] - cs[:-window]) / window)[:n] + base
+    cs = np.concatenate(([0.0], np.cumsum(values - base)))
+    idx = np.arange(n)
+    lo = np.maximum(idx - half, 0)
+    hi = np.minimum(idx + half + 1, n)
+    return (cs[hi] - cs[lo]) / (hi - lo) + base
+
+
+def compute_speeds(lats, lons, times, ext_speeds=None, window=3):
+    """相邻两点间的速度 (km/h)，长度为 n-1
+
+    两点都有扩展速度 (ext_speeds，km/h，缺失为 NaN) 且大于 0 时取两者平均，
+    否则为 距离/时间；结果做截断窗口的滑动平均。times 为秒。
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    if len(lats) < 2:
+        return np.zeros(0)
+
+    dist = haversine(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    dt = np.diff(times)
+    speeds = np.zeros(len(dt))
+    moving = dt > 0
+    speeds[moving] = dist[moving] / dt[moving] * 3.6
+
+    if ext_speeds is not None:
+        ext = np.asarray(ext_speeds, dtype=np.float64)
+        s1, s2 = ext[:-1], ext[1:]
+        with np.errstate(invalid='ignore'):
+            use_ext = (s1 > 0) & (s2 > 0)
+        speeds[use_ext] = (s1[use_ext] + s2[use_ext]) / 2.0
+
+    return moving_average(speeds, window, mode='shrink')
+
+
+def compute_headings(lats, lons):
+    """相邻点之间的航向 (度，正北为 0，顺时针)，长度与输入相同 (最后一个沿用前一个)
+
+    两点重合时沿用前一个航向 (开头没有可沿用的则为 0)。
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    n = len(lats)
+    if n < 2:
+        return np.zeros(n)
+    dy = np.diff(lats)
+    dx = np.diff(lons) * np.cos(np.radians(lats[:-1]))
+    raw = np.degrees(np.arctan2(dx, dy))
+    raw[raw < 0] += 360
+    valid = (np.abs(dx) >= 1e-9) | (np.abs(dy) >= 1e-9)
+    # 前向填充：重合点取最近一个有效航向
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(n - 1), -1))
+    headings = np.where(last_valid >= 0, raw[np.maximum(last_valid, 0)], 0.0)
+    return np.append(headings, headings[-1])
+
+
+def smooth_track(lats, lons, window=5):
+    """坐标滑动平均 + 航向计算与平滑 (按 sin/cos 分量平滑，避免 0/360 跳变)
+
+    返回 (smooth_lats, smooth_lons, smooth_headings)，长度均与输入相同。
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if len(lats) > window:
+        smooth_lats = moving_average(lats, window)
+        smooth_lons = moving_average(lons, window)
+    else:
+        smooth_lats = lats
+        smooth_lons = lons
+
+    headings = compute_headings(smooth_lats, smooth_lons)
+    if len(headings) > window:
+        rad = np.radians(headings)
+        smooth_sin = moving_average(np.sin(rad), window)
+        smooth_cos = moving_average(np.cos(rad), window)
+        headings = (np.degrees(np.arctan2(smooth_sin, smooth_cos)) + 360) % 360
+    return smooth_lats, smooth_lons, headings
+
+
+def cumulative_distance(lats, lons):
+    """沿轨迹的累计距离 (米)，长度与输入相同，首项为 0"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if len(lats) < 2:
+        return np.zeros(len(lats))
+    dist = haversine(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    return np.concatenate(([0.0], np.cumsum(dist)))
+
+
+def segment_grades(cum_dist, eles, min_dist=1.0):
+    """相邻点之间的坡度 (%)，长度为 n-1；段长不超过 min_dist 米时为 0"""
+    dist = np.diff(np.asarray(cum_dist, dtype=np.float64))
+    rise = np.diff(np.asarray(eles, dtype=np.float64))
+    grades = np.zeros(len(dist))
+    valid = dist > min_dist
+    grades[valid] = rise[valid] / dist[valid] * 100.0
+    return grades
+
+
+def window_grades(cum_dist, eles, window_m, min_dist=1.0):
+    """按距离窗口平滑的坡度 (%)，长度与输入相同
+
+    第 k 个点的坡度为 [d_k - window/2, d_k + window/2] 两端插值高程之差除以窗口实际长度
+    (窗口在轨迹两端截断)，不受点密度影响；window_m <= 0 时退化为逐段坡度 (按点取前一段)。
+    """
+    cum_dist = np.asarray(cum_dist, dtype=np.float64)
+    eles = np.asarray(eles, dtype=np.float64)
+    n = len(cum_dist)
+    if n < 2:
+        return np.zeros(n)
+    if window_m <= 0:
+        grades = segment_grades(cum_dist, eles, min_dist)
+        return np.append(grades, grades[-1])
+    half = window_m / 2.0
+    lo = np.maximum(cum_dist - half, cum_dist[0])
+    hi = np.minimum(cum_dist + half, cum_dist[-1])
+    span = hi - lo
+    rise = np.interp(hi, cum_dist, eles) - np.interp(lo, cum_dist, eles)
+    grades = np.zeros(n)
+    valid = span > min_dist
+    grades[valid] = rise[valid] / span[valid] * 100.0
+    return grades
+
+
+def track_points(segments, fields=('lat', 'lon', 'ele', 'time')):
+    """分段序列 -> 按点的数组字典 (每段起点 + 最后一段终点，长度 n+1)
+
+    TrackSegments 直接返回列数组 (有序时不复制)，普通分段字典列表则逐段取值。
+    """
+    if isinstance(segments, TrackSegments):
+        return {f: segments.point_column(f) for f in fields}
+    keys = {'lat': ('lat_start', 'lat_end'), 'lon': ('lon_start', 'lon_end'),
+            'ele': ('ele_start', 'ele_end'), 'time': ('start', 'end')}
+    points = {}
+    for f in fields:
+        k_start, k_end = keys[f]
+        points[f] = np.array([s[k_start] for s in segments] + [segments[-1][k_end]], dtype=np.float64)
+    return points
+
+
+def track_profile(segments, grade_window_m=50.0):
+    """由分段序列一次性生成按分段下标索引的数组，逐帧采样时只需插值
+
+    start/end/grade 长度为 n (分段数)；cum_dist/smooth_grade 长度为 n+1 (按点)。
+    """
+    if not segments:
+        return None
+    points = track_points(segments, ('lat', 'lon', 'ele'))
+    if isinstance(segments, TrackSegments):
+        starts, ends = segments.starts, segments.ends
+    else:
+        starts = np.array([s['start'] for s in segments], dtype=np.float64)
+        ends = np.array([s['end'] for s in segments], dtype=np.float64)
+    cum_dist = cumulative_distance(points['lat'], points['lon'])
+    return {
+        'start': starts,
+        'end': ends,
+        'cum_dist': cum_dist,
+        'grade': segment_grades(cum_dist, points['ele']),
+        'smooth_grade': window_grades(cum_dist, points['ele'], grade_window_m),
+        'grade_window_m': grade_window_m,
+    }
+
+
+class TrackSegments(Sequence):
+    """按点列数组 (可为 np.memmap) 的分段视图：第 i 段为点 k 到 k+1，访问时才生成字典
+
+    columns 含 lat/lon/ele/time/hr 点列 (长度 n+1)，speeds 为分段速度 (长度 n)。
+    点时间非递增时按 (start, end) 稳定排序，order 记录排序后每段对应的起点下标。
+    """
+
+    def __init__(self, columns, speeds):
+        self.columns = columns
+        self.speeds = speeds
+        times = columns['time']
+        if len(times) > 1 and np.any(np.diff(times) < 0):
+            self.order = np.lexsort((times[1:], times[:-1]))
+            self.starts = times[self.order]
+            self.ends = times[self.order + 1]
+        else:
+            self.order = None
+            self.starts = times[:-1]
+            self.ends = times[1:]
+
+    def __len__(self):
+        return len(self.speeds)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self.speeds)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('segment index out of range')
+        k = i if self.order is None else int(self.order[i])
+        c = self.columns
+        return {
+            'start': float(c['time'][k]),
+            'end': float(c['time'][k + 1]),
+            'speed': float(self.speeds[k]),
+            'hr': int(c['hr'][k]),
+            'ele_start': float(c['ele'][k]),
+            'ele_end': float(c['ele'][k + 1]),
+            'lat_start': float(c['lat'][k]),
+            'lon_start': float(c['lon'][k]),
+            'lat_end': float(c['lat'][k + 1]),
+            'lon_end': float(c['lon'][k + 1]),
+        }
+
+    def point_column(self, name):
+        """按分段顺序的点列 (每段起点 + 最后一段终点)"""
+        col = self.columns[name]
+        if self.order is None:
+            return col
+        return np.append(col[self.order], col[self.order[-1] + 1])
+
+    def index_at(self, t):
+        """包含时间 t 的分段下标 (超出范围时夹到首/尾分段)"""
+        i = int(np.searchsorted(self.starts, t, side='right')) - 1
+        return min(max(i, 0), len(self.speeds) - 1)
+
+
+class SmoothedSegments(Sequence):
+    """平滑后的分段视图：第 i 项为原分段加上 lat/lon/heading (访问时才生成字典，不复制整条轨迹)"""
+
+    def __init__(self, segments, lats, lons, headings):
+        self.segments = segments
+        self.lats = lats
+        self.lons = lons
+        self.headings = headings
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        s = self.segments[i]
+        if i < 0:
+            i += len(self.segments)
+        # 生成新字典，不修改底层分段 (它也可能是普通的字典列表)
+        return dict(s, lat=float(self.lats[i]), lon=float(self.lons[i]), heading=float(self.headings[i]))
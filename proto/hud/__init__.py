@@ -1,53 +1,19 @@
-# __init__.py for HUD package (robust exports for old/new layout)
+# __init__.py for HUD package
+# Panel classes are imported lazily (on first attribute access) so importing the
+# package does not load every panel module; see registry.py.
 from .base import HudPanel
+from .registry import (PanelInfo, register_panel, panel_entries, panel_info, panel_names, load_panel_class,
+                       required_fields, LazyPanel, create_panels)
 
-# Elevation
-try:
-    from .altitude.elevation import ElevationPanel  # new layout
-except Exception:
-    try:
-        from .elevation import ElevationPanel  # legacy layout
-    except Exception:
-        ElevationPanel = None
-
-# Telemetry
-try:
-    from .combine.telemetry import TelemetryPanel  # new layout
-except Exception:
-    try:
-        from .telemetry import TelemetryPanel  # legacy layout
-    except Exception:
-        TelemetryPanel = None
-
-# Track
-try:
-    from .track.track import TrackPanel  # new layout
-except Exception:
-    try:
-        from .track import TrackPanel  # legacy layout (flat)
-    except Exception:
-        TrackPanel = None
-
-# Speedometer
-try:
-    from .speed.speedometer import SpeedometerPanel  # new layout
-except Exception:
-    try:
-        from .speedometer import SpeedometerPanel  # legacy layout
-    except Exception:
-        SpeedometerPanel = None
 
-# Porsche 911
-try:
-    from .speed.porsche911 import Porsche911Panel  # new layout
-except Exception:
+def __getattr__(attr):
+    name = next((n for n, info in panel_entries().items() if info.class_name == attr), None)
+    if name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
     try:
-        from .porsche911 import Porsche911Panel  # legacy layout
-    except Exception:
-        Porsche911Panel = None
-
-# Back Style
-try:
-    from .speed.back import BackPanel  # new layout
-except Exception:
-    BackPanel = None
+        cls = load_panel_class(name)
+    except ImportError as e:
+        # Not cached: a later access retries the import
+        raise AttributeError(f"module {__name__!r} cannot load panel {attr!r}: {e}") from e
+    globals()[attr] = cls
+    return cls
@@ -3,7 +3,10 @@
 import numpy as np
 import cv2
 from ..base import HudPanel
+from ..registry import register_panel
+from ..decimate import column_envelope
 
+@register_panel('elevation', requires=('rect', 'current_seconds', 'gpx_data', 'video_duration', 'gpx_offset', 'ele'), layers=('static', 'dynamic'), cost='medium')
 class ElevationPanel(HudPanel):
     def __init__(self, config=None):
         super().__init__(config)
@@ -16,7 +19,11 @@ class ElevationPanel(HudPanel):
             'point_color': (0, 0, 255),
             'text_color': (80, 80, 80)
         })
-        self._ele_profile_cache = {}
+        # Envelope chunk around the visible window, kept outside panel_cache so
+        # rendered windows never evict it (see _get_profile)
+        self._profile = None
+        self._series = None
+        self._series_gen = 0
 
     def _draw_impl(self, frame, data_context):
         """
@@ -38,125 +45,21 @@ class ElevationPanel(HudPanel):
         if panel_w < 50 or panel_h < 20:
             return
         
-        # Check cache (v2 version key)
-        # Include config in cache key to invalidate on style change
-        config_key = str(self.config)
-        cache_key = (id(gpx_data), gpx_offset, video_duration, panel_w, panel_h, 'v2', config_key)
-        
-        if self._ele_profile_cache.get('key') != cache_key:
-            # Generate cache image
-            overlay_bgr = np.full((panel_h, panel_w, 3), self.config['bg_color'], dtype=np.uint8)
-            overlay_alpha = np.zeros((panel_h, panel_w), dtype=np.float32)
-            
-            # Background transparency
-            overlay_alpha[:] = self.config['bg_alpha']
-            
-            segments = gpx_data['segments']
-            start_t = gpx_offset
-            end_t = gpx_offset + video_duration
-            
-            # Collect points (relative time, elevation)
-            raw_pts = [] 
-            min_ele = float('inf')
-            max_ele = float('-inf')
-            
-            for s in segments:
-                t1, t2 = s['start'], s['end']
-                e1, e2 = s['ele_start'], s['ele_end']
-                
-                # Completely to the left
-                if t2 < start_t:
-                    continue
-                # Completely to the right
-                if t1 > end_t:
-                    break
-                    
-                # Handle intersection
-                # Start interpolation
-                if t1 < start_t <= t2:
-                    ratio = (start_t - t1) / (t2 - t1)
-                    e_start = e1 + (e2 - e1) * ratio
-                    raw_pts.append((0.0, e_start))
-                    min_ele = min(min_ele, e_start)
-                    max_ele = max(max_ele, e_start)
-                
-                # Points within segment
-                if t1 >= start_t:
-                    rel_t = t1 - start_t
-                    raw_pts.append((rel_t, e1))
-                    min_ele = min(min_ele, e1)
-                    max_ele = max(max_ele, e1)
-                    
-                # End interpolation
-                if t1 <= end_t < t2:
-                    ratio = (end_t - t1) / (t2 - t1)
-                    e_end = e1 + (e2 - e1) * ratio
-                    raw_pts.append((video_duration, e_end))
-                    min_ele = min(min_ele, e_end)
-                    max_ele = max(max_ele, e_end)
-                elif t2 <= end_t:
-                    rel_t = t2 - start_t
-                    raw_pts.append((rel_t, e2))
-                    min_ele = min(min_ele, e2)
-                    max_ele = max(max_ele, e2)
-
-            if not raw_pts:
-                self._ele_profile_cache = {'key': cache_key, 'valid': False}
-                return
-
-            # Normalize and draw
-            ele_range = max(10.0, max_ele - min_ele)
-            
-            pts_px = []
-            for t, ele in raw_pts:
-                px = int((t / video_duration) * panel_w)
-                norm_h = (ele - min_ele) / ele_range
-                py = int(panel_h - 10 - norm_h * (panel_h - 20))
-                pts_px.append([px, py])
-            
-            pts_px = np.array(pts_px, np.int32)
-            
-            if len(pts_px) > 1:
-                # Construct closed polygon for filling
-                poly_pts = pts_px.tolist()
-                poly_pts.append([pts_px[-1][0], panel_h]) 
-                poly_pts.append([pts_px[0][0], panel_h])   
-                
-                poly_pts = np.array(poly_pts, np.int32)
-                poly_pts = poly_pts.reshape((-1, 1, 2))
-                
-                # Draw fill
-                cv2.fillPoly(overlay_bgr, [poly_pts], self.config['fill_color'])
-                
-                # Increase opacity of filled area
-                mask = np.zeros((panel_h, panel_w), dtype=np.uint8)
-                cv2.fillPoly(mask, [poly_pts], 255)
-                overlay_alpha[mask > 0] = 0.5
-                
-                # Draw lines
-                cv2.polylines(overlay_bgr, [pts_px.reshape((-1, 1, 2))], False, self.config['line_color'], 2, cv2.LINE_AA)
-                
-                # Make lines opaque (dilate mask)
-                line_mask = np.zeros((panel_h, panel_w), dtype=np.uint8)
-                cv2.polylines(line_mask, [pts_px.reshape((-1, 1, 2))], False, 255, 2)
-                overlay_alpha[line_mask > 0] = 0.8
-
-            self._ele_profile_cache = {
-                'key': cache_key,
-                'valid': True,
-                'bgr': overlay_bgr,
-                'alpha': overlay_alpha,
-                'min_ele': min_ele,
-                'max_ele': max_ele,
-                'ele_range': ele_range
-            }
-            
-        if not self._ele_profile_cache.get('valid', False):
+        # The profile is built in GPX time on a column grid of video_duration / panel_w;
+        # an offset change only shifts the column window that gets rendered.
+        dt = video_duration / panel_w
+        first_col = int(np.floor(gpx_offset / dt + 0.5))
+        profile = self._get_profile(gpx_data, video_duration, panel_w, first_col)
+        if profile is None:
+            return
+        layer = self.cached('window', lambda: self._render_window(profile, first_col, panel_w, panel_h),
+                            rect=(panel_w, panel_h), extra=(profile['key'], first_col))
+        if not layer.get('valid', False):
             return
             
         # 3. Blend Layer
-        overlay_bgr = self._ele_profile_cache['bgr']
-        overlay_alpha = self._ele_profile_cache['alpha']
+        overlay_bgr = layer['bgr']
+        overlay_alpha = layer['alpha']
         
         roi = frame[y_start:y_start+panel_h, x_start:x_start+panel_w]
         
@@ -165,8 +68,8 @@ class ElevationPanel(HudPanel):
         frame[y_start:y_start+panel_h, x_start:x_start+panel_w] = blended
         
         # 4. Draw Cursor
-        min_ele = self._ele_profile_cache['min_ele']
-        ele_range = self._ele_profile_cache['ele_range']
+        min_ele = layer['min_ele']
+        ele_range = layer['ele_range']
         
         current_seconds = data_context.get('current_seconds', 0.0)
         cx = int((current_seconds / video_duration) * panel_w)
@@ -192,3 +95,97 @@ class ElevationPanel(HudPanel):
             
             cv2.putText(frame, "Elevation", (x_start + 5, y_start + 15), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.4 * self.config.get('font_scale', 1.0), self.config['text_color'], 1, cv2.LINE_AA)
+
+    def _get_profile(self, gpx_data, video_duration, panel_w, first_col):
+        """
+        Per-pixel-column min/max/last elevation on a column grid anchored at GPX
+        time 0 (column width = video_duration / panel_w).
+        Only a chunk of three panel widths centred on the visible window is
+        built, so its size does not depend on how long the track is compared to
+        the clip; it is rebuilt when the window leaves the chunk. Column values
+        do not depend on the chunk, so rendered windows stay valid across rebuilds.
+        """
+        times, eles = self._get_series(gpx_data)
+        if times is None:
+            return None
+        key = (self._series_gen, video_duration, panel_w)
+        profile = self._profile
+        if (profile is not None and profile['key'] == key
+                and profile['first'] <= first_col <= profile['first'] + 2 * panel_w):
+            return profile
+
+        dt = video_duration / panel_w
+        first = first_col - panel_w
+        col0, lo, hi, last = column_envelope(times, eles, dt, first, 3 * panel_w)
+        self._profile = {'key': key, 'first': first, 'dt': dt, 'col0': col0, 'lo': lo, 'hi': hi, 'last': last}
+        return self._profile
+
+    def _get_series(self, gpx_data):
+        """Point times and elevations of the track, in segment order (kept per gpx_data)."""
+        if self._series is not None and self._series[0] is gpx_data:
+            return self._series[1:]
+        # A new generation keys profiles and rendered windows of this track
+        self._series_gen += 1
+        segments = gpx_data['segments']
+        if len(segments) == 0:
+            times = eles = None
+        elif hasattr(segments, 'point_column'):
+            times = np.asarray(segments.point_column('time'), dtype=np.float64)
+            eles = np.asarray(segments.point_column('ele'), dtype=np.float64)
+        else:
+            times = np.array([s['start'] for s in segments] + [segments[-1]['end']], dtype=np.float64)
+            eles = np.array([s['ele_start'] for s in segments] + [segments[-1]['ele_end']], dtype=np.float64)
+        self._series = (gpx_data, times, eles)
+        return times, eles
+
+    def _render_window(self, profile, first_col, panel_w, panel_h):
+        """Render the profile columns [first_col, first_col + panel_w) into the panel overlay."""
+        # Columns of the window that the track covers
+        a = first_col - profile['col0']
+        src_a, src_b = max(a, 0), min(a + panel_w, len(profile['lo']))
+        if src_a >= src_b:
+            return {'valid': False}
+        xs = np.arange(src_a - a, src_b - a, dtype=np.int32)
+        lo = profile['lo'][src_a:src_b]
+        hi = profile['hi'][src_a:src_b]
+        last = profile['last'][src_a:src_b]
+        min_ele = float(lo.min())
+        max_ele = float(hi.max())
+        ele_range = max(10.0, max_ele - min_ele)
+
+        overlay_bgr = np.full((panel_h, panel_w, 3), self.config['bg_color'], dtype=np.uint8)
+        overlay_alpha = np.full((panel_h, panel_w), self.config['bg_alpha'], dtype=np.float32)
+
+        def to_py(ele):
+            return (panel_h - 10 - (ele - min_ele) / ele_range * (panel_h - 20)).astype(np.int32)
+
+        y_lo, y_hi, y_last = to_py(lo), to_py(hi), to_py(last)
+        if len(xs) > 1:
+            # Fill under the column maxima
+            top = np.column_stack([xs, y_hi])
+            poly_pts = np.vstack([top, [[xs[-1], panel_h], [xs[0], panel_h]]]).astype(np.int32).reshape((-1, 1, 2))
+            cv2.fillPoly(overlay_bgr, [poly_pts], self.config['fill_color'])
+
+            # Increase opacity of filled area
+            mask = np.zeros((panel_h, panel_w), dtype=np.uint8)
+            cv2.fillPoly(mask, [poly_pts], 255)
+            overlay_alpha[mask > 0] = 0.5
+
+            # Line visits min, max and last of every column: spikes inside a column stay
+            # visible and each column hands over to the next at its last value
+            line_pts = np.stack([np.column_stack([xs, y]) for y in (y_lo, y_hi, y_last)], axis=1).reshape((-1, 1, 2))
+            cv2.polylines(overlay_bgr, [line_pts], False, self.config['line_color'], 2, cv2.LINE_AA)
+
+            # Make lines opaque (dilate mask)
+            line_mask = np.zeros((panel_h, panel_w), dtype=np.uint8)
+            cv2.polylines(line_mask, [line_pts], False, 255, 2)
+            overlay_alpha[line_mask > 0] = 0.8
+
+        return {
+            'valid': True,
+            'bgr': overlay_bgr,
+            'alpha': overlay_alpha,
+            'min_ele': min_ele,
+            'max_ele': max_ele,
+            'ele_range': ele_range
+        }
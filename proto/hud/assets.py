@@ -0,0 +1,174 @@
+# Process-wide cache of decoded HUD assets (gauge backgrounds etc.)
+#
+# Each source image is decoded once per process and handed out as a read-only
+# array, however many panel instances use it. Derived variants (pre-scaled,
+# inpainted backgrounds) are shared in memory; size-independent ones that are
+# expensive to build (e.g. an inpainted native-resolution dial) are also
+# persisted to disk as .npy so later runs skip the processing. Per-size
+# variants are never written, so drag-resizing a gauge does no disk I/O.
+# Decoded images can be published to worker processes through shared memory.
+
+import os
+import hashlib
+import threading
+
+import cv2
+import numpy as np
+
+from .base import PanelCache
+
+try:
+    from ..thumbnail_cache import user_cache_dir
+except (ImportError, ValueError):
+    from thumbnail_cache import user_cache_dir
+
+# Bump when variant builders change so stale files on disk are ignored
+VARIANT_VERSION = 1
+
+
+def _source_key(path):
+    """(abspath, size, mtime_ns) of a source file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+class AssetCache:
+    def __init__(self, cache_dir=None, max_variant_bytes=128 * 1024 * 1024):
+        self.cache_dir = cache_dir or user_cache_dir('hud')
+        self.images = {}
+        self.variants = PanelCache(max_variant_bytes)
+        self.decodes = 0
+        self.disk_hits = 0
+        self.lock = threading.Lock()
+        # SharedMemory handles must stay referenced while their arrays are in use
+        self._shm = []
+        self._attached = set()
+
+    def image(self, path, flags=cv2.IMREAD_UNCHANGED):
+        """Decoded image at path (read-only, shared by all callers), or None if missing/unreadable."""
+        src = _source_key(path)
+        if src is None:
+            return None
+        key = src + (flags,)
+        with self.lock:
+            img = self.images.get(key)
+        if img is not None:
+            return img
+        img = cv2.imread(path, flags)
+        if img is None:
+            return None
+        img.setflags(write=False)
+        with self.lock:
+            self.decodes += 1
+            # Another thread may have decoded it meanwhile; keep the first copy
+            return self.images.setdefault(key, img)
+
+    def variant(self, name, sources, params, builder, persist=False):
+        """
+        Derived asset built from the files in sources with the given params.
+        Looked up in memory, then (if persist) on disk; on a miss builder() is
+        called and, if persist, the result written to disk. Only persist variants
+        whose params do not change interactively (not per target size).
+        params must be a repr-stable tuple of plain values.
+        """
+        srcs = tuple(_source_key(p) for p in sources)
+        key_src = f"{VARIANT_VERSION}|{name}|{srcs!r}|{params!r}"
+        digest = hashlib.sha1(key_src.encode('utf-8')).hexdigest()
+        if not persist:
+            return self.variants.get(digest, lambda: self._build_variant(builder))
+        return self.variants.get(digest, lambda: self._load_variant(name, digest, builder))
+
+    @staticmethod
+    def _build_variant(builder):
+        arr = np.ascontiguousarray(builder())
+        arr.setflags(write=False)
+        return arr
+
+    def _load_variant(self, name, digest, builder):
+        path = os.path.join(self.cache_dir, f"{name}_{digest}.npy")
+        if os.path.exists(path):
+            try:
+                arr = np.load(path)
+                arr.setflags(write=False)
+                self.disk_hits += 1
+                return arr
+            except Exception as e:
+                print(f"Error loading HUD asset variant: {e}")
+        arr = np.ascontiguousarray(builder())
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + f".{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, arr)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error saving HUD asset variant: {e}")
+        arr.setflags(write=False)
+        return arr
+
+    def share(self):
+        """
+        Copy every decoded image into shared memory and return picklable descriptors
+        for attach() in worker processes. The blocks live until close() is called.
+        """
+        from multiprocessing import shared_memory
+
+        descriptors = []
+        with self.lock:
+            items = list(self.images.items())
+        for key, img in items:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, img.nbytes))
+            view = np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)
+            view[:] = img
+            del view
+            self._shm.append((shm, True))
+            descriptors.append((key, shm.name, img.shape, img.dtype.str))
+        return descriptors
+
+    def attach(self, descriptors):
+        """Register images published by share() in another process, without decoding them again."""
+        from multiprocessing import shared_memory
+
+        for key, shm_name, shape, dtype in descriptors:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            img = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+            img.setflags(write=False)
+            self._shm.append((shm, False))
+            with self.lock:
+                self.images[tuple(key)] = img
+                self._attached.add(tuple(key))
+
+    def close(self):
+        """Release shared memory blocks (unlinking the ones this process created)."""
+        with self.lock:
+            for key in self._attached:
+                self.images.pop(key, None)
+            self._attached = set()
+        for shm, owner in self._shm:
+            try:
+                shm.close()
+            except BufferError:
+                # A panel still holds an array backed by this block; the mapping goes away with the process
+                pass
+            if owner:
+                shm.unlink()
+        self._shm = []
+
+    def stats(self):
+        with self.lock:
+            images = len(self.images)
+            image_bytes = sum(img.nbytes for img in self.images.values())
+        return {
+            'images': images,
+            'image_bytes': image_bytes,
+            'decodes': self.decodes,
+            'disk_hits': self.disk_hits,
+            'variants': self.variants.stats(),
+        }
+
+
+# Shared by every panel in the process
+assets = AssetCache()
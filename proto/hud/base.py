@@ -1,8 +1,86 @@
 # Base class for HUD panels
 
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _nbytes(value):
+    """Approximate memory held by a cached value (arrays, possibly nested in dicts/tuples/lists)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+class PanelCache:
+    """Memory-bounded LRU cache for pre-rendered panel layers, with hit/miss stats."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, builder):
+        """Return the value cached under key, calling builder() to create it on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = builder()
+        size = _nbytes(value)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self.entries[key] = (value, size)
+            self.bytes += size
+            # Keep at least the newest entry even if it alone exceeds the budget
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+            }
+
+
 class HudPanel:
+    # Set by @register_panel
+    panel_info = None
+
+    # Memory budget of each panel's layer cache
+    cache_max_bytes = 32 * 1024 * 1024
+
     def __init__(self, config=None):
         self.config = config or {}
+        # Bumped by update_config; part of every cache key built with cached()
+        self.config_version = 0
+        self.panel_cache = PanelCache(self.cache_max_bytes)
         # 默认配置
         self.default_config = {
             'bg_color': (200, 200, 200),
@@ -16,6 +94,14 @@ class HudPanel:
             if k not in self.config:
                 self.config[k] = v
     
+    @property
+    def visible(self):
+        return bool(self.config.get('visible', True))
+
+    @property
+    def info(self):
+        return self.panel_info
+
     def update_config(self, new_config):
         """Update configuration properties"""
         # Ensure colors are tuples for hashability and consistency
@@ -25,15 +111,29 @@ class HudPanel:
                 sanitized[k] = tuple(v)
             else:
                 sanitized[k] = v
+        if any(k not in self.config or self.config[k] != v for k, v in sanitized.items()):
+            self.config_version += 1
         self.config.update(sanitized)
 
+    def cached(self, name, builder, rect=None, scale=None, extra=None):
+        """
+        Return a cached layer, building it with builder() on a miss.
+        The key is (name, config_version, rect, scale, extra), so any update_config
+        call that changes a value invalidates every layer the panel built before it.
+        """
+        return self.panel_cache.get((name, self.config_version, rect, scale, extra), builder)
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters and memory use of the panel's layer cache"""
+        return self.panel_cache.stats()
+
     def draw(self, frame, data_context):
         """
         Draw the HUD panel on the frame.
         :param frame: The video frame (numpy array) to draw on.
         :param data_context: A dictionary containing data needed for drawing (e.g., speed, elevation, gpx_data).
         """
-        if not self.config.get('visible', True):
+        if not self.visible:
             return
         self._draw_impl(frame, data_context)
         
@@ -0,0 +1,136 @@
+# Gauge calibration computed once per source image at native resolution
+#
+# Results (dial centers and radii) are stored in resolution-independent units:
+# x as a fraction of the image width, y and radii as fractions of its height.
+# Panels scale them to any target size analytically instead of re-running
+# detection per size.
+#
+# A sidecar JSON shipped next to the image (<image>.calib.json) is read-only at
+# runtime; it is produced by the explicit build step `python -m hud.calibration`.
+# Results computed at runtime are written only to the user cache dir, never into
+# the package directory.
+
+import os
+import json
+import hashlib
+import threading
+
+try:
+    from ..thumbnail_cache import user_cache_dir
+except (ImportError, ValueError):
+    from thumbnail_cache import user_cache_dir
+
+# Bump when a calibration routine changes so stored results are recomputed
+CALIBRATION_VERSION = 1
+
+_digests = {}
+_lock = threading.Lock()
+
+
+def file_digest(path):
+    """sha1 of the file contents (memoized by path, size and mtime)."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _lock:
+        digest = _digests.get(key)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _lock:
+            _digests[key] = digest
+    return digest
+
+
+def shipped_sidecar_path(image_path):
+    """Read-only sidecar shipped next to the image (written only by build_sidecar)."""
+    return image_path + '.calib.json'
+
+
+def cache_sidecar_path(image_path):
+    """Sidecar in the user cache dir, where results computed at runtime are stored."""
+    digest = file_digest(image_path)
+    name = os.path.basename(image_path)
+    return os.path.join(user_cache_dir('hud', 'calibration'), f"{name}_{digest[:16]}.calib.json")
+
+
+def _read(path, digest):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != CALIBRATION_VERSION or data.get('sha1') != digest:
+        return None
+    return data
+
+
+def _entry_key(kind, params):
+    return f"{kind}|{json.dumps(params, sort_keys=True)}"
+
+
+def _write(path, digest, entry_key, result):
+    """Add one entry to the sidecar at path (atomic replace). Returns True on success."""
+    data = _read(path, digest) or {'version': CALIBRATION_VERSION, 'sha1': digest, 'entries': {}}
+    data['entries'][entry_key] = result
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        print(f"Error saving gauge calibration: {e}")
+        return False
+
+
+def load_or_compute(image_path, kind, params, compute):
+    """
+    Calibration of the given kind for image_path.
+    params (JSON-serializable) are the inputs of the routine, e.g. approximate dial
+    positions; results are stored per (kind, params). compute() is called only when
+    neither the shipped sidecar nor the user cache has a matching result, and must
+    return a JSON-serializable dict; it is then saved to the user cache.
+    Returns None if the image does not exist.
+    """
+    if not image_path or not os.path.exists(image_path):
+        return None
+    digest = file_digest(image_path)
+    entry_key = _entry_key(kind, params)
+    cache_path = cache_sidecar_path(image_path)
+    for path in (shipped_sidecar_path(image_path), cache_path):
+        data = _read(path, digest)
+        if data is not None and entry_key in data['entries']:
+            return data['entries'][entry_key]
+
+    result = compute()
+    _write(cache_path, digest, entry_key, result)
+    return result
+
+
+def build_sidecar(image_path, kind, params, compute):
+    """Build step: compute the calibration and store it in the shipped sidecar next to the image."""
+    result = compute()
+    _write(shipped_sidecar_path(image_path), file_digest(image_path), _entry_key(kind, params), result)
+    return result
+
+
+def main():
+    """Regenerate the shipped sidecars of every registered panel that declares calibration_requests()."""
+    from .registry import panel_names, load_panel_class
+    for name in panel_names():
+        cls = load_panel_class(name)
+        requests = getattr(cls, 'calibration_requests', None)
+        if requests is None:
+            continue
+        for image_path, kind, params, compute in requests(cls()):
+            if image_path and os.path.exists(image_path):
+                build_sidecar(image_path, kind, params, compute)
+                print(f"{name}: {shipped_sidecar_path(image_path)} [{kind}]")
+
+
+if __name__ == '__main__':
+    main()
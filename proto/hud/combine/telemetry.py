@@ -4,7 +4,9 @@ import math
 import numpy as np
 import cv2
 from ..base import HudPanel
+from ..registry import register_panel
 
+@register_panel('telemetry', requires=('rect', 'speed', 'ele', 'grade'))
 class TelemetryPanel(HudPanel):
     def __init__(self, config=None):
         super().__init__(config)
@@ -0,0 +1,55 @@
+# Per-pixel-column decimation of time series for profile-style panels
+
+import numpy as np
+
+
+def column_envelope(times, values, dt, first=None, count=None):
+    """
+    Reduce a time series to per-column min/max/last envelopes on a grid of
+    columns of width dt anchored at time 0 (column k covers [k*dt, (k+1)*dt)).
+
+    Points are grouped into columns with a single np.*.reduceat pass, so the
+    result (and anything drawn from it) has one entry per column regardless of
+    how many points the series has. Columns with no point of their own (sparse
+    series, zoomed-in grid) take the value interpolated at the column centre.
+
+    With first/count only columns [first, first + count) are built (clipped to
+    the series), so the result stays bounded however long the series is
+    compared to dt; values are the same as in the full envelope.
+
+    :return: (col0, lo, hi, last) where col0 is the index of the first column;
+             arrays are None when the series is empty.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(times) == 0:
+        return 0, None, None, None
+    if np.any(np.diff(times) < 0):
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+
+    col0 = int(np.floor(times[0] / dt))
+    col_end = int(np.floor(times[-1] / dt)) + 1
+    if first is not None:
+        col0 = max(col0, first)
+        col_end = max(col0, min(col_end, first + count))
+    n_cols = col_end - col0
+
+    # Points of the column range (one column of slack for rounding, then exact by column index)
+    i0 = int(np.searchsorted(times, (col0 - 1) * dt))
+    i1 = int(np.searchsorted(times, (col_end + 1) * dt))
+    cols = np.floor(times[i0:i1] / dt).astype(np.int64) - col0
+    a, b = np.searchsorted(cols, (0, n_cols))
+    cols, sub = cols[a:b], values[i0 + a:i0 + b]
+
+    centers = (np.arange(n_cols) + col0 + 0.5) * dt
+    fill = np.interp(centers, times, values)
+    lo, hi, last = fill.copy(), fill.copy(), fill.copy()
+    if len(cols):
+        # Start index of each run of points sharing a column
+        starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+        occupied = cols[starts]
+        lo[occupied] = np.minimum.reduceat(sub, starts)
+        hi[occupied] = np.maximum.reduceat(sub, starts)
+        last[occupied] = sub[np.r_[starts[1:], len(sub)] - 1]
+    return col0, lo, hi, last
@@ -0,0 +1,168 @@
+# HUD panel registry
+#
+# PANELS is an explicit, import-free manifest of the built-in panels (entry name
+# -> module, class and metadata), so panels are looked up by entry name and their
+# module is imported only when the panel is first needed (drawn while visible,
+# or its full config is requested). Startup does not pay for panels that stay
+# hidden, and the renderer can ask which data fields the visible panels need
+# without loading the hidden ones. Each panel class also declares the same
+# metadata with @register_panel(name, requires=..., layers=..., cost=...);
+# tests/test_hud_registry.py checks that the two agree.
+
+import importlib
+from collections import namedtuple
+
+# name: entry name; module: module path relative to the hud package; requires: data
+# context fields the panel reads; layers: 'static' (cacheable background) and/or
+# 'dynamic' (redrawn every frame); cost: 'low' / 'medium' / 'high' per-frame cost hint
+PanelInfo = namedtuple('PanelInfo', 'name module class_name requires layers cost')
+
+
+def _make_info(module, class_name, name, requires=(), layers=('dynamic',), cost='low'):
+    return PanelInfo(name, module, class_name, tuple(requires), tuple(layers), cost)
+
+
+# Built-in panels, ordered by sub-package and module
+PANELS = {info.name: info for info in (
+    _make_info('altitude.elevation', 'ElevationPanel', 'elevation',
+               requires=('rect', 'current_seconds', 'gpx_data', 'video_duration', 'gpx_offset', 'ele'),
+               layers=('static', 'dynamic'), cost='medium'),
+    _make_info('combine.telemetry', 'TelemetryPanel', 'telemetry',
+               requires=('rect', 'speed', 'ele', 'grade'), layers=('dynamic',), cost='low'),
+    _make_info('speed.back', 'BackPanel', 'back',
+               requires=('rect', 'speed'), layers=('static', 'dynamic'), cost='medium'),
+    _make_info('speed.black2_speed', 'Black2SpeedPanel', 'black2_speed',
+               requires=('rect', 'speed'), layers=('static', 'dynamic'), cost='medium'),
+    _make_info('speed.black_speed', 'BlackSpeedPanel', 'black_speed',
+               requires=('rect', 'speed'), layers=('static', 'dynamic'), cost='medium'),
+    _make_info('speed.porsche911', 'Porsche911Panel', 'porsche911',
+               requires=('rect', 'speed'), layers=('static', 'dynamic'), cost='medium'),
+    _make_info('speed.speedometer', 'SpeedometerPanel', 'speedometer',
+               requires=('rect', 'speed'), layers=('dynamic',), cost='low'),
+    _make_info('speed.white_speed', 'WhiteSpeedPanel', 'white_speed',
+               requires=('rect', 'speed'), layers=('static', 'dynamic'), cost='medium'),
+    _make_info('track.track', 'TrackPanel', 'track',
+               requires=('rect', 'gpx_data', 'current_seconds', 'gpx_offset', 'smooth_lats', 'smooth_lons',
+                         'last_idx', 'current_state'),
+               layers=('dynamic',), cost='medium'),
+)}
+
+
+def register_panel(name, requires=(), layers=('dynamic',), cost='low'):
+    """
+    Class decorator declaring a HUD panel and its metadata.
+    Built-in panels must also be listed in PANELS; a panel defined elsewhere is
+    added to the registry when its module is imported.
+    """
+    def decorator(cls):
+        module = cls.__module__
+        prefix = __package__ + '.'
+        if module.startswith(prefix):
+            module = module[len(prefix):]
+        cls.panel_info = _make_info(module, cls.__name__, name, requires, layers, cost)
+        PANELS.setdefault(name, cls.panel_info)
+        return cls
+    return decorator
+
+
+def panel_entries():
+    """Registered panels by entry name, ordered by sub-package and module."""
+    return PANELS
+
+
+def panel_names():
+    return list(panel_entries())
+
+
+def panel_info(name):
+    return panel_entries()[name]
+
+
+def load_panel_class(name):
+    """Import the module of a registered panel and return its class."""
+    info = panel_entries()[name]
+    module = importlib.import_module('.' + info.module, __package__)
+    return getattr(module, info.class_name)
+
+
+def required_fields(panels):
+    """
+    Union of the data fields required by the visible panels (hidden ones are not loaded).
+    None if a visible panel was not declared with @register_panel, i.e. it may read anything.
+    """
+    fields = set()
+    for panel in panels:
+        if panel.visible:
+            info = panel.info
+            if info is None:
+                return None
+            fields.update(info.requires)
+    return fields
+
+
+class LazyPanel:
+    """
+    Stand-in for a registered panel until it is first needed.
+    Config updates made before that are kept and applied on creation; the
+    visibility flag is answered from them so hidden panels are never imported.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.panel = None
+        self.pending_config = {}
+
+    @property
+    def info(self):
+        return panel_info(self.name)
+
+    @property
+    def loaded(self):
+        return self.panel is not None
+
+    def load(self):
+        if self.panel is None:
+            panel = load_panel_class(self.name)()
+            if self.pending_config:
+                panel.update_config(self.pending_config)
+            self.panel = panel
+            self.pending_config = {}
+        return self.panel
+
+    @property
+    def visible(self):
+        if self.panel is not None:
+            return self.panel.visible
+        return bool(self.pending_config.get('visible', True))
+
+    @property
+    def config(self):
+        return self.load().config
+
+    def saved_config(self):
+        """Config to persist: the full config once loaded, otherwise the overrides received so far."""
+        if self.panel is not None:
+            return self.panel.config
+        return dict(self.pending_config)
+
+    def update_config(self, new_config):
+        if self.panel is not None:
+            self.panel.update_config(new_config)
+        else:
+            self.pending_config.update(new_config)
+
+    def draw(self, frame, data_context):
+        if not self.visible:
+            return
+        self.load().draw(frame, data_context)
+
+    def __getattr__(self, attr):
+        # Anything else (cache_stats, panel-specific helpers) needs the real panel
+        if attr in ('name', 'panel', 'pending_config'):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+
+def create_panels(names=None):
+    """Lazy panels for the given entry names (all registered panels by default), in order."""
+    return {name: LazyPanel(name) for name in (names or panel_names())}
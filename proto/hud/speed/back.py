@@ -3,8 +3,14 @@ import cv2
 import numpy as np
 import os
 from ..base import HudPanel
+from ..registry import register_panel
+from ..assets import assets
 
+@register_panel('back', requires=('rect', 'speed'), layers=('static', 'dynamic'), cost='medium')
 class BackPanel(HudPanel):
+    # Config values the processed background depends on (part of its disk cache key)
+    bg_variant_keys = ('inpaint_enabled', 'inpaint_radius_ratio', 'inpaint_angle', 'inpaint_thickness_ratio')
+
     def __init__(self, config=None):
         super().__init__(config)
         default_path = os.path.join(os.path.dirname(__file__), 'back.png')
@@ -28,20 +34,22 @@ class BackPanel(HudPanel):
             'inpaint_thickness_ratio': 0.08
         })
         self.bg_image = None
-        self.bg_cache = {}
 
     def _load_bg(self, size):
-        if size in self.bg_cache:
-            return self.bg_cache[size]
+        sources = (self.config.get('bg_image_path'),)
+        params = (size,) + tuple(self.config.get(k) for k in self.bg_variant_keys)
+        return self.cached('bg', lambda: assets.variant('back_bg', sources, params, lambda: self._build_bg(size)),
+                           scale=size)
+
+    def _build_bg(self, size):
         if self.bg_image is None:
             path = self.config.get('bg_image_path')
             if path and os.path.exists(path):
-                img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                img = assets.image(path)
                 if img is not None:
                     self.bg_image = img
         if self.bg_image is None:
             out = np.zeros((size, size, 3), dtype=np.uint8)
-            self.bg_cache[size] = out
             return out
         h, w = self.bg_image.shape[:2]
         crop = self.bg_image
@@ -82,7 +90,6 @@ class BackPanel(HudPanel):
             cv2.circle(mask, (size//2, size//2), int(size*0.49), 255, -1)
             alpha = cv2.bitwise_and(alpha, mask)
             final = np.dstack((bgr, alpha))
-        self.bg_cache[size] = final
         return final
 
     def _draw_impl(self, frame, data_context):
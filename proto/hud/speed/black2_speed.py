@@ -4,10 +4,17 @@ import cv2
 import numpy as np
 try:
     from .base import HudPanel
+    from .registry import register_panel
 except ImportError:
     from ..base import HudPanel
+    from ..registry import register_panel
+try:
+    from .assets import assets
+except ImportError:
+    from ..assets import assets
 
 
+@register_panel("black2_speed", requires=("rect", "speed"), layers=("static", "dynamic"), cost="medium")
 class Black2SpeedPanel(HudPanel):
     def __init__(self, config=None):
         super().__init__(config)
@@ -34,7 +41,6 @@ class Black2SpeedPanel(HudPanel):
             "led_radius_ratio": 0.014
         })
         self.bg_image = None
-        self.bg_cache = {}
 
     @staticmethod
     def _lerp_color(c1, c2, a):
@@ -68,18 +74,20 @@ class Black2SpeedPanel(HudPanel):
         )
 
     def _load_bg(self, size):
-        cached = self.bg_cache.get(size)
-        if cached is not None:
-            return cached
+        sources = (self.config.get("bg_image_path"),)
+        params = (size,)
+        return self.cached("bg", lambda: assets.variant("black2_bg", sources, params, lambda: self._build_bg(size)),
+                           scale=size)
+
+    def _build_bg(self, size):
         if self.bg_image is None:
             path = self.config.get("bg_image_path")
             if path and os.path.exists(path):
-                img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                img = assets.image(path)
                 if img is not None:
                     self.bg_image = img
         if self.bg_image is None:
             out = np.zeros((size, size, 4), dtype=np.uint8)
-            self.bg_cache[size] = out
             return out
         h, w = self.bg_image.shape[:2]
         crop = self.bg_image
@@ -103,7 +111,6 @@ class Black2SpeedPanel(HudPanel):
         else:
             alpha = cv2.bitwise_and(alpha, mask_circle)
         final = np.dstack((bgr, alpha))
-        self.bg_cache[size] = final
         return final
 
     def _draw_impl(self, frame, data_context):
@@ -4,11 +4,21 @@ import cv2
 import numpy as np
 try:
     from .base import HudPanel
+    from .registry import register_panel
 except ImportError:
     from ..base import HudPanel
+    from ..registry import register_panel
+try:
+    from .assets import assets
+except ImportError:
+    from ..assets import assets
 
 
+@register_panel("black_speed", requires=("rect", "speed"), layers=("static", "dynamic"), cost="medium")
 class BlackSpeedPanel(HudPanel):
+    # Config values the processed background depends on (part of its disk cache key)
+    bg_variant_keys = ("inpaint_enabled", "inpaint_radius_ratio", "inpaint_angle", "inpaint_wedge_width")
+
     def __init__(self, config=None):
         super().__init__(config)
         self.config.update({
@@ -31,29 +41,29 @@ class BlackSpeedPanel(HudPanel):
         })
         self.bg_image = None
         self.bg_clean_image = None
-        self.bg_cache = {}
 
     def _load_bg(self, size):
-        cached = self.bg_cache.get(size)
-        if cached is not None:
-            return cached
+        sources = (self.config.get("bg_image_path"), self.config.get("bg_clean_image_path"))
+        params = (size,) + tuple(self.config.get(k) for k in self.bg_variant_keys)
+        return self.cached("bg", lambda: assets.variant("black_bg", sources, params, lambda: self._build_bg(size)),
+                           scale=size)
 
+    def _build_bg(self, size):
         if self.bg_image is None:
             path = self.config.get("bg_image_path")
             if path and os.path.exists(path):
-                img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                img = assets.image(path)
                 if img is not None:
                     self.bg_image = img
         if self.bg_clean_image is None:
             clean_path = self.config.get("bg_clean_image_path")
             if clean_path and os.path.exists(clean_path):
-                img = cv2.imread(clean_path, cv2.IMREAD_UNCHANGED)
+                img = assets.image(clean_path)
                 if img is not None:
                     self.bg_clean_image = img
 
         if self.bg_image is None:
             out = np.zeros((size, size, 4), dtype=np.uint8)
-            self.bg_cache[size] = out
             return out
 
         h, w = self.bg_image.shape[:2]
@@ -122,7 +132,6 @@ class BlackSpeedPanel(HudPanel):
             alpha = cv2.bitwise_and(alpha, mask_circle)
 
         final = np.dstack((bgr, alpha))
-        self.bg_cache[size] = final
         return final
 
     def _draw_impl(self, frame, data_context):
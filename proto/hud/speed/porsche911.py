@@ -3,8 +3,14 @@ import cv2
 import numpy as np
 import os
 from ..base import HudPanel
+from ..registry import register_panel
+from ..assets import assets
 
+@register_panel('porsche911', requires=('rect', 'speed'), layers=('static', 'dynamic'), cost='medium')
 class Porsche911Panel(HudPanel):
+    # Config values the processed background depends on (part of its disk cache key)
+    bg_variant_keys = ('inpaint_enabled', 'inpaint_radius_ratio', 'inpaint_angle', 'inpaint_wedge_width')
+
     def __init__(self, config=None):
         super().__init__(config)
         self.config.update({
@@ -27,19 +33,64 @@ class Porsche911Panel(HudPanel):
         
         self.bg_image = None
         self.bg_clean_image = None
-        self.bg_cache = {} # Key: size_tuple, Value: processed_image
 
     def _load_and_process_bg(self, size):
-        if size in self.bg_cache:
-            return self.bg_cache[size]
+        sources = (self.config.get('bg_image_path'), self.config.get('bg_clean_image_path'))
+        params = (size,) + tuple(self.config.get(k) for k in self.bg_variant_keys)
+        return self.cached('bg', lambda: assets.variant('911_bg', sources, params, lambda: self._build_bg(size)),
+                           scale=size)
+
+    def _needle_mask(self, size):
+        """Static needle mask for a square dial crop of the given size (geometry from config)"""
+        mask = np.zeros((size, size), dtype=np.uint8)
+        center = (size // 2, size // 2)
+        # Needle rests at 'inpaint_angle' (e.g. 0 speed position); limit radius so we don't touch the bright metallic ring
+        radius = int(size * float(self.config.get('inpaint_radius_ratio', 0.35)))
+        angle = float(self.config.get('inpaint_angle', 135.0))
+        wedge_w = float(self.config.get('inpaint_wedge_width', 6.0))
+        # Narrow wedge around the resting angle, plus the center cap area
+        ang1, ang2 = math.radians(angle - wedge_w / 2.0), math.radians(angle + wedge_w / 2.0)
+        p1 = (int(center[0] + radius * math.cos(ang1)), int(center[1] + radius * math.sin(ang1)))
+        p2 = (int(center[0] + radius * math.cos(ang2)), int(center[1] + radius * math.sin(ang2)))
+        cv2.fillConvexPoly(mask, np.array([center, p1, p2], np.int32), 255, cv2.LINE_AA)
+        cv2.circle(mask, center, int(size * 0.1), 255, -1)
+        return mask
+
+    def _inpainted_crop(self, crop):
+        """Native-resolution dial crop with the static needle inpainted (built once, kept on disk)"""
+        params = (crop.shape,) + tuple(self.config.get(k) for k in self.bg_variant_keys)
+
+        def build():
+            bgr = np.ascontiguousarray(crop[:, :, :3])
+            try:
+                bgr = cv2.inpaint(bgr, self._needle_mask(crop.shape[0]), 2, cv2.INPAINT_TELEA)
+            except Exception:
+                pass  # Inpainting might fail if libraries missing
+            return np.dstack((bgr, crop[:, :, 3])) if crop.shape[2] == 4 else bgr
+
+        return assets.variant('911_inpainted', (self.config.get('bg_image_path'),), params, build, persist=True)
+
+    @staticmethod
+    def _mip(name, crop, source, params, size):
+        """crop halved (INTER_AREA) while it stays at least twice size, so per-size resizes
+        start from a nearby level instead of the native image (levels kept in memory)"""
+        level, img = 0, crop
+        while img.shape[0] // 2 >= 2 * size:
+            level += 1
+            prev = img
+            img = assets.variant(name, (source,), (crop.shape, level) + params,
+                                 lambda prev=prev: cv2.resize(prev, (prev.shape[1] // 2, prev.shape[0] // 2),
+                                                              interpolation=cv2.INTER_AREA))
+        return img
 
+    def _build_bg(self, size):
         if self.bg_image is None:
             path = self.config.get('bg_image_path')
             if path and os.path.exists(path):
                 try:
                     # Read image with alpha channel if possible, but cv2.imread usually reads BGR
                     # We assume the image is a standard photo/scan (BGR)
-                    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                    img = assets.image(path)
                     if img is not None:
                         self.bg_image = img
                 except Exception as e:
@@ -49,7 +100,7 @@ class Porsche911Panel(HudPanel):
             clean_path = self.config.get('bg_clean_image_path')
             if clean_path and os.path.exists(clean_path):
                 try:
-                    img = cv2.imread(clean_path, cv2.IMREAD_UNCHANGED)
+                    img = assets.image(clean_path)
                     if img is not None:
                         self.bg_clean_image = img
                 except Exception:
@@ -58,7 +109,6 @@ class Porsche911Panel(HudPanel):
         if self.bg_image is None:
             # Fallback to black square if image missing
             fallback = np.zeros((size, size, 3), dtype=np.uint8)
-            self.bg_cache[size] = fallback
             return fallback
 
         # Process image
@@ -71,6 +121,7 @@ class Porsche911Panel(HudPanel):
         y1 = cy - crop_size // 2
         crop = self.bg_image[y1:y1+crop_size, x1:x1+crop_size]
         crop_clean = None
+        needle_removed = False
         if self.bg_clean_image is not None:
             hc, wc = self.bg_clean_image.shape[:2]
             crop_size_c = min(hc, wc)
@@ -78,11 +129,20 @@ class Porsche911Panel(HudPanel):
             x1c = cxc - crop_size_c // 2
             y1c = cyc - crop_size_c // 2
             crop_clean = self.bg_clean_image[y1c:y1c+crop_size_c, x1c:x1c+crop_size_c]
+        elif self.config.get('inpaint_enabled', True):
+            # No clean plate: inpaint the static needle once at native resolution, nothing left to do per size
+            crop = self._inpainted_crop(crop)
+            needle_removed = True
         
-        # 2. Resize to target size
+        # 2. Resize to target size (from the nearest mip level of the native crop)
+        # The inpainted crop depends on the inpaint config, the raw crops only on their source files
+        mip_params = tuple(self.config.get(k) for k in self.bg_variant_keys) if needle_removed else ()
+        crop = self._mip('911_mip_inpainted' if needle_removed else '911_mip', crop,
+                         self.config.get('bg_image_path'), mip_params, size)
         resized = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
         resized_clean = None
         if crop_clean is not None and crop_clean.size > 0:
+            crop_clean = self._mip('911_mip_clean', crop_clean, self.config.get('bg_clean_image_path'), (), size)
             resized_clean = cv2.resize(crop_clean, (size, size), interpolation=cv2.INTER_AREA)
         
         # Handle Alpha if present
@@ -102,29 +162,10 @@ class Porsche911Panel(HudPanel):
                 bgr_clean = resized_clean
 
         # 3. Inpaint the static needle if enabled
-        if self.config.get('inpaint_enabled', True):
-            # Create a mask for the needle position
-            # Assuming needle is at 'inpaint_angle' (e.g., 0 speed position)
-            mask = np.zeros((size, size), dtype=np.uint8)
-            
-            center = (size // 2, size // 2)
-            # Limit radius so we don't touch the bright metallic ring
-            radius = int(size * self.config.get('inpaint_radius_ratio', 0.35))
-            angle = self.config.get('inpaint_angle', 135.0)
-            wedge_w = self.config.get('inpaint_wedge_width', 6.0)
-            
-            # Draw a narrow wedge (two lines at +/- wedge_w/2) with small thickness
-            # Use a poly to better control covered area
-            ang1 = math.radians(angle - wedge_w / 2.0)
-            ang2 = math.radians(angle + wedge_w / 2.0)
-            p1 = (int(center[0] + radius * math.cos(ang1)), int(center[1] + radius * math.sin(ang1)))
-            p2 = (int(center[0] + radius * math.cos(ang2)), int(center[1] + radius * math.sin(ang2)))
-            cv2.fillConvexPoly(mask, np.array([center, p1, p2], np.int32), 255, cv2.LINE_AA)
-            
-            # Also cover the center cap area slightly more
-            cap_r = int(size * 0.1)
-            cv2.circle(mask, center, cap_r, 255, -1)
-            
+        if self.config.get('inpaint_enabled', True) and not needle_removed:
+            # Mask over the static needle, scaled from the calibrated geometry
+            mask = self._needle_mask(size)
+
             if bgr_clean is not None and bgr_clean.shape[:2] == bgr.shape[:2]:
                 m = mask.astype(bool)
                 bgr[m] = bgr_clean[m]
@@ -149,7 +190,6 @@ class Porsche911Panel(HudPanel):
             cv2.circle(mask_circle, (size//2, size//2), int(size*0.49), 255, -1)
             final_img = np.dstack((bgr, mask_circle))
             
-        self.bg_cache[size] = final_img
         return final_img
 
     def _draw_impl(self, frame, data_context):
@@ -1,8 +1,10 @@
 import math
 import cv2
 from ..base import HudPanel
+from ..registry import register_panel
 
 
+@register_panel('speedometer', requires=('rect', 'speed'))
 class SpeedometerPanel(HudPanel):
     def __init__(self, config=None):
         super().__init__(config)
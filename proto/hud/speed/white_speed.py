@@ -4,11 +4,23 @@ import cv2
 import numpy as np
 try:
     from .base import HudPanel
+    from .registry import register_panel
 except ImportError:
     from ..base import HudPanel
+    from ..registry import register_panel
+try:
+    from .assets import assets
+    from . import calibration
+except ImportError:
+    from ..assets import assets
+    from .. import calibration
 
 
+@register_panel("white_speed", requires=("rect", "speed"), layers=("static", "dynamic"), cost="medium")
 class WhiteSpeedPanel(HudPanel):
+    # Config values the processed background depends on besides dial geometry (part of its disk cache key)
+    bg_variant_keys = ("inpaint_enabled", "inpaint_wedge_width", "inpaint_radius_ratio", "inpaint_left_angle", "inpaint_right_angle")
+
     def __init__(self, config=None):
         super().__init__(config)
         self.config.update({
@@ -41,20 +53,98 @@ class WhiteSpeedPanel(HudPanel):
         })
         self.bg_image = None
         self.bg_clean_image = None
-        self.bg_cache = {}
-        self._auto_done_key = None
+
+    def _dial_geometry(self):
+        """Dial centers (fractions of width/height) and radius (fraction of height), auto-calibrated when enabled"""
+        return self.cached("dials", self._calibrate_dials)
+
+    def _calibrate_dials(self):
+        geo = {
+            "dial_left_center": tuple(self.config.get("dial_left_center", (0.25, 0.5))),
+            "dial_right_center": tuple(self.config.get("dial_right_center", (0.75, 0.5))),
+            "dial_radius_ratio": float(self.config.get("dial_radius_ratio", 0.40)),
+        }
+        if not bool(self.config.get("auto_calibrate", True)):
+            return geo
+        try:
+            calib = calibration.load_or_compute(*self.calibration_requests()[0])
+        except Exception as e:
+            print(f"Error calibrating white gauge: {e}")
+            calib = None
+        if calib:
+            geo["dial_left_center"] = tuple(calib["dial_left_center"])
+            geo["dial_right_center"] = tuple(calib["dial_right_center"])
+            geo["dial_radius_ratio"] = float(calib["dial_radius_ratio"])
+        return geo
+
+    def calibration_requests(self):
+        """(image_path, kind, params, compute) of each calibration this panel uses (see hud.calibration)"""
+        path = self.config.get("bg_image_path")
+        left = tuple(self.config.get("dial_left_center", (0.25, 0.5)))
+        right = tuple(self.config.get("dial_right_center", (0.75, 0.5)))
+        params = {"left": list(left), "right": list(right)}
+        return [(path, "white_dials", params, lambda: self._detect_dials(assets.image(path), left, right))]
+
+    @staticmethod
+    def _detect_dials(img, approx_left, approx_right):
+        """Locate both dial hubs with HoughCircles on the native-resolution image ({} if either is not found)"""
+        if img is None:
+            return {}
+        h, w = img.shape[:2]
+        gray = cv2.cvtColor(img[:, :, :3], cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (7, 7), 1.5)
+
+        def detect_center(approx_cx_ratio):
+            cx0 = int(w * float(approx_cx_ratio))
+            cy0 = int(h * float(approx_left[1]))
+            win_w = int(w * 0.28)
+            win_h = int(h * 0.6)
+            x1 = max(0, cx0 - win_w // 2)
+            y1 = max(0, cy0 - win_h // 2)
+            x2 = min(w, x1 + win_w)
+            y2 = min(h, y1 + win_h)
+            roi = gray[y1:y2, x1:x2]
+            if roi.size == 0:
+                return None
+            rmin = max(4, int(min(roi.shape[:2]) * 0.05))
+            rmax = max(rmin + 1, int(min(roi.shape[:2]) * 0.16))
+            circles = cv2.HoughCircles(roi, cv2.HOUGH_GRADIENT, dp=1.2, minDist=int(min(roi.shape[:2]) * 0.8), param1=120, param2=18, minRadius=rmin, maxRadius=rmax)
+            if circles is not None and len(circles[0]) >= 1:
+                c = circles[0][0]
+                return (int(c[0]) + x1, int(c[1]) + y1, int(c[2]))
+            return None
+
+        left_c = detect_center(approx_left[0])
+        right_c = detect_center(approx_right[0])
+        if not (left_c and right_c):
+            return {}
+        lx, ly, lr = left_c
+        rx, ry, rr = right_c
+        dial_r = max(lr, rr) * 5
+        return {
+            "dial_left_center": [lx / float(w), ly / float(h)],
+            "dial_right_center": [rx / float(w), ry / float(h)],
+            "dial_radius_ratio": max(0.1, min(0.7, dial_r / float(h))),
+        }
 
     def _load_bg(self, target_h):
+        geo = self._dial_geometry()
+        sources = (self.config.get("bg_image_path"), self.config.get("bg_clean_image_path"))
+        params = (target_h, tuple(sorted(geo.items()))) + tuple(self.config.get(k) for k in self.bg_variant_keys)
+        return self.cached("bg", lambda: assets.variant("white_bg", sources, params, lambda: self._build_bg(target_h, geo)),
+                           scale=target_h)
+
+    def _build_bg(self, target_h, geo):
         if self.bg_image is None:
             path = self.config.get("bg_image_path")
             if path and os.path.exists(path):
-                img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+                img = assets.image(path)
                 if img is not None:
                     self.bg_image = img
         if self.bg_clean_image is None:
             clean_path = self.config.get("bg_clean_image_path")
             if clean_path and os.path.exists(clean_path):
-                img = cv2.imread(clean_path, cv2.IMREAD_UNCHANGED)
+                img = assets.image(clean_path)
                 if img is not None:
                     self.bg_clean_image = img
 
@@ -64,11 +154,6 @@ class WhiteSpeedPanel(HudPanel):
 
         h0, w0 = self.bg_image.shape[:2]
         target_w = max(1, int(round(target_h * (w0 / max(1, h0)))))
-        key = (target_w, target_h)
-        cached = self.bg_cache.get(key)
-        if cached is not None:
-            return cached
-
         resized = cv2.resize(self.bg_image, (target_w, target_h), interpolation=cv2.INTER_AREA)
         resized_clean = None
         if self.bg_clean_image is not None:
@@ -88,48 +173,8 @@ class WhiteSpeedPanel(HudPanel):
             else:
                 bgr_clean = resized_clean
 
-        auto_key = (target_w, target_h)
-        if bool(self.config.get("auto_calibrate", True)) and self._auto_done_key != auto_key:
-            try:
-                gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
-                gray = cv2.GaussianBlur(gray, (7, 7), 1.5)
-                def detect_center(approx_cx_ratio):
-                    cx0 = int(target_w * float(approx_cx_ratio))
-                    cy0 = int(target_h * float(self.config.get("dial_left_center", (0.25, 0.5))[1]))
-                    win_w = int(target_w * 0.28)
-                    win_h = int(target_h * 0.6)
-                    x1 = max(0, cx0 - win_w // 2)
-                    y1 = max(0, cy0 - win_h // 2)
-                    x2 = min(target_w, x1 + win_w)
-                    y2 = min(target_h, y1 + win_h)
-                    roi = gray[y1:y2, x1:x2]
-                    if roi.size == 0:
-                        return None
-                    rmin = max(4, int(min(roi.shape[:2]) * 0.05))
-                    rmax = max(rmin + 1, int(min(roi.shape[:2]) * 0.16))
-                    circles = cv2.HoughCircles(roi, cv2.HOUGH_GRADIENT, dp=1.2, minDist=int(min(roi.shape[:2]) * 0.8), param1=120, param2=18, minRadius=rmin, maxRadius=rmax)
-                    if circles is not None and len(circles[0]) >= 1:
-                        c = circles[0][0]
-                        cx = int(c[0]) + x1
-                        cy = int(c[1]) + y1
-                        r = int(c[2])
-                        return (cx, cy, r)
-                    return None
-                left_c = detect_center(self.config.get("dial_left_center", (0.25, 0.5))[0])
-                right_c = detect_center(self.config.get("dial_right_center", (0.75, 0.5))[0])
-                if left_c and right_c:
-                    lx, ly, lr = left_c
-                    rx, ry, rr = right_c
-                    self.config["dial_left_center"] = (lx / float(target_w), ly / float(target_h))
-                    self.config["dial_right_center"] = (rx / float(target_w), ry / float(target_h))
-                    dial_r = max(lr, rr) * 5
-                    self.config["dial_radius_ratio"] = max(0.1, min(0.7, dial_r / float(target_h)))
-                    self._auto_done_key = auto_key
-            except Exception:
-                pass
-
         if bool(self.config.get("inpaint_enabled", True)):
-            dial_r = int(target_h * float(self.config.get("dial_radius_ratio", 0.40)))
+            dial_r = int(target_h * float(geo["dial_radius_ratio"]))
             radius = int(dial_r * float(self.config.get("inpaint_radius_ratio", 0.45)))
             wedge_w = float(self.config.get("inpaint_wedge_width", 10.0))
 
@@ -153,11 +198,10 @@ class WhiteSpeedPanel(HudPanel):
                     except Exception:
                         pass
 
-            apply_clean(self.config.get("dial_left_center", (0.25, 0.5)), float(self.config.get("inpaint_left_angle", 330.0)))
-            apply_clean(self.config.get("dial_right_center", (0.75, 0.5)), float(self.config.get("inpaint_right_angle", 225.0)))
+            apply_clean(geo["dial_left_center"], float(self.config.get("inpaint_left_angle", 330.0)))
+            apply_clean(geo["dial_right_center"], float(self.config.get("inpaint_right_angle", 225.0)))
 
         final = np.dstack((bgr, alpha))
-        self.bg_cache[key] = final
         return final
 
     @staticmethod
@@ -213,11 +257,12 @@ class WhiteSpeedPanel(HudPanel):
         ratio = max(0.0, min(1.0, speed / max_speed))
         needle_angle = start_angle + sweep_angle * ratio
 
-        dial_r = int(target_h * float(self.config.get("dial_radius_ratio", 0.40)))
+        geo = self._dial_geometry()
+        dial_r = int(target_h * float(geo["dial_radius_ratio"]))
         needle_len = int(dial_r * 0.92 * float(self.config.get("needle_len_mult", 1.7)))
         needle_w = max(2, int(dial_r * 0.06))
-        left_center_ratio = self.config.get("dial_left_center", (0.25, 0.5))
-        right_center_ratio = self.config.get("dial_right_center", (0.75, 0.5))
+        left_center_ratio = geo["dial_left_center"]
+        right_center_ratio = geo["dial_right_center"]
         left_center = (int(target_w * float(left_center_ratio[0])), int(target_h * float(left_center_ratio[1])))
         right_center = (int(target_w * float(right_center_ratio[0])), int(target_h * float(right_center_ratio[1])))
 
@@ -7,21 +7,16 @@ import math
 import sys
 from pathlib import Path
 from PIL import Image, ImageTk
-import importlib.util
-import types
 
 # Add HUD directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 try:
-    from hud.base import HudPanel
-    import hud.base as hud_base_module
+    from hud.registry import panel_entries, load_panel_class
 except ImportError as e:
     print(f"Import error: {e}")
     sys.exit(1)
 
-HUD_ROOT = Path(__file__).resolve().parent
-
 class MockDataGenerator:
     def __init__(self, duration=600):
         self.duration = duration
@@ -119,79 +114,27 @@ class MockDataGenerator:
             'smooth_lons': np.array(self.lons)
         }
 
-def _ensure_hud_subpackage(subdir_path: Path):
-    pkg_name = f"hud.{subdir_path.name}"
-    if pkg_name not in sys.modules:
-        pkg = types.ModuleType(pkg_name)
-        pkg.__path__ = [str(subdir_path)]
-        sys.modules[pkg_name] = pkg
-    sys.modules[f"{pkg_name}.base"] = hud_base_module
-    return pkg_name
-
-def _load_module_from_file(module_name: str, file_path: Path):
-    spec = importlib.util.spec_from_file_location(module_name, str(file_path))
-    if spec is None or spec.loader is None:
-        raise ImportError(f"Cannot load spec for {module_name} from {file_path}")
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
-    return module
-
-def _find_panel_classes(module):
-    panel_classes = []
-    for obj in module.__dict__.values():
-        if isinstance(obj, type) and issubclass(obj, HudPanel) and obj is not HudPanel:
-            panel_classes.append(obj)
-    panel_classes.sort(key=lambda c: c.__name__)
-    return panel_classes
-
 def discover_hud_panels():
     discovered = []
-    for subdir in sorted([p for p in HUD_ROOT.iterdir() if p.is_dir()], key=lambda p: p.name.lower()):
-        if subdir.name.startswith('__'):
-            continue
-        if subdir.name in ('.git', '.venv'):
-            continue
-
-        py_files = sorted(
-            [p for p in subdir.glob("*.py") if p.is_file() and p.name not in ("__init__.py", "base.py")],
-            key=lambda p: p.name.lower()
-        )
-        if not py_files:
-            continue
-
-        pkg_name = _ensure_hud_subpackage(subdir)
-        for py_file in py_files:
-            module_name = f"{pkg_name}.{py_file.stem}"
-            try:
-                module = _load_module_from_file(module_name, py_file)
-                panel_classes = _find_panel_classes(module)
-                if not panel_classes:
-                    discovered.append({
-                        'group': subdir.name,
-                        'module': py_file.stem,
-                        'panel_name': None,
-                        'panel': None,
-                        'error': f"No HudPanel subclass found in {py_file.name}"
-                    })
-                    continue
-                panel_cls = panel_classes[0]
-                panel = panel_cls()
-                discovered.append({
-                    'group': subdir.name,
-                    'module': py_file.stem,
-                    'panel_name': panel_cls.__name__,
-                    'panel': panel,
-                    'error': None
-                })
-            except Exception as e:
-                discovered.append({
-                    'group': subdir.name,
-                    'module': py_file.stem,
-                    'panel_name': None,
-                    'panel': None,
-                    'error': str(e)
-                })
+    for name, info in panel_entries().items():
+        group, _, module = info.module.rpartition('.')
+        try:
+            panel = load_panel_class(name)()
+            discovered.append({
+                'group': group,
+                'module': module,
+                'panel_name': info.class_name,
+                'panel': panel,
+                'error': None
+            })
+        except Exception as e:
+            discovered.append({
+                'group': group,
+                'module': module,
+                'panel_name': None,
+                'panel': None,
+                'error': str(e)
+            })
     return discovered
 
 class HUDTestApp:
@@ -4,7 +4,10 @@ import math
 import numpy as np
 import cv2
 from ..base import HudPanel
+from ..registry import register_panel
 
+@register_panel('track', requires=('rect', 'gpx_data', 'current_seconds', 'gpx_offset', 'smooth_lats', 'smooth_lons',
+                                   'last_idx', 'current_state'), cost='medium')
 class TrackPanel(HudPanel):
     def __init__(self, config=None):
         super().__init__(config)
@@ -21,7 +24,6 @@ class TrackPanel(HudPanel):
             'margin_top': 20,
             'margin_right': 20
         })
-        self._smooth_cache = {}
 
     def _draw_impl(self, frame, data_context):
         """
@@ -63,7 +63,7 @@ class HudSettingsDialog(tk.Toplevel):
 
     def _format_panel_item(self, panel_key):
         panel = self.hud_panels[panel_key]
-        visible = bool(panel.config.get('visible', True))
+        visible = panel.visible
         mark = "☑" if visible else "☐"
         return f"{mark} {panel_key}"
 
@@ -92,7 +92,7 @@ class HudSettingsDialog(tk.Toplevel):
 
         if event.x <= 24:
             panel = self.hud_panels[panel_key]
-            visible = bool(panel.config.get('visible', True))
+            visible = panel.visible
             panel.update_config({'visible': not visible})
             self._refresh_panel_list(selected_key=panel_key)
 
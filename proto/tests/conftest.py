@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试直接导入 proto 下的模块 (与 benchmarks 相同)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
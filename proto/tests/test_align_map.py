@@ -0,0 +1,63 @@
+import math
+import threading
+
+import numpy as np
+import pytest
+
+from align_map import AlignTrack, TrackTileRenderer, TILE_SIZE
+
+pytest.importorskip('cv2')
+
+
+def make_track(n=5000):
+    t = np.linspace(0, 6 * np.pi, n)
+    lats = 30.0 + 0.01 * np.sin(t) + 0.0001 * t
+    lons = 120.0 + 0.01 * np.cos(t)
+    return AlignTrack(lats, lons, np.arange(n, dtype=np.float64))
+
+
+def test_scales_within_a_level_share_tiles():
+    # 滚轮缩放的连续比例吸附到同一层级
+    level = TrackTileRenderer.zoom_level(1000.0)
+    assert TrackTileRenderer.zoom_level(1000.0 * 1.1) == level
+    assert TrackTileRenderer.zoom_level(1000.0 * 2 ** 0.5) == level + 1
+    assert TrackTileRenderer.zoom_level(TrackTileRenderer.level_scale(level)) == level
+
+
+def test_visible_tiles_cover_view_without_seams():
+    track = make_track()
+    view = track.view(1000, 700, zoom=1.37, off_x=13.4, off_y=-7.9)
+    level = TrackTileRenderer.zoom_level(view['scale'])
+    tiles = TrackTileRenderer.visible_tiles(view, level)
+    by_index = {(i, j): (x0, y0, x1, y1) for i, j, x0, y0, x1, y1 in tiles}
+    for (i, j), (x0, y0, x1, y1) in by_index.items():
+        if (i + 1, j) in by_index:
+            assert by_index[(i + 1, j)][0] == x1
+        if (i, j + 1) in by_index:
+            assert by_index[(i, j + 1)][1] == y1
+    assert min(r[0] for r in by_index.values()) <= 0 and max(r[2] for r in by_index.values()) >= 1000
+    assert min(r[1] for r in by_index.values()) <= 0 and max(r[3] for r in by_index.values()) >= 700
+
+
+def test_misses_render_in_background_and_fallback_uses_neighbour_level():
+    track = make_track()
+    view = track.view(800, 600)
+    ready = threading.Event()
+    renderer = TrackTileRenderer(track, on_ready=ready.set)
+    level = renderer.zoom_level(view['scale'])
+    tiles = renderer.visible_tiles(view, level)
+    # 取视图中部的瓦片，保证它在较粗层级中的覆盖范围也都在可见瓦片内
+    i, j = tiles[len(tiles) // 2][:2]
+
+    # 缓存为空：既不同步渲染，也没有可用的近似
+    assert renderer.cached(level, i, j) is None
+    assert renderer.fallback(level, i, j) is None
+
+    renderer.prefetch(level, tiles)
+    assert ready.wait(10.0)
+    exact = renderer.cached(level, i, j)
+    assert exact is not None and exact.shape == (TILE_SIZE, TILE_SIZE, 3)
+
+    # 相邻层级的瓦片缺失时用本层级缓存缩放近似
+    coarser = renderer.fallback(level - 1, math.floor(i / 2 ** 0.5), math.floor(j / 2 ** 0.5))
+    assert coarser is not None and coarser.shape == (TILE_SIZE, TILE_SIZE, 3)
@@ -0,0 +1,149 @@
+import os
+import stat
+import sys
+import time
+
+import numpy as np
+import pytest
+
+import audio_engine
+from audio_engine import AudioEngine, PcmCache
+
+posix_only = pytest.mark.skipif(sys.platform == 'win32', reason='需要 POSIX shell 脚本模拟 ffmpeg')
+
+
+def make_samples(frames, channels=2):
+    t = np.arange(frames)
+    return np.stack([(t * 7) % 20000 - 10000, (t * 13) % 30000 - 15000][:channels], axis=1).astype(np.int16)
+
+
+def fake_ffmpeg(tmp_path, pcm_bytes_path, exit_code):
+    """把预先准备的 PCM 字节写到 stdout 并以 exit_code 退出的假 ffmpeg"""
+    script = tmp_path / 'fake_ffmpeg.sh'
+    script.write_text(f"#!/bin/sh\ncat '{pcm_bytes_path}'\nexit {exit_code}\n")
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    return str(script)
+
+
+def wait_complete(cache, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not cache.complete and time.monotonic() < end:
+        time.sleep(0.01)
+    assert cache.complete
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / 'clip.mp4'
+    path.write_bytes(b'not really a video')
+    return str(path)
+
+
+def test_cache_layout_round_trip(tmp_path, src):
+    samples = make_samples(5000)
+    cache_dir = str(tmp_path / 'cache')
+    first = PcmCache(src, cache_dir=cache_dir)
+    os.makedirs(cache_dir)
+    # 缓存文件为交错的 s16le 原始样本
+    samples.tofile(first.path)
+
+    cache = PcmCache(src, cache_dir=cache_dir)
+    assert cache.path == first.path
+    cache.start()
+    assert cache.complete and cache.error is None
+    assert cache.frames_decoded == len(samples)
+    np.testing.assert_array_equal(cache.read(0, len(samples)), samples)
+    np.testing.assert_array_equal(cache.read(4990, 100), samples[4990:])
+    assert cache.duration == pytest.approx(len(samples) / audio_engine.SAMPLE_RATE)
+    cache.close()
+
+
+@posix_only
+def test_decode_writes_cache(tmp_path, src, monkeypatch):
+    samples = make_samples(3001)
+    raw = tmp_path / 'raw.pcm'
+    # 末尾多出半个采样帧，应被丢弃
+    raw.write_bytes(samples.tobytes() + b'\x01')
+    monkeypatch.setattr(audio_engine, 'find_ffmpeg', lambda: fake_ffmpeg(tmp_path, raw, 0))
+
+    cache = PcmCache(src, cache_dir=str(tmp_path / 'cache'))
+    cache.start()
+    wait_complete(cache)
+    cache._thread.join()
+    assert cache.error is None
+    np.testing.assert_array_equal(np.fromfile(cache.path, dtype=np.int16).reshape(-1, 2), samples)
+
+    # 再次打开直接映射缓存，不再解码
+    monkeypatch.setattr(audio_engine, 'find_ffmpeg', lambda: pytest.fail('不应再次解码'))
+    again = PcmCache(src, cache_dir=str(tmp_path / 'cache'))
+    again.start()
+    np.testing.assert_array_equal(again.read(0, len(samples)), samples)
+
+
+@posix_only
+def test_failed_decode_is_not_cached(tmp_path, src, monkeypatch):
+    raw = tmp_path / 'raw.pcm'
+    raw.write_bytes(make_samples(1000).tobytes())
+    monkeypatch.setattr(audio_engine, 'find_ffmpeg', lambda: fake_ffmpeg(tmp_path, raw, 1))
+
+    cache = PcmCache(src, cache_dir=str(tmp_path / 'cache'))
+    cache.start()
+    wait_complete(cache)
+    cache._thread.join()
+    assert cache.error is not None
+    assert not os.path.exists(cache.path)
+    assert not [n for n in os.listdir(cache.cache_dir) if n.endswith('.part')]
+
+
+def test_prune_keeps_newest_within_budget(tmp_path):
+    for i in range(5):
+        path = tmp_path / f'{i}.pcm'
+        path.write_bytes(b'\0' * 1000)
+        os.utime(path, (i, i))
+    (tmp_path / 'other.part').write_bytes(b'\0' * 5000)
+    audio_engine.prune_pcm_cache(str(tmp_path), 2500, keep=str(tmp_path / '0.pcm'))
+    assert sorted(os.listdir(tmp_path)) == ['0.pcm', '4.pcm', 'other.part']
+
+
+@pytest.fixture
+def engine(tmp_path, src):
+    samples = make_samples(20000)
+    engine = AudioEngine(output='null', cache_dir=str(tmp_path / 'cache'))
+    probe = PcmCache(src, cache_dir=engine.cache_dir)
+    os.makedirs(engine.cache_dir)
+    samples.tofile(probe.path)
+    engine.open(src)
+    engine.playing = True
+    yield engine, samples.astype(np.float32) / 32768.0
+    engine.close()
+
+
+def test_render_unity_speed(engine):
+    engine, ref = engine
+    engine.seek(100 / audio_engine.SAMPLE_RATE)
+    out = np.empty((256, 2), dtype=np.float32)
+    engine._render(out, 256)
+    np.testing.assert_allclose(out, ref[100:356], atol=1e-6)
+    assert engine._pos == pytest.approx(356)
+
+
+def test_render_resamples_linearly(engine):
+    engine, ref = engine
+    engine.set_speed(0.5)
+    engine.set_volume(0.5)
+    out = np.empty((200, 2), dtype=np.float32)
+    engine._render(out, 200)
+    idx = np.arange(200) * 0.5
+    i0 = idx.astype(int)
+    frac = (idx - i0)[:, None]
+    expected = (ref[i0] + (ref[i0 + 1] - ref[i0]) * frac) * 0.5
+    np.testing.assert_allclose(out, expected, atol=1e-6)
+    assert engine.position == pytest.approx(100 / audio_engine.SAMPLE_RATE)
+
+
+def test_render_past_end_is_silent(engine):
+    engine, ref = engine
+    engine.seek(len(ref) / audio_engine.SAMPLE_RATE)
+    out = np.ones((64, 2), dtype=np.float32)
+    engine._render(out, 64)
+    assert not out.any()
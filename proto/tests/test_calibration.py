@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+from hud import calibration
+
+
+@pytest.fixture
+def image(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setattr(calibration, 'user_cache_dir', lambda *parts: str(cache_dir.joinpath(*parts)))
+    path = tmp_path / 'pkg' / 'dial.png'
+    path.parent.mkdir()
+    path.write_bytes(b'not really a png')
+    return str(path)
+
+
+def test_runtime_results_go_to_user_cache_only(image):
+    calls = []
+    result = calibration.load_or_compute(image, 'dials', {'x': 1}, lambda: calls.append(1) or {'r': 0.5})
+    assert result == {'r': 0.5}
+    # 包目录中不生成侧车，结果只写入用户缓存目录
+    assert os.listdir(os.path.dirname(image)) == ['dial.png']
+    assert os.path.exists(calibration.cache_sidecar_path(image))
+
+    again = calibration.load_or_compute(image, 'dials', {'x': 1}, lambda: calls.append(1) or {'r': 0.0})
+    assert again == {'r': 0.5} and len(calls) == 1
+
+
+def test_shipped_sidecar_is_read_only(image):
+    calibration.build_sidecar(image, 'dials', {'x': 1}, lambda: {'r': 0.25})
+    shipped = calibration.shipped_sidecar_path(image)
+    with open(shipped, 'rb') as f:
+        before = f.read()
+
+    assert calibration.load_or_compute(image, 'dials', {'x': 1}, lambda: pytest.fail('不应重新计算')) == {'r': 0.25}
+    # 新参数的结果写入用户缓存，不修改随包发布的侧车
+    assert calibration.load_or_compute(image, 'dials', {'x': 2}, lambda: {'r': 0.75}) == {'r': 0.75}
+    with open(shipped, 'rb') as f:
+        assert f.read() == before
+    with open(calibration.cache_sidecar_path(image), encoding='utf-8') as f:
+        assert list(json.load(f)['entries']) == ['dials|{"x": 2}']
@@ -0,0 +1,226 @@
+"""gpx_track 向量化实现与 VideoEditorApp 原先逐点循环实现 (_calculate_speeds / _smooth_gpx_data) 的数值一致性"""
+
+import math
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from gpx_track import compute_speeds, smooth_track, parse_gpx_columns, TrackSegments, SmoothedSegments
+
+GPX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'gpxData')
+GPX_FILES = sorted(f for f in os.listdir(GPX_DIR) if f.endswith('.gpx')) if os.path.isdir(GPX_DIR) else []
+
+
+def load_points(path):
+    """解析为原逐点实现使用的点格式: (lat, lon, ele, time, hr, speed_kph)"""
+    points = []
+    for el in ET.parse(path).getroot().iter():
+        if not el.tag.endswith('trkpt'):
+            continue
+        ele = 0.0
+        t = None
+        spd = None
+        for child in el.iter():
+            tag = child.tag.rsplit('}', 1)[-1]
+            if tag == 'ele' and child.text:
+                ele = float(child.text)
+            elif tag == 'time' and child.text:
+                t = datetime.fromisoformat(child.text.replace('Z', '+00:00')).astimezone(timezone.utc)
+            elif tag == 'speed' and child.text:
+                spd = float(child.text) * 3.6
+        if t is not None:
+            points.append((float(el.get('lat')), float(el.get('lon')), ele, t, 0, spd))
+    return points
+
+
+# ---- 原实现 (逐点循环) ----
+
+def legacy_haversine(lat1, lon1, lat2, lon2):
+    R = 6371000
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+    a = math.sin(delta_phi / 2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+
+def legacy_calculate_speeds(points):
+    speeds = []
+    raw_speeds = []
+    for i in range(len(points) - 1):
+        p1 = points[i]
+        p2 = points[i+1]
+        s1 = p1[5] if len(p1) > 5 else None
+        s2 = p2[5] if len(p2) > 5 else None
+        if s1 is not None and s2 is not None and s1 > 0 and s2 > 0:
+            speed_kph = (s1 + s2) / 2.0
+        else:
+            dist = legacy_haversine(p1[0], p1[1], p2[0], p2[1])
+            time_diff = (p2[3] - p1[3]).total_seconds()
+            if time_diff > 0:
+                speed_kph = (dist / time_diff) * 3.6
+            else:
+                speed_kph = 0
+        raw_speeds.append(speed_kph)
+    window_size = 3
+    for i in range(len(raw_speeds)):
+        start = max(0, i - window_size // 2)
+        end = min(len(raw_speeds), i + window_size // 2 + 1)
+        speeds.append(sum(raw_speeds[start:end]) / (end - start))
+    return speeds
+
+
+def legacy_smooth(lats, lons):
+    lats = np.array(lats)
+    lons = np.array(lons)
+    window_size = 5
+    kernel = np.ones(window_size) / window_size
+    if len(lats) > window_size:
+        pad_width = window_size // 2
+        smooth_lats = np.convolve(np.pad(lats, (pad_width, pad_width), mode='edge'), kernel, mode='valid')[:len(lats)]
+        smooth_lons = np.convolve(np.pad(lons, (pad_width, pad_width), mode='edge'), kernel, mode='valid')[:len(lons)]
+    else:
+        smooth_lats = lats
+        smooth_lons = lons
+    headings = []
+    for i in range(len(smooth_lats) - 1):
+        lat1, lon1 = smooth_lats[i], smooth_lons[i]
+        lat2, lon2 = smooth_lats[i+1], smooth_lons[i+1]
+        dy = (lat2 - lat1)
+        dx = (lon2 - lon1) * math.cos(math.radians(lat1))
+        if abs(dx) < 1e-9 and abs(dy) < 1e-9:
+            h = 0.0 if not headings else headings[-1]
+        else:
+            h = math.degrees(math.atan2(dx, dy))
+            if h < 0: h += 360
+        headings.append(h)
+    if headings:
+        headings.append(headings[-1])
+    else:
+        headings = [0.0] * len(smooth_lats)
+    if len(headings) > window_size:
+        rad_headings = np.radians(headings)
+        pad_width = window_size // 2
+        smooth_sin = np.convolve(np.pad(np.sin(rad_headings), (pad_width, pad_width), mode='edge'), kernel, mode='valid')
+        smooth_cos = np.convolve(np.pad(np.cos(rad_headings), (pad_width, pad_width), mode='edge'), kernel, mode='valid')
+        smooth_headings = (np.degrees(np.arctan2(smooth_sin, smooth_cos)) + 360) % 360
+        smooth_headings = smooth_headings[:len(headings)]
+    else:
+        smooth_headings = np.array(headings)
+    return smooth_lats, smooth_lons, smooth_headings
+
+
+def vectorized_speeds(points):
+    t0 = points[0][3]
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    times = [(p[3] - t0).total_seconds() for p in points]
+    ext = [p[5] if len(p) > 5 and p[5] is not None else np.nan for p in points]
+    return compute_speeds(lats, lons, times, ext, window=3)
+
+
+def check_heading(a, b):
+    """航向按圆周差比较"""
+    diff = (np.asarray(a) - np.asarray(b) + 180) % 360 - 180
+    assert np.max(np.abs(diff)) < 1e-6, f"航向不一致: {np.max(np.abs(diff))}"
+
+
+def synthetic_points(n=500, seed=0):
+    """带停顿 (重复坐标)、重复时间戳和部分外部速度的合成轨迹"""
+    rng = np.random.default_rng(seed)
+    lats = 30.0 + np.cumsum(rng.normal(0, 1e-4, n))
+    lons = 120.0 + np.cumsum(rng.normal(0, 1e-4, n))
+    lats[100:110] = lats[100]
+    lons[100:110] = lons[100]
+    t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    secs = np.cumsum(rng.integers(0, 3, n))
+    points = []
+    for i in range(n):
+        spd = float(rng.uniform(5, 30)) if i % 7 else None
+        points.append((float(lats[i]), float(lons[i]), 0.0, t0 + timedelta(seconds=int(secs[i])), 0, spd))
+    return points
+
+
+def check_points(points):
+    np.testing.assert_allclose(vectorized_speeds(points), legacy_calculate_speeds(points), rtol=1e-9, atol=1e-9)
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    new = smooth_track(lats, lons)
+    old = legacy_smooth(lats, lons)
+    np.testing.assert_allclose(new[0], old[0], rtol=0, atol=1e-10)
+    np.testing.assert_allclose(new[1], old[1], rtol=0, atol=1e-10)
+    check_heading(new[2], old[2])
+
+
+def test_matches_legacy_on_synthetic_track():
+    check_points(synthetic_points())
+
+
+@pytest.mark.parametrize('name', GPX_FILES)
+def test_matches_legacy_on_sample_tracks(name):
+    points = load_points(os.path.join(GPX_DIR, name))
+    if len(points) < 2:
+        pytest.skip('轨迹点不足')
+    check_points(points)
+
+
+def test_smoothed_segments_do_not_modify_base_segments():
+    base = [{'start': float(i), 'end': float(i + 1), 'lat_start': 0.0} for i in range(3)]
+    lats, lons, headings = np.arange(3.0), np.arange(3.0) + 10, np.arange(3.0) + 20
+    smoothed = SmoothedSegments(base, lats, lons, headings)
+    assert smoothed[-1] == dict(base[2], lat=2.0, lon=12.0, heading=22.0)
+    assert all('lat' not in s for s in base)
+
+    columns = {k: np.arange(4.0) for k in ('lat', 'lon', 'ele', 'time', 'hr')}
+    segments = TrackSegments(columns, np.ones(3))
+    smoothed = SmoothedSegments(segments, lats, lons, headings)
+    assert smoothed[1]['heading'] == 21.0 and 'heading' not in segments[1]
+
+
+GPX_SAMPLE = '''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+  <trk>
+    <name>晨骑</name>
+    <trkseg>
+{points}
+    </trkseg>
+  </trk>
+</gpx>
+'''
+
+
+def write_gpx(path, n):
+    t0 = datetime(2024, 5, 1, 8, 0, 0, tzinfo=timezone.utc)
+    rows = []
+    for i in range(n):
+        t = '' if i == 3 else f"<time>{(t0 + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%SZ')}</time>"
+        ext = f"<extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>{100 + i % 50}</gpxtpx:hr>" \
+              f"<gpxtpx:speed>{i % 9}</gpxtpx:speed></gpxtpx:TrackPointExtension></extensions>" if i % 2 else ''
+        rows.append(f'<trkpt lat="{30 + i * 1e-5:.6f}" lon="{120 + i * 1e-5:.6f}"><ele>{i * 0.5}</ele>{t}{ext}</trkpt>')
+    path.write_text(GPX_SAMPLE.format(points='\n'.join(rows)), encoding='utf-8')
+
+
+def test_parse_gpx_columns(tmp_path):
+    path = tmp_path / 'ride.gpx'
+    write_gpx(path, 300)
+    columns, name, start = parse_gpx_columns(str(path))
+    assert name == '晨骑'
+    assert start == datetime(2024, 5, 1, 8, 0, 0, tzinfo=timezone.utc)
+    # 无时间的点被丢弃
+    kept = np.array([i for i in range(300) if i != 3])
+    np.testing.assert_array_equal(columns['time'], kept.astype(float))
+    np.testing.assert_allclose(columns['lat'], 30 + kept * 1e-5, atol=1e-9)
+    np.testing.assert_allclose(columns['ele'], kept * 0.5)
+    np.testing.assert_array_equal(columns['hr'], np.where(kept % 2, 100 + kept % 50, 0))
+    np.testing.assert_allclose(columns['ext_speed'], np.where(kept % 2, (kept % 9) * 3.6, np.nan))
+
+    # 分批解析时间的结果与整列一次解析相同
+    chunked, _, _ = parse_gpx_columns(str(path), chunk=7)
+    for key, col in columns.items():
+        np.testing.assert_array_equal(chunked[key], col)
@@ -0,0 +1,57 @@
+import importlib
+import inspect
+import os
+
+import pytest
+
+import hud
+from hud.registry import PANELS, load_panel_class
+
+HUD_DIR = os.path.dirname(os.path.abspath(hud.__file__))
+
+
+def decorated_panels():
+    """导入 hud 各子包 (命名空间包，没有 __init__.py) 的所有模块，收集在其中定义并带 @register_panel 的类"""
+    found = {}
+    for group in sorted(os.listdir(HUD_DIR)):
+        group_dir = os.path.join(HUD_DIR, group)
+        if group.startswith(('_', '.')) or not os.path.isdir(group_dir):
+            continue
+        for fname in sorted(os.listdir(group_dir)):
+            if not fname.endswith('.py'):
+                continue
+            module = importlib.import_module(f"hud.{group}.{fname[:-3]}")
+            for _, cls in inspect.getmembers(module, inspect.isclass):
+                info = cls.__dict__.get('panel_info')
+                if info is not None and cls.__module__ == module.__name__:
+                    found[info.name] = info
+    return found
+
+
+def test_manifest_matches_decorated_classes():
+    found = decorated_panels()
+    assert set(found) == set(PANELS)
+    for name, info in found.items():
+        assert PANELS[name] == info, name
+
+
+@pytest.mark.parametrize('name', list(PANELS))
+def test_manifest_entry_loads_its_class(name):
+    cls = load_panel_class(name)
+    assert cls.__name__ == PANELS[name].class_name
+    assert cls.panel_info == PANELS[name]
+
+
+def test_failed_panel_import_is_not_cached(monkeypatch):
+    def fail(name):
+        raise ImportError('missing dependency')
+
+    monkeypatch.setattr(hud, 'load_panel_class', fail)
+    monkeypatch.delitem(vars(hud), 'TrackPanel', raising=False)
+    with pytest.raises(AttributeError) as excinfo:
+        hud.TrackPanel
+    assert isinstance(excinfo.value.__cause__, ImportError)
+    assert 'TrackPanel' not in vars(hud)
+
+    monkeypatch.undo()
+    assert hud.TrackPanel is load_panel_class('track')
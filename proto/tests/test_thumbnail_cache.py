@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+
+from thumbnail_cache import ThumbnailCache
+
+
+def test_save_load_round_trip(tmp_path):
+    video = tmp_path / 'a.mp4'
+    video.write_bytes(b'x')
+    cache = ThumbnailCache(str(video), cache_dir=str(tmp_path / 'thumbs'))
+    images = {t: np.full((40, 72, 3), t * 10, dtype=np.uint8) for t in range(5)}
+    for t, img in images.items():
+        cache.put(t, img)
+    cache.save()
+
+    loaded = ThumbnailCache(str(video), cache_dir=str(tmp_path / 'thumbs'))
+    assert loaded.load() == len(images)
+    for t, img in images.items():
+        np.testing.assert_array_equal(loaded.get(t), img)
+
+
+def test_save_removes_sheets_of_older_versions(tmp_path):
+    thumbs = str(tmp_path / 'thumbs')
+    video = tmp_path / 'a.mp4'
+    other = tmp_path / 'b.mp4'
+    video.write_bytes(b'x')
+    other.write_bytes(b'y')
+    for path in (video, other):
+        cache = ThumbnailCache(str(path), cache_dir=thumbs)
+        cache.put(0.0, np.zeros((40, 72, 3), dtype=np.uint8))
+        cache.save()
+    assert len(os.listdir(thumbs)) == 4
+
+    # 视频被修改后重新生成：同一视频的旧精灵图被删除，其他视频的保留
+    os.utime(video, (1, 1))
+    cache = ThumbnailCache(str(video), cache_dir=thumbs)
+    cache.put(0.0, np.zeros((40, 72, 3), dtype=np.uint8))
+    cache.save()
+    other_cache = ThumbnailCache(str(other), cache_dir=thumbs)
+    assert sorted(os.listdir(thumbs)) == sorted(os.path.basename(p) for p in (
+        cache.sheet_path, cache.index_path, other_cache.sheet_path, other_cache.index_path))
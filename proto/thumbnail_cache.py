@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+时间轴缩略图提取与磁盘缓存
+每个视频对应一个缓存 (以 路径/大小/修改时间 为键)：所有缩略图打包到一张精灵图 (PNG)，
+另附一个 JSON 索引记录每张缩略图的时间与在精灵图中的位置。
+提取使用 ffmpeg 单次顺序解码 (fps 过滤器 + 缩放)，避免逐张随机跳转。
+"""
+
+import os
+import json
+import hashlib
+import math
+import platform
+import shutil
+import subprocess
+
+import numpy as np
+
+try:
+    import cv2
+    HAS_CV2 = True
+except ImportError:
+    HAS_CV2 = False
+
+THUMB_HEIGHT = 40      # 时间轴轨道高度
+SHEET_MAX_WIDTH = 4096  # 精灵图最大宽度 (超出换行)
+CACHE_VERSION = 1
+
+# 缩略图金字塔：各层级的取样间隔 (秒)。所有层级共用同一个按毫秒索引的缓存，
+# 粗层级的时间点大多也是细层级的时间点，缩放时可直接复用
+THUMB_LEVELS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def user_cache_dir(*parts):
+    """获取用户缓存目录 (跨平台)"""
+    system = platform.system()
+    if system == 'Windows':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif system == 'Darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'gpxVideoEditor', *parts)
+
+
+def time_key(t):
+    """缩略图时间 (秒) -> 整数毫秒键，避免浮点误差"""
+    return int(round(float(t) * 1000))
+
+
+def pick_level(timeline_scale, thumb_width):
+    """选择相邻缩略图在屏幕上不重叠的最细层级 (timeline_scale 为 像素/秒)"""
+    for interval in THUMB_LEVELS:
+        if interval * timeline_scale >= thumb_width:
+            return interval
+    return THUMB_LEVELS[-1]
+
+
+def level_times(interval, start, end):
+    """返回 [start, end] 内落在该层级网格上的时间点"""
+    k0 = max(0, int(math.ceil(start / interval - 1e-9)))
+    k1 = int(math.floor(end / interval + 1e-9))
+    return [k * interval for k in range(k0, k1 + 1)]
+
+
+def contiguous_runs(times, interval):
+    """把升序时间点拆分为连续 (间隔为 interval) 的若干段，每段可用一次顺序解码完成"""
+    runs = []
+    for t in times:
+        if runs and abs(t - runs[-1][-1] - interval) < 1e-6:
+            runs[-1].append(t)
+        else:
+            runs.append([t])
+    return runs
+
+
+class ThumbnailCache:
+    """单个视频的缩略图缓存 (内存中为 BGR numpy 图像)"""
+
+    def __init__(self, video_path, cache_dir=None, height=THUMB_HEIGHT):
+        self.video_path = video_path
+        self.height = height
+        self.cache_dir = cache_dir or user_cache_dir('thumbs')
+        self.images = {}  # {time_ms: np.ndarray(h, w, 3)}
+        self.dirty = False
+
+        st = os.stat(video_path)
+        self.key_src = f"{os.path.abspath(video_path)}|{st.st_size}|{st.st_mtime_ns}|{height}"
+        key = hashlib.sha1(self.key_src.encode('utf-8')).hexdigest()
+        self.sheet_path = os.path.join(self.cache_dir, key + '.png')
+        self.index_path = os.path.join(self.cache_dir, key + '.json')
+
+    def load(self):
+        """从磁盘加载缓存，返回加载的缩略图数量"""
+        if not HAS_CV2:
+            return 0
+        if not (os.path.exists(self.index_path) and os.path.exists(self.sheet_path)):
+            return 0
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') != CACHE_VERSION or index.get('height') != self.height:
+                return 0
+            sheet = cv2.imread(self.sheet_path, cv2.IMREAD_COLOR)
+            if sheet is None:
+                return 0
+            for t_ms, x, y, w, h in index.get('entries', []):
+                tile = sheet[y:y + h, x:x + w]
+                if tile.shape[:2] == (h, w):
+                    self.images[int(t_ms)] = tile.copy()
+        except Exception as e:
+            print(f"读取缩略图缓存失败: {e}")
+            self.images = {}
+        return len(self.images)
+
+    def has(self, t):
+        return time_key(t) in self.images
+
+    def get(self, t):
+        return self.images.get(time_key(t))
+
+    def put(self, t, image):
+        self.images[time_key(t)] = image
+        self.dirty = True
+
+    def missing(self, times):
+        """返回缓存中缺失的时间点"""
+        return [t for t in times if time_key(t) not in self.images]
+
+    def save(self):
+        """将所有缩略图打包为精灵图写入磁盘"""
+        if not HAS_CV2 or not self.dirty or not self.images:
+            return
+        try:
+            # 按行打包：同一高度，宽度超过 SHEET_MAX_WIDTH 时换行
+            entries = []
+            x = y = 0
+            sheet_w = 0
+            for t_ms in sorted(self.images):
+                h, w = self.images[t_ms].shape[:2]
+                if x > 0 and x + w > SHEET_MAX_WIDTH:
+                    x = 0
+                    y += self.height
+                entries.append((t_ms, x, y, w, h))
+                x += w
+                sheet_w = max(sheet_w, x)
+            sheet = np.zeros((y + self.height, sheet_w, 3), dtype=np.uint8)
+            for t_ms, ex, ey, w, h in entries:
+                sheet[ey:ey + h, ex:ex + w] = self.images[t_ms]
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            ok, buf = cv2.imencode('.png', sheet)
+            if not ok:
+                return
+            tmp_sheet = self.sheet_path + '.tmp'
+            tmp_index = self.index_path + '.tmp'
+            with open(tmp_sheet, 'wb') as f:
+                f.write(buf.tobytes())
+            with open(tmp_index, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'height': self.height, 'key': self.key_src, 'entries': entries}, f)
+            # 索引最后落盘；加载时会校验每块缩略图尺寸
+            os.replace(tmp_sheet, self.sheet_path)
+            os.replace(tmp_index, self.index_path)
+            self.dirty = False
+            self._remove_stale()
+        except Exception as e:
+            print(f"保存缩略图缓存失败: {e}")
+
+    def _remove_stale(self):
+        """删除同一视频 (同一轨道高度) 的旧精灵图 (视频重新编码或修改后留下的)"""
+        # 键为 路径|大小|修改时间|高度
+        path, _, _, height = self.key_src.rsplit('|', 3)
+        for name in os.listdir(self.cache_dir):
+            index_path = os.path.join(self.cache_dir, name)
+            if not name.endswith('.json') or index_path == self.index_path:
+                continue
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    key = json.load(f).get('key', '')
+            except (OSError, ValueError):
+                continue
+            parts = key.rsplit('|', 3)
+            if len(parts) == 4 and parts[0] == path and parts[3] == height:
+                for stale in (index_path[:-len('.json')] + '.png', index_path):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+
+
+def find_ffmpeg():
+    """获取ffmpeg命令路径 (PATH 中找不到时使用环境变量 FFMPEG)"""
+    path = shutil.which('ffmpeg')
+    if path:
+        return path
+    env_ffmpeg = os.environ.get('FFMPEG')
+    if env_ffmpeg and os.path.exists(env_ffmpeg):
+        return env_ffmpeg
+    return None
+
+
+def has_ffmpeg():
+    return find_ffmpeg() is not None
+
+
+def thumbnail_size(frame_w, frame_h, height=THUMB_HEIGHT):
+    """按轨道高度等比缩放后的缩略图尺寸 (宽度取偶数，满足 ffmpeg 缩放要求)"""
+    if frame_w <= 0 or frame_h <= 0:
+        return height * 16 // 9 // 2 * 2, height
+    return max(2, int(round(frame_w * height / frame_h / 2.0)) * 2), height
+
+
+def iter_thumbnails_ffmpeg(video_path, frame_size, interval, start=0.0, end=None,
+                           height=THUMB_HEIGHT, keyframes_only=False):
+    """单次顺序解码提取缩略图，逐张产出 (time_sec, bgr_image)
+
+    使用 fps 过滤器按 interval 取帧并直接缩放到轨道高度，ffmpeg 只需顺序解码一遍；
+    keyframes_only 时附加 -skip_frame nokey 只解码关键帧 (长 GOP 素材、大间隔时最快，
+    取到的帧为最近的关键帧)。
+    """
+    out_w, out_h = thumbnail_size(frame_size[0], frame_size[1], height)
+    frame_bytes = out_w * out_h * 3
+    cmd = [find_ffmpeg() or 'ffmpeg', '-v', 'error', '-nostdin']
+    if keyframes_only:
+        cmd += ['-skip_frame', 'nokey']
+    if start > 0:
+        cmd += ['-ss', f'{start:.3f}']
+    cmd += ['-i', video_path]
+    if end is not None:
+        cmd += ['-t', f'{max(0.001, end - start):.3f}']
+    cmd += [
+        '-an', '-sn',
+        '-vf', f'fps=1/{interval:g},scale={out_w}:{out_h}',
+        '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-'
+    ]
+    startupinfo = None
+    if platform.system() == 'Windows':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            startupinfo=startupinfo, bufsize=frame_bytes * 4)
+    try:
+        k = 0
+        while True:
+            buf = proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                break
+            t = start + k * interval
+            if end is not None and t >= end:
+                break
+            yield t, np.frombuffer(buf, dtype=np.uint8).reshape(out_h, out_w, 3)
+            k += 1
+    finally:
+        if proc.poll() is None:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+        proc.stdout.close()
+        proc.wait()
+
+
+def iter_thumbnails_cv2(video_path, times, fps, height=THUMB_HEIGHT):
+    """OpenCV 逐点跳转提取 (无 ffmpeg 时的回退路径)，逐张产出 (time_sec, bgr_image)"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return
+    try:
+        for t in times:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(t * fps))
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            h, w = frame.shape[:2]
+            yield t, cv2.resize(frame, thumbnail_size(w, h, height))
+    finally:
+        cap.release()
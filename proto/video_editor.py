@@ -14,21 +14,38 @@ from pathlib import Path
 import math
 from datetime import datetime, timedelta, timezone
 import bisect
+import queue
+from collections import OrderedDict
 import subprocess
 import shutil
-import xml.dom.minidom
 import struct
 import tempfile
 import json
 import re
 import signal
 try:
-    from .hud import ElevationPanel, TelemetryPanel, TrackPanel, SpeedometerPanel, Porsche911Panel, BackPanel
+    from .hud import create_panels, required_fields
     from .hud_settings_dialog import HudSettingsDialog
+    from .audio_engine import AudioEngine
+    from .edit_list import EditDecisionList
+    from .gpx_cache import GpxTrackCache
+    from .dem import DemRaster, find_dem_for_gpx
+    from .align_map import AlignTrack, TrackTileRenderer, TILE_MODE_MIN_POINTS, TILE_SIZE
+    from .gpx_track import compute_speeds, smooth_track, SmoothedSegments, TrackSegments, track_points, track_profile, parse_gpx_columns
+    from .thumbnail_cache import (ThumbnailCache, has_ffmpeg, iter_thumbnails_ffmpeg, iter_thumbnails_cv2,
+                                  thumbnail_size, pick_level, level_times, contiguous_runs, time_key)
 except ImportError:
     # Fallback for running as a script
-    from hud import ElevationPanel, TelemetryPanel, TrackPanel, SpeedometerPanel, Porsche911Panel, BackPanel
+    from hud import create_panels, required_fields
     from hud_settings_dialog import HudSettingsDialog
+    from audio_engine import AudioEngine
+    from edit_list import EditDecisionList
+    from gpx_cache import GpxTrackCache
+    from dem import DemRaster, find_dem_for_gpx
+    from align_map import AlignTrack, TrackTileRenderer, TILE_MODE_MIN_POINTS, TILE_SIZE
+    from gpx_track import compute_speeds, smooth_track, SmoothedSegments, TrackSegments, track_points, track_profile, parse_gpx_columns
+    from thumbnail_cache import (ThumbnailCache, has_ffmpeg, iter_thumbnails_ffmpeg, iter_thumbnails_cv2,
+                                 thumbnail_size, pick_level, level_times, contiguous_runs, time_key)
 
 # 尝试导入numpy用于错误处理
 try:
@@ -128,8 +145,17 @@ class VideoEditorApp:
         self.export_progress_dialog = None
         self.video_creation_time = None # 视频创建时间
         self.clips = []  # 剪辑片段列表
-        self.timeline_thumbnails = {} # 时间轴缩略图 {time_sec: photo_image}
+        self.edit_list = EditDecisionList(self.clips) # 片段区间索引 (与 clips 共用同一列表)
+        self.next_clip_id = 1
+        self.timeline_thumbnails = OrderedDict() # 时间轴缩略图 LRU {time_ms: photo_image}
+        self.timeline_thumb_limit = 300 # 保留的 PhotoImage 上限
         self.thumbnail_thread = None # 缩略图生成线程
+        self.thumbnail_requests = None # 缩略图请求队列 (工作线程按需生成可见范围)
+        self.thumbnail_last_request = None # (interval, 时间键集合)，避免重复请求
+        self._tracks_redraw_job = None
+        self.timeline_duration = 0.0 # 时间标尺对应的项目时长
+        self.timeline_thumb_items = {} # 持久的缩略图画布项 {(time_ms, project_ms): item}
+        self.timeline_clip_items = {} # 持久的片段画布项 {clip_id: (rect, shadow, label)}
         
         # GPX 数据
         self.gpx_data = None  # 格式: {'segments': [(start_time, end_time, speed), ...]}
@@ -142,6 +168,12 @@ class VideoEditorApp:
         self.align_offset_x = 0.0
         self.align_offset_y = 0.0
         self.align_drag_start = None
+        self.align_track = None # 投影后的轨迹及空间索引 (GPX 加载时构建)
+        self.align_transform_params = None
+        self.align_track_items = [] # 持久的轨迹折线画布项 (仅缩放/平移/尺寸变化时更新)
+        self.align_cursor_items = None # 持久的光标画布项 (oval, hline, vline)
+        self.align_tile_renderer = None # 超长轨迹的栅格瓦片渲染器 (None 时绘制折线)
+        self.align_tile_items = {} # 当前显示的瓦片 {(层级, i, j): (item, photo, 显示尺寸, 是否为本层级瓦片)}
         
         # 调试信息
         self.debug_info = {}
@@ -154,6 +186,7 @@ class VideoEditorApp:
         self.current_frame_image = None  # 当前帧图像
         self.play_thread = None  # 播放线程
         self.audio_proc = None
+        self.audio_engine = None  # 进程内音频引擎 (不可用时回退到 ffplay)
         
         # 拖拽状态变量
         self.is_dragging_progress = False
@@ -185,6 +218,14 @@ class VideoEditorApp:
         self.video_canvas_image_item = None
         self._frame_gpx_cache = None
         self._last_gpx_seg_idx = 0
+        self.grade_window_m = 50.0  # 坡度平滑的距离窗口 (米)，0 表示逐段坡度
+        # 高程来源：'gps' 使用 GPX 中的 ele，'dem' 使用 DEM 栅格采样 (无 DEM 覆盖的点仍用 GPS)
+        self.elevation_source = 'gps'
+        self.elevation_source_var = tk.StringVar(value=self.elevation_source)
+        self.gpx_track = None  # 当前 GPX 的列数组 (np.memmap)
+        self.gpx_track_path = None
+        self.dem_path = None
+        self.gpx_dem_ele = None
         self._align_redraw_pending = False
         self.debug_overlay_enabled = True
         self.debug_overlay_interval = 0.12
@@ -196,14 +237,10 @@ class VideoEditorApp:
         self.speedometer_resizing = False
         self.speedometer_drag_start = None
 
-        # HUD Panels
-        self.hud_panels = {
-            'elevation': ElevationPanel(),
-            'telemetry': TelemetryPanel(),
-            'track': TrackPanel(),
-            'speedometer': SpeedometerPanel(),
-            'porsche911': Porsche911Panel()
-        }
+        # HUD Panels (模块在面板首次可见并绘制时才导入)
+        self.hud_panels = create_panels(('elevation', 'telemetry', 'track', 'speedometer', 'porsche911'))
+        # 叠加层绘制时复用的数据上下文 (每帧只填入可见面板声明需要的字段)
+        self._overlay_context = {}
 
         # 创建GUI
         self.create_menu()
@@ -330,6 +367,13 @@ class VideoEditorApp:
         tools_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="工具", menu=tools_menu)
         tools_menu.add_command(label="手动设置GPX偏移", command=self.set_manual_offset)
+        tools_menu.add_command(label="坡度平滑距离...", command=self.set_grade_window)
+        tools_menu.add_separator()
+        tools_menu.add_radiobutton(label="高程: GPS", variable=self.elevation_source_var, value='gps',
+                                   command=self.on_elevation_source_change)
+        tools_menu.add_radiobutton(label="高程: DEM", variable=self.elevation_source_var, value='dem',
+                                   command=self.on_elevation_source_change)
+        tools_menu.add_command(label="选择DEM文件...", command=self.choose_dem_file)
         
         # 帮助菜单
         help_menu = tk.Menu(menubar, tearoff=0)
@@ -731,235 +775,163 @@ class VideoEditorApp:
 
     def on_align_right_click(self, event):
         """右键点击地图定位时间"""
-        if not hasattr(self, 'align_transform_params') or not self.align_transform_params:
+        if self.align_track is None or not self.align_transform_params:
             return
             
-        # 1. 获取点击坐标并反变换为经纬度
-        x, y = event.x, event.y
-        params = self.align_transform_params
-        
-        zoom = params['zoom']
-        off_x, off_y = params['off_x'], params['off_y']
-        cx, cy = params['cx'], params['cy']
-        bb_w, bb_h = params['bb_w'], params['bb_h']
-        min_lat, min_lon = params['min_lat'], params['min_lon']
-        lon_corr = params['lon_corr']
-        lon_range, lat_range = params['lon_range'], params['lat_range']
-        
-        if zoom == 0 or bb_w == 0 or bb_h == 0 or lon_corr == 0:
-            return
-
-        # 反解坐标变换
-        # x = cx + x_zoomed + off_x
-        x_zoomed = x - cx - off_x
-        y_zoomed = y - cy - off_y
-        
-        # x_zoomed = x_base * zoom
-        x_base = x_zoomed / zoom
-        y_base = y_zoomed / zoom
-        
-        # x_base = norm_x * bb_w
-        norm_x = x_base / bb_w
-        # y_base = -norm_y * bb_h
-        norm_y = -y_base / bb_h
-        
-        # norm_x = ((lon - min_lon) * lon_corr / lon_range) - 0.5
-        click_lon = ((norm_x + 0.5) * lon_range / lon_corr) + min_lon
-        # norm_y = ((lat - min_lat) / lat_range) - 0.5
-        click_lat = ((norm_y + 0.5) * lat_range) + min_lat
-        
-        # 2. 查找最近的 GPX 点
-        if not (isinstance(self.gpx_data, dict) and 'segments' in self.gpx_data and self.gpx_data['segments']):
+        # 反变换到投影坐标后用空间索引查找最近轨迹点；轨迹自交时选时间最接近当前光标的一次经过
+        best_time = self.align_track.time_at_screen(
+            self.align_transform_params, event.x, event.y,
+            prefer_time=self.align_progress_var.get()
+        )
+        if best_time is None:
             return
             
-        segments = self.gpx_data['segments']
-        
-        min_dist_sq = float('inf')
-        best_time = 0.0
-        
-        # 采样查找
-        step = 1
-        if len(segments) > 10000:
-            step = 5
-            
-        for i in range(0, len(segments), step):
-            s = segments[i]
-            d_sq = (s['lat_start'] - click_lat)**2 + (s['lon_start'] - click_lon)**2
-            if d_sq < min_dist_sq:
-                min_dist_sq = d_sq
-                best_time = s['start']
-                
-        # 3. 更新 UI
+        # 更新 UI
         self.align_progress_var.set(best_time)
         self.on_align_progress_change(best_time)
         
         self.update_status(f"定位到 GPX 时间: {best_time:.1f}s")
 
     def update_align_canvas(self):
+        """重绘对齐视图中的轨迹 (缩放/平移/尺寸变化/加载GPX时调用)，光标由 _move_align_cursor 单独移动"""
         if not hasattr(self, 'align_canvas'):
             return
-        self.align_canvas.delete("all")
-        if not (isinstance(self.gpx_data, dict) and 'segments' in self.gpx_data and self.gpx_data['segments']):
-            w = self.align_canvas.winfo_width()
-            h = self.align_canvas.winfo_height()
+        canvas = self.align_canvas
+        canvas.delete("placeholder")
+        if self.align_track is None:
+            self._clear_align_track_items()
+            canvas.delete("cursor")
+            self.align_cursor_items = None
+            w = canvas.winfo_width()
+            h = canvas.winfo_height()
             if w > 0 and h > 0:
-                self.align_canvas.create_text(w//2, h//2, text="未加载GPX", fill="#999999")
-            return
-        pts = []
-        for s in self.gpx_data['segments']:
-            pts.append((s['lat_start'], s['lon_start']))
-        if self.gpx_data['segments']:
-            last = self.gpx_data['segments'][-1]
-            pts.append((last['lat_end'], last['lon_end']))
-            
-        lats = [p[0] for p in pts]
-        lons = [p[1] for p in pts]
-        if not lats:
+                canvas.create_text(w//2, h//2, text="未加载GPX", fill="#999999", tags="placeholder")
             return
-            
-        min_lat, max_lat = min(lats), max(lats)
-        min_lon, max_lon = min(lons), max(lons)
-        
-        w = max(1, self.align_canvas.winfo_width())
-        h = max(1, self.align_canvas.winfo_height())
-        padding = 20
-        
-        mid_lat = math.radians((min_lat + max_lat) / 2) if max_lat != min_lat else 0.0
-        lon_corr = math.cos(mid_lat) if max_lat != min_lat else 1.0
-        
-        lat_range = max(1e-9, max_lat - min_lat)
-        lon_range = max(1e-9, (max_lon - min_lon) * lon_corr)
-        
-        # Base scale to fit screen
-        scale_x = (w - 2 * padding) / lon_range
-        scale_y = (h - 2 * padding) / lat_range
-        base_scale = min(scale_x, scale_y)
-        
-        bb_w = lon_range * base_scale
-        bb_h = lat_range * base_scale
-        
-        cx = w / 2
-        cy = h / 2
         
+        w = max(1, canvas.winfo_width())
+        h = max(1, canvas.winfo_height())
         zoom = getattr(self, 'align_zoom_scale', 1.0)
         off_x = getattr(self, 'align_offset_x', 0.0)
         off_y = getattr(self, 'align_offset_y', 0.0)
         
-        def tf(lat, lon):
-            norm_x = ((lon - min_lon) * lon_corr / lon_range) - 0.5
-            norm_y = ((lat - min_lat) / lat_range) - 0.5
-            
-            x_base = norm_x * bb_w
-            y_base = -norm_y * bb_h
-            
-            x_zoomed = x_base * zoom
-            y_zoomed = y_base * zoom
-            
-            x = cx + x_zoomed + off_x
-            y = cy + y_zoomed + off_y
-            return x, y
-            
-        # 保存变换参数供点击定位使用
-        self.align_transform_params = {
-            'min_lat': min_lat, 'min_lon': min_lon,
-            'lon_corr': lon_corr, 'lon_range': lon_range, 'lat_range': lat_range,
-            'bb_w': bb_w, 'bb_h': bb_h, 'cx': cx, 'cy': cy,
-            'zoom': zoom, 'off_x': off_x, 'off_y': off_y
-        }
-            
-        screen = [tf(lat, lon) for lat, lon in pts]
+        # 保存变换参数供点击定位/光标更新使用
+        view = self.align_track.view(w, h, zoom, off_x, off_y)
+        self.align_transform_params = view
         
-        # Draw all lines at once
-        flat_pts = [coord for pt in screen for coord in pt]
-        if len(flat_pts) >= 4:
-            self.align_canvas.create_line(flat_pts, fill="#00FF00", width=2, tags="track")
+        if self.align_tile_renderer is not None:
+            self._draw_align_tiles(view)
+        else:
+            # 按缩放选择简化层级，只绘制与视口相交的部分；复用已有的折线项
+            lines = self.align_track.polylines(view)
+            items = self.align_track_items
+            for i, flat_pts in enumerate(lines):
+                if i < len(items):
+                    canvas.coords(items[i], flat_pts)
+                else:
+                    items.append(canvas.create_line(flat_pts, fill="#00FF00", width=2, tags="track"))
+            for item in items[len(lines):]:
+                canvas.delete(item)
+            del items[len(lines):]
+        
+        self._move_align_cursor(self.align_progress_var.get())
+    
+    def _draw_align_tiles(self, view):
+        """以栅格瓦片显示轨迹：缩放吸附到离散层级，已有瓦片按当前比例缩放显示；
+        缺失的瓦片先用相邻层级的缓存近似，由后台线程渲染 (含相邻一圈)，完成后再重绘"""
+        canvas = self.align_canvas
+        renderer = self.align_tile_renderer
+        level = renderer.zoom_level(view['scale'])
+        visible = renderer.visible_tiles(view, level)
+        items = {}
+        missing = []
+        for i, j, x0, y0, x1, y1 in visible:
+            key = (level, i, j)
+            size = (x1 - x0, y1 - y0)
+            entry = self.align_tile_items.pop(key, None)
+            if entry is not None and entry[2] == size and entry[3]:
+                # 平移：只移动画布项
+                canvas.coords(entry[0], x0, y0)
+                items[key] = entry
+                continue
+            img = renderer.cached(level, i, j)
+            exact = img is not None
+            if not exact:
+                missing.append((i, j))
+                img = renderer.fallback(level, i, j)
+            if img is None or size[0] <= 0 or size[1] <= 0:
+                if entry is not None:
+                    canvas.delete(entry[0])
+                continue
+            if size != (TILE_SIZE, TILE_SIZE):
+                img = cv2.resize(img, size, interpolation=cv2.INTER_LINEAR)
+            photo = ImageTk.PhotoImage(Image.fromarray(img))
+            if entry is None:
+                item = canvas.create_image(x0, y0, image=photo, anchor=tk.NW, tags="track")
+            else:
+                item = entry[0]
+                canvas.itemconfig(item, image=photo)
+                canvas.coords(item, x0, y0)
+            items[key] = (item, photo, size, exact)
+        for entry in self.align_tile_items.values():
+            canvas.delete(entry[0])
+        self.align_tile_items = items
+        # 可见的缺失瓦片优先，其次是相邻一圈
+        inner = {tile[:2] for tile in visible}
+        ring = [tile for tile in renderer.visible_tiles(view, level, margin=1) if tile[:2] not in inner]
+        renderer.prefetch(level, missing + ring, urgent=len(missing))
+    
+    def _clear_align_track_items(self):
+        """删除对齐视图中的轨迹画布项 (折线或瓦片)"""
+        if hasattr(self, 'align_canvas'):
+            self.align_canvas.delete("track")
+        self.align_track_items = []
+        self.align_tile_items = {}
+    
+    def _move_align_cursor(self, gpx_time):
+        """只移动光标画布项 (不重绘轨迹)"""
+        canvas = self.align_canvas
+        if self.align_track is None or not self.align_transform_params:
+            return
+        lat, lon = self._get_latlon_at_gpx_time(gpx_time)
+        if lat is None or lon is None:
+            if self.align_cursor_items:
+                for item in self.align_cursor_items:
+                    canvas.itemconfig(item, state=tk.HIDDEN)
+            return
             
-        t = self.align_progress_var.get()
-        lat, lon = self._get_latlon_at_gpx_time(t)
-        
-        if lat is not None and lon is not None:
-            x, y = tf(lat, lon)
-            r = 5
-            self.align_canvas.create_oval(x-r, y-r, x+r, y+r, fill="#00BFFF", outline="", tags="cursor")
+        # 计算屏幕坐标
+        x, y = self.align_track.to_screen(self.align_transform_params, *self.align_track.project(lat, lon))
+        r = 5
+        if self.align_cursor_items is None:
+            oval = canvas.create_oval(x-r, y-r, x+r, y+r, fill="#00BFFF", outline="", tags="cursor")
             # Crosshair
-            self.align_canvas.create_line(x-10, y, x+10, y, fill="white", width=1, tags="cursor")
-            self.align_canvas.create_line(x, y-10, x, y+10, fill="white", width=1, tags="cursor")
-            
-        self.align_transform_params = {
-            'min_lat': min_lat, 'min_lon': min_lon,
-            'lon_corr': lon_corr, 'lon_range': lon_range, 'lat_range': lat_range,
-            'bb_w': bb_w, 'bb_h': bb_h, 'cx': cx, 'cy': cy
-        }
-        self.align_transform = (min_lat, min_lon, base_scale, h, padding, lon_corr)
-        self.align_track_points = pts
+            hline = canvas.create_line(x-10, y, x+10, y, fill="white", width=1, tags="cursor")
+            vline = canvas.create_line(x, y-10, x, y+10, fill="white", width=1, tags="cursor")
+            self.align_cursor_items = (oval, hline, vline)
+        else:
+            oval, hline, vline = self.align_cursor_items
+            canvas.coords(oval, x-r, y-r, x+r, y+r)
+            canvas.coords(hline, x-10, y, x+10, y)
+            canvas.coords(vline, x, y-10, x, y+10)
+            for item in self.align_cursor_items:
+                canvas.itemconfig(item, state=tk.NORMAL)
+        canvas.tag_raise("cursor")
     
     def update_align_cursor(self, gpx_time):
-        """更新对齐视图中的光标位置（优化版，不重绘整个轨迹）"""
+        """更新对齐视图中的光标位置（不重绘整个轨迹）"""
         if not hasattr(self, 'align_canvas'):
             return
             
         # 1. 更新滑块和时间标签
-        slider_val = gpx_time
-            
-        # 更新变量（避免触发 on_align_progress_change 回调导致循环调用，或者接受它）
-        # on_align_progress_change 会调用 update_align_canvas
-        # 我们只想更新 UI 显示，不希望触发重绘
-        # 但 Tkinter 的 set() 会触发 trace，这里使用的是 command 回调
-        # Scale 的 command 回调只在用户交互时触发吗？通常是的，但在 set() 时不会触发 command
-        # 除非绑定了 variable 的 trace。这里使用的是 command=self.on_align_progress_change
+        # Scale 的 command 回调在 set() 时不会触发，这里仍加保护避免循环调用
         self._is_updating_ui = True
         try:
-            self.align_progress_var.set(slider_val)
+            self.align_progress_var.set(gpx_time)
         finally:
             self._is_updating_ui = False
             
-        # self.align_time_label.config(text=f"GPX时间: {gpx_time:.1f}s")
-        
-        # 2. 更新地图光标
-        # 需要变换参数
-        if not hasattr(self, 'align_transform_params'):
-            return
-            
-        params = self.align_transform_params
-        lat, lon = self._get_latlon_at_gpx_time(gpx_time)
-        
-        if lat is None or lon is None:
-            return
-            
-        # 计算屏幕坐标
-        zoom = getattr(self, 'align_zoom_scale', 1.0)
-        off_x = getattr(self, 'align_offset_x', 0.0)
-        off_y = getattr(self, 'align_offset_y', 0.0)
-        
-        min_lon = params['min_lon']
-        min_lat = params['min_lat']
-        lon_corr = params['lon_corr']
-        lon_range = params['lon_range']
-        lat_range = params['lat_range']
-        bb_w = params['bb_w']
-        bb_h = params['bb_h']
-        cx = params['cx']
-        cy = params['cy']
-        
-        norm_x = ((lon - min_lon) * lon_corr / lon_range) - 0.5
-        norm_y = ((lat - min_lat) / lat_range) - 0.5
-        
-        x_base = norm_x * bb_w
-        y_base = -norm_y * bb_h
-        
-        x_zoomed = x_base * zoom
-        y_zoomed = y_base * zoom
-        
-        x = cx + x_zoomed + off_x
-        y = cy + y_zoomed + off_y
-        
-        # 移动或创建光标
-        self.align_canvas.delete("cursor")
-        r = 5
-        self.align_canvas.create_oval(x-r, y-r, x+r, y+r, fill="#00BFFF", outline="", tags="cursor")
-        # Crosshair
-        self.align_canvas.create_line(x-10, y, x+10, y, fill="white", width=1, tags="cursor")
-        self.align_canvas.create_line(x, y-10, x, y+10, fill="white", width=1, tags="cursor")
+        # 2. 移动地图光标
+        self._move_align_cursor(gpx_time)
 
     def on_align_progress_change(self, value):
         if getattr(self, '_is_updating_ui', False):
@@ -970,7 +942,7 @@ class VideoEditorApp:
         except:
             v = 0.0
         # self.align_time_label.config(text=f"GPX时间: {v:.1f}s")
-        self.update_align_canvas()
+        self._move_align_cursor(v)
     
     def align_confirm(self):
         if not (isinstance(self.gpx_data, dict) and 'segments' in self.gpx_data and self.gpx_data['segments']):
@@ -997,6 +969,7 @@ class VideoEditorApp:
         def sync_scroll(*args):
             self.ruler_canvas.xview(*args)
             self.timeline_canvas.xview(*args)
+            self.schedule_timeline_tracks_redraw()
             
         timeline_scroll.config(command=sync_scroll)
         
@@ -1022,6 +995,8 @@ class VideoEditorApp:
         self.timeline_canvas.bind("<B1-Motion>", self.on_timeline_click)
         self.ruler_canvas.bind("<Button-1>", self.on_timeline_click)
         self.ruler_canvas.bind("<B1-Motion>", self.on_timeline_click)
+        # 可见宽度变化时重绘可见范围
+        self.timeline_canvas.bind("<Configure>", lambda e: self.schedule_timeline_tracks_redraw())
         
         # 时间轴控制
         timeline_control = ttk.Frame(timeline_frame)
@@ -1134,6 +1109,8 @@ class VideoEditorApp:
         if self.cap is not None:
             self.cap.release()
             self.cap = None
+        # 旧的缩略图线程发现请求队列被替换后退出
+        self.thumbnail_requests = None
         
         self.video_path = video_path
         # 获取视频创建时间
@@ -1189,6 +1166,8 @@ class VideoEditorApp:
                 'end_frame': self.total_frames,
                 'source': self.video_path
             }]
+            self.edit_list = EditDecisionList(self.clips)
+            self.next_clip_id = 1
             self.update_clip_list()
             
             # 初始化时间轴
@@ -1292,8 +1271,31 @@ class VideoEditorApp:
         
     # 已移除：GPMD 流索引与解析函数（get_gpmd_stream_index / extract_gpmd_data / parse_gpmd_structure）
 
+    def _build_gpx_arrays(self):
+        """加载时一次性计算累计距离与坡度数组 (按分段下标索引)，逐帧采样只做插值"""
+        self.gpx_data['arrays'] = track_profile(self.gpx_data['segments'], self.grade_window_m)
+        self._frame_gpx_cache = None
+        self._last_gpx_seg_idx = 0
+
+    def set_grade_window(self):
+        """设置坡度平滑的距离窗口并重建坡度数组"""
+        window_str = simpledialog.askstring("坡度平滑", f"当前窗口: {self.grade_window_m:.0f}米\n请输入新的窗口距离 (米，0 表示不平滑):", initialvalue=str(self.grade_window_m))
+        if not window_str:
+            return
+        try:
+            self.grade_window_m = max(0.0, float(window_str))
+        except ValueError:
+            messagebox.showerror("错误", "无效的数字格式")
+            return
+        if isinstance(self.gpx_data, dict) and self.gpx_data.get('segments'):
+            self._build_gpx_arrays()
+        self.save_hud_config()
+        self.update_status(f"坡度平滑窗口: {self.grade_window_m:.0f}米")
+        if self.cap is not None and not self.playing:
+            self.seek_to_frame(self.current_frame_pos)
+
     def _smooth_gpx_data(self):
-        """对GPX数据进行平滑处理 (坐标和航向)"""
+        """对GPX数据进行平滑处理 (坐标和航向，整条轨迹向量化计算)"""
         if not self.gpx_data or 'segments' not in self.gpx_data:
             return
             
@@ -1301,83 +1303,14 @@ class VideoEditorApp:
         if not segments:
             return
             
-        n = len(segments)
-        # 提取 lat/lon
-        lats = []
-        lons = []
-        for s in segments:
-            lats.append(s['lat_start'])
-            lons.append(s['lon_start'])
-        # 添加最后一个点
-        lats.append(segments[-1]['lat_end'])
-        lons.append(segments[-1]['lon_end'])
-        
-        lats = np.array(lats)
-        lons = np.array(lons)
-        
-        # 1. 坐标平滑 (简单的滑动平均)
-        window_size = 5 # 减小窗口以保留转弯细节
-        if len(lats) > window_size:
-            kernel = np.ones(window_size) / window_size
-            pad_width = window_size // 2
-            smooth_lats = np.convolve(np.pad(lats, (pad_width, pad_width), mode='edge'), kernel, mode='valid')
-            smooth_lons = np.convolve(np.pad(lons, (pad_width, pad_width), mode='edge'), kernel, mode='valid')
-            
-            # 截断多余的 (如果卷积后长度不一致)
-            smooth_lats = smooth_lats[:len(lats)]
-            smooth_lons = smooth_lons[:len(lons)]
-        else:
-            smooth_lats = lats
-            smooth_lons = lons
+        # 提取 lat/lon (含最后一个点)
+        points = track_points(segments, ('lat', 'lon'))
         
-        # 2. 计算航向 (Heading)
-        headings = []
-        for i in range(len(smooth_lats) - 1):
-            lat1, lon1 = smooth_lats[i], smooth_lons[i]
-            lat2, lon2 = smooth_lats[i+1], smooth_lons[i+1]
-            
-            dy = (lat2 - lat1)
-            dx = (lon2 - lon1) * math.cos(math.radians(lat1))
-            
-            if abs(dx) < 1e-9 and abs(dy) < 1e-9:
-                h = 0.0 if not headings else headings[-1]
-            else:
-                h = math.degrees(math.atan2(dx, dy))
-                if h < 0: h += 360
-            headings.append(h)
-            
-        # 补全最后一个航向
-        if headings:
-            headings.append(headings[-1])
-        else:
-            headings = [0.0] * len(smooth_lats)
+        # 坐标滑动平均 (窗口较小以保留转弯细节) + 航向计算与平滑
+        smooth_lats, smooth_lons, smooth_headings = smooth_track(points['lat'], points['lon'], window=5)
             
-        # 3. 航向平滑
-        if len(headings) > window_size:
-            rad_headings = np.radians(headings)
-            sin_h = np.sin(rad_headings)
-            cos_h = np.cos(rad_headings)
-            
-            pad_width = window_size // 2
-            smooth_sin = np.convolve(np.pad(sin_h, (pad_width, pad_width), mode='edge'), kernel, mode='valid')
-            smooth_cos = np.convolve(np.pad(cos_h, (pad_width, pad_width), mode='edge'), kernel, mode='valid')
-            
-            smooth_headings = np.degrees(np.arctan2(smooth_sin, smooth_cos))
-            smooth_headings = (smooth_headings + 360) % 360
-            smooth_headings = smooth_headings[:len(headings)]
-        else:
-            smooth_headings = np.array(headings)
-            
-        # 保存结果
-        smoothed_segments = []
-        for i in range(n):
-            s = segments[i].copy()
-            s['lat'] = smooth_lats[i]
-            s['lon'] = smooth_lons[i]
-            s['heading'] = smooth_headings[i]
-            smoothed_segments.append(s)
-            
-        self.gpx_data['smoothed_segments'] = smoothed_segments
+        # 保存结果 (按需生成分段字典的视图，不复制整条轨迹)
+        self.gpx_data['smoothed_segments'] = SmoothedSegments(segments, smooth_lats, smooth_lons, smooth_headings)
         
         # 保存平滑后的数组，供快速绘图使用
         self.smooth_lats = smooth_lats
@@ -1392,59 +1325,47 @@ class VideoEditorApp:
             return None
             
         segs = self.gpx_data['smoothed_segments']
-        if not segs:
+        n = len(segs)
+        if n == 0:
             return None
 
-        # 二分查找
-        low, high = 0, len(segs) - 1
-        idx = -1
-        
-        # 优化：从上次索引开始搜索
-        if hasattr(self, '_last_idx') and 0 <= self._last_idx < len(segs):
-            if segs[self._last_idx]['start'] <= t <= segs[self._last_idx]['end']:
-                idx = self._last_idx
-        
-        if idx == -1:
-            while low <= high:
-                mid = (low + high) // 2
-                s = segs[mid]
-                if s['start'] <= t <= s['end']:
-                    idx = mid
-                    break
-                elif t < s['start']:
-                    high = mid - 1
-                else:
-                    low = mid + 1
-        
-        if idx != -1:
-            self._last_idx = idx
-            s = segs[idx]
-            # 插值
-            dur = s['end'] - s['start']
-            ratio = 0.0
-            if dur > 0.001:
-                ratio = (t - s['start']) / dur
-            
-            # 下一个点
-            next_s = segs[idx+1] if idx < len(segs)-1 else s
-            
-            # 线性插值
-            lat = s['lat'] + (next_s['lat'] - s['lat']) * ratio
-            lon = s['lon'] + (next_s['lon'] - s['lon']) * ratio
-            
-            # 航向插值 (处理0/360)
-            h1 = s['heading']
-            h2 = next_s['heading']
-            
-            diff = h2 - h1
-            if diff > 180: diff -= 360
-            elif diff < -180: diff += 360
-            
-            heading = (h1 + diff * ratio) % 360
-            
-            return lat, lon, heading
-            
-        return None
+        # 直接在分段起止时间列上查找并从平滑数组插值，不为每次比较生成分段字典
+        starts = segs.segments.starts
+        ends = segs.segments.ends
+        idx = getattr(self, '_last_idx', -1)
+        if not (0 <= idx < n and starts[idx] <= t <= ends[idx]):
+            idx = int(np.searchsorted(starts, t, side='right')) - 1
+            if idx < 0 or t > ends[idx]:
+                return None
+        self._last_idx = idx
+
+        # 插值
+        start = float(starts[idx])
+        dur = float(ends[idx]) - start
+        ratio = 0.0
+        if dur > 0.001:
+            ratio = (t - start) / dur
+
+        # 下一个点 (最后一段不再向后插值)
+        nxt = idx + 1 if idx < n - 1 else idx
+
+        # 线性插值
+        lat1, lat2 = float(segs.lats[idx]), float(segs.lats[nxt])
+        lon1, lon2 = float(segs.lons[idx]), float(segs.lons[nxt])
+        lat = lat1 + (lat2 - lat1) * ratio
+        lon = lon1 + (lon2 - lon1) * ratio
+
+        # 航向插值 (处理0/360)
+        h1 = float(segs.headings[idx])
+        h2 = float(segs.headings[nxt])
+
+        diff = h2 - h1
+        if diff > 180: diff -= 360
+        elif diff < -180: diff += 360
+
+        heading = (h1 + diff * ratio) % 360
+
+        return lat, lon, heading
 
     def _haversine_distance(self, lat1, lon1, lat2, lon2):
         """Calculate haversine distance between two points in meters"""
@@ -1509,15 +1430,15 @@ class VideoEditorApp:
             if not gpx_path:
                 return
 
-            points, name, gpx_start_time = self._parse_gpx_file(gpx_path)
-            
-            if not points:
+            track = self._load_gpx_track(gpx_path)
+            if track is None:
                 return
-
-            speeds = self._calculate_speeds(points)
-            
-            # 处理时间并建立查询结构
-            segments = []
+            self.gpx_track = track
+            self.gpx_track_path = gpx_path
+            self.dem_path = find_dem_for_gpx(gpx_path)
+            self.gpx_dem_ele = self._load_dem_elevation()
+            name = track['name']
+            gpx_start_time = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=track['start_us'])
             
             # 尝试获取视频开始时间以进行同步
             video_start_time, method = self._get_video_creation_time(video_path)
@@ -1537,45 +1458,23 @@ class VideoEditorApp:
             else:
                 self.gpx_offset = 0.0
                 
-            for i in range(len(speeds)):
-                p1 = points[i]
-                p2 = points[i+1]
-                t1 = p1[3]
-                t2 = p2[3]
-                
-                if t1 and t2:
-                    # 计算相对于GPX起点的秒数
-                    rel_t1 = (t1 - gpx_start_time).total_seconds()
-                    rel_t2 = (t2 - gpx_start_time).total_seconds()
-                    
-                    # 获取该段的心率（取起点的心率）
-                    hr = points[i][4] if len(points[i]) > 4 else 0
-                    
-                    segments.append({
-                        'start': rel_t1,
-                        'end': rel_t2,
-                        'speed': speeds[i],
-                        'hr': hr,
-                        'ele_start': points[i][2],
-                        'ele_end': points[i+1][2],
-                        'lat_start': points[i][0],
-                        'lon_start': points[i][1],
-                        'lat_end': points[i+1][0],
-                        'lon_end': points[i+1][1]
-                    })
-            
-            # 保险起见，按时间排序
-            segments.sort(key=lambda s: (s['start'], s['end']))
+            # 分段视图直接建立在列数组上 (时间为相对于GPX起点的秒数，心率取起点的心率)，按时间排序
+            segments = TrackSegments(self._track_columns(), track['speed'])
             
             self.gpx_data = {'segments': segments, 'name': name, 'start_time': gpx_start_time}
+            self._build_gpx_arrays()
+            points = track_points(segments, ('lat', 'lon', 'time'))
+            self.align_track = AlignTrack(points['lat'], points['lon'], points['time']) if len(segments) else None
+            # 超长轨迹改用栅格瓦片显示
+            if self.align_track is not None and HAS_CV2 and HAS_PIL and len(self.align_track) >= TILE_MODE_MIN_POINTS:
+                self.align_tile_renderer = TrackTileRenderer(
+                    self.align_track, on_ready=lambda: self.root.after(0, self.update_align_canvas))
+            else:
+                self.align_tile_renderer = None
+            self._clear_align_track_items()
             
             # 生成全量轨迹缩略图 (始终显示完整轨迹)
-            all_points = []
-            for seg in segments:
-                all_points.append((seg['lat_start'], seg['lon_start']))
-            # 添加最后一点
-            if segments:
-                all_points.append((segments[-1]['lat_end'], segments[-1]['lon_end']))
+            all_points = np.column_stack((points['lat'], points['lon'])) if len(segments) else []
                 
             self.track_thumbnail, self.track_transform = self.generate_track_thumbnail(all_points)
             
@@ -1596,119 +1495,110 @@ class VideoEditorApp:
             print(f"GPX加载失败: {e}")
             self.update_status(f"GPX加载失败: {e}")
 
+    def _load_dem_elevation(self):
+        """按 DEM 对当前轨迹所有点采样高程 (结果缓存在轨迹缓存目录)，DEM 未覆盖的点保留 GPS 高程"""
+        track = self.gpx_track
+        if track is None or not self.dem_path or not os.path.exists(self.dem_path):
+            return None
+        cache = GpxTrackCache(self.gpx_track_path)
+        dem_ele = cache.load_column('dem_ele', self.dem_path)
+        if dem_ele is None:
+            try:
+                with DemRaster(self.dem_path) as raster:
+                    dem_ele = raster.sample(track['lat'], track['lon'])
+            except Exception as e:
+                print(f"DEM读取失败: {e}")
+                return None
+            if cache.save_column('dem_ele', dem_ele, self.dem_path):
+                dem_ele = cache.load_column('dem_ele', self.dem_path)
+        missing = np.isnan(dem_ele)
+        if missing.all():
+            print(f"DEM未覆盖轨迹: {self.dem_path}")
+            return None
+        return np.where(missing, track['ele'], dem_ele)
+
+    def _track_columns(self):
+        """按当前高程来源返回构建分段视图用的列"""
+        if self.elevation_source == 'dem' and self.gpx_dem_ele is not None:
+            columns = dict(self.gpx_track)
+            columns['ele'] = self.gpx_dem_ele
+            return columns
+        return self.gpx_track
+
+    def _apply_elevation_source(self):
+        """切换高程来源后重建分段视图、坡度数组与平滑数据 (不重新解析 GPX)"""
+        if self.gpx_track is None or not isinstance(self.gpx_data, dict):
+            return
+        segments = TrackSegments(self._track_columns(), self.gpx_track['speed'])
+        # 新的 gpx_data 字典，使依赖其 id 的 HUD 缓存失效
+        self.gpx_data = dict(self.gpx_data, segments=segments)
+        self._build_gpx_arrays()
+        self._smooth_gpx_data()
+        if self.cap is not None and not self.playing:
+            self.seek_to_frame(self.current_frame_pos)
+
+    def on_elevation_source_change(self):
+        """高程来源菜单切换"""
+        self.elevation_source = self.elevation_source_var.get()
+        self.save_hud_config()
+        if self.elevation_source == 'dem' and self.gpx_track is not None and self.gpx_dem_ele is None:
+            self.update_status("未找到覆盖当前轨迹的DEM文件，仍使用GPS高程 (工具 -> 选择DEM文件...)")
+        else:
+            self.update_status(f"高程来源: {'DEM' if self.elevation_source == 'dem' else 'GPS'}")
+        self._apply_elevation_source()
+
+    def choose_dem_file(self):
+        """手动选择当前轨迹使用的 DEM 文件"""
+        if self.gpx_track is None:
+            messagebox.showwarning("提示", "未加载GPX数据")
+            return
+        file_path = filedialog.askopenfilename(
+            title="选择DEM文件",
+            filetypes=[("GeoTIFF", "*.tif *.tiff"), ("所有文件", "*.*")]
+        )
+        if not file_path:
+            return
+        self.dem_path = file_path
+        self.gpx_dem_ele = self._load_dem_elevation()
+        if self.gpx_dem_ele is None:
+            messagebox.showerror("错误", "无法读取DEM文件或DEM未覆盖当前轨迹")
+            return
+        self.elevation_source = 'dem'
+        self.elevation_source_var.set('dem')
+        self.save_hud_config()
+        self.update_status(f"已加载DEM: {os.path.basename(file_path)}")
+        self._apply_elevation_source()
+
+    def _load_gpx_track(self, gpx_path):
+        """读取 GPX 的列数组 (优先以 np.memmap 打开列式缓存，未命中时流式解析 XML、计算速度并写入缓存)"""
+        cache = GpxTrackCache(gpx_path)
+        track = cache.load()
+        if track is not None:
+            return track
+
+        columns, name, gpx_start_time = self._parse_gpx_file(gpx_path)
+        if columns is None:
+            return None
+        track = dict(columns, name=name)
+        track['start_us'] = (gpx_start_time - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+        # 优先使用 GPX 扩展中提供的速度 (相邻两点取平均)，否则按距离/时间计算；用较小的窗口平滑，保留加速/下坡峰值
+        if len(columns['time']) >= 2:
+            track['speed'] = compute_speeds(columns['lat'], columns['lon'], columns['time'], columns['ext_speed'], window=3)
+        else:
+            track['speed'] = np.zeros(0, dtype=np.float64)
+        # 写入后从磁盘重新打开，首次加载与缓存命中使用相同的列数据
+        if cache.save(track):
+            return cache.load() or track
+        return track
+
     def _parse_gpx_file(self, gpx_path):
-        """解析GPX文件"""
+        """流式解析GPX文件为列数组 (少见的时间格式逐个交给 _parse_to_utc_datetime)"""
         try:
-            dom = xml.dom.minidom.parse(gpx_path)
-            gpx = dom.documentElement
-            
-            # 获取名称
-            name = "Unknown"
-            trk = gpx.getElementsByTagName('trk')
-            if trk:
-                name_nodes = trk[0].getElementsByTagName('name')
-                if name_nodes and name_nodes[0].firstChild:
-                    name = name_nodes[0].firstChild.data
-            
-            points = []
-            
-            # 解析轨迹点
-            trkpts = gpx.getElementsByTagName('trkpt')
-            for trkpt in trkpts:
-                lat = float(trkpt.getAttribute('lat'))
-                lon = float(trkpt.getAttribute('lon'))
-                
-                ele = 0.0
-                ele_nodes = trkpt.getElementsByTagName('ele')
-                if ele_nodes and ele_nodes[0].firstChild:
-                    ele = float(ele_nodes[0].firstChild.data)
-                
-                time_obj = None
-                time_nodes = trkpt.getElementsByTagName('time')
-                if time_nodes and time_nodes[0].firstChild:
-                    time_str = time_nodes[0].firstChild.data
-                    time_obj = self._parse_to_utc_datetime(time_str)
-                
-                hr = 0
-                spd_kph = None
-                # 尝试获取心率
-                extensions = trkpt.getElementsByTagName('extensions')
-                if extensions:
-                    # 尝试多种常见的命名空间
-                    for tag in ['gpxtpx:hr', 'ns3:hr', 'hr']:
-                        hr_nodes = extensions[0].getElementsByTagName(tag)
-                        if hr_nodes and hr_nodes[0].firstChild:
-                            hr = int(hr_nodes[0].firstChild.data)
-                            break
-                    # 尝试速度 (单位多为 m/s)
-                    for tag in ['gpxtpx:speed', 'ns3:speed', 'speed']:
-                        sp_nodes = extensions[0].getElementsByTagName(tag)
-                        if sp_nodes and sp_nodes[0].firstChild:
-                            try:
-                                sp_mps = float(sp_nodes[0].firstChild.data)
-                                spd_kph = sp_mps * 3.6
-                            except:
-                                pass
-                            break
-                
-                # points: (lat, lon, ele, time, hr, opt_speed_kph)
-                points.append((lat, lon, ele, time_obj, hr, spd_kph))
-            
-            if not points:
-                return None, None, None
-                
-            # 过滤掉无效时间点
-            points = [p for p in points if p[3] is not None]
-            
-            if not points:
-                return None, None, None
-
-            start_time = points[0][3]
-            return points, name, start_time
-            
+            return parse_gpx_columns(gpx_path, self._parse_to_utc_datetime)
         except Exception as e:
             print(f"解析GPX出错: {e}")
             return None, None, None
 
-
-    def _calculate_speeds(self, points):
-        """计算两点之间的速度 (km/h)
-        优先使用 GPX 扩展中提供的速度(若存在，取相邻两点速度的平均值)，否则回退为距离/时间计算
-        并做轻度平滑
-        """
-        speeds = []
-        # 简单计算每两点间的速度
-        raw_speeds = []
-        for i in range(len(points) - 1):
-            p1 = points[i]
-            p2 = points[i+1]
-            
-            # 优先使用扩展速度
-            s1 = p1[5] if len(p1) > 5 else None
-            s2 = p2[5] if len(p2) > 5 else None
-            if s1 is not None and s2 is not None and s1 > 0 and s2 > 0:
-                speed_kph = (s1 + s2) / 2.0
-            else:
-                dist = self._haversine_distance(p1[0], p1[1], p2[0], p2[1])
-                time_diff = (p2[3] - p1[3]).total_seconds()
-                if time_diff > 0:
-                    speed_kph = (dist / time_diff) * 3.6
-                else:
-                    speed_kph = 0
-            raw_speeds.append(speed_kph)
-        
-        # 平滑处理 (移动平均)
-        if len(raw_speeds) > 0:
-            # 使用更小的窗口，保留加速/下坡峰值
-            window_size = 3
-            for i in range(len(raw_speeds)):
-                start = max(0, i - window_size // 2)
-                end = min(len(raw_speeds), i + window_size // 2 + 1)
-                speeds.append(sum(raw_speeds[start:end]) / (end - start))
-            return speeds
-            
-        return []
-
     def _haversine_distance(self, lat1, lon1, lat2, lon2):
         """计算两点间的距离 (米)"""
         R = 6371000
@@ -1782,11 +1672,12 @@ class VideoEditorApp:
 
     def generate_track_thumbnail(self, points):
         """生成轨迹缩略图"""
-        if not points:
+        if len(points) == 0:
             return None, None
             
-        lats = np.array([p[0] for p in points])
-        lons = np.array([p[1] for p in points])
+        points = np.asarray(points, dtype=np.float64)
+        lats = points[:, 0]
+        lons = points[:, 1]
         
         # 数据平滑 (移动平均)
         if len(points) > 10:
@@ -1825,14 +1716,10 @@ class VideoEditorApp:
         # 半透明背景 (灰色, alpha=100)
         thumbnail[:] = [50, 50, 50, 100]
         
-        # 转换坐标点
-        pts = []
-        for lat, lon in zip(lats, lons):
-            x = int(padding + (lon - min_lon) * lon_correction * scale)
-            y = int(h - padding - (lat - min_lat) * scale) # 纬度越高y越小
-            pts.append([x, y])
-            
-        pts = np.array(pts, np.int32)
+        # 转换坐标点 (纬度越高y越小)
+        xs = padding + (lons - min_lon) * lon_correction * scale
+        ys = h - padding - (lats - min_lat) * scale
+        pts = np.column_stack((xs, ys)).astype(np.int32)
         pts = pts.reshape((-1, 1, 2))
         
         # 绘制轨迹 (白色)
@@ -1938,8 +1825,8 @@ class VideoEditorApp:
         # self.debug_info['target_time'] = target_time
         # self.debug_info['offset'] = self.gpx_offset
         # self.debug_info['seg_idx'] = sample['idx']
-        # self.debug_info['seg_start'] = sample['seg']['start']
-        # self.debug_info['seg_end'] = sample['seg']['end']
+        # self.debug_info['seg_start'] = sample['start']
+        # self.debug_info['seg_end'] = sample['end']
         # self.debug_info['ratio'] = sample['ratio']
         # self.debug_info['lat'] = sample['lat']
         # self.debug_info['lon'] = sample['lon']
@@ -2215,52 +2102,27 @@ class VideoEditorApp:
         if not self.video_info or not self.clips:
             return 0.0
         fps = self.video_info.get('fps', 30.0)
-        total_frames = sum(clip['end_frame'] - clip['start_frame'] for clip in self.clips)
-        return total_frames / fps if fps > 0 else 0.0
+        return self.edit_list.total_frames / fps if fps > 0 else 0.0
 
     def get_source_frame_from_project_time(self, project_time):
         """项目时间 -> 源视频帧"""
         if not self.video_info or not self.clips:
             return 0
-        fps = self.video_info.get('fps', 30.0)
-        accumulated_time = 0.0
-        for clip in self.clips:
-            clip_duration = (clip['end_frame'] - clip['start_frame']) / fps
-            if accumulated_time <= project_time < accumulated_time + clip_duration:
-                offset_time = project_time - accumulated_time
-                return clip['start_frame'] + int(offset_time * fps)
-            accumulated_time += clip_duration
-        # 超过范围返回最后一帧
-        if self.clips:
-            return self.clips[-1]['end_frame']
-        return 0
+        return self.edit_list.source_frame_at(project_time, self.video_info.get('fps', 30.0))
 
     def get_project_time_from_source_frame(self, source_frame):
         """源视频帧 -> 项目时间"""
         if not self.video_info or not self.clips:
             return 0.0
-        fps = self.video_info.get('fps', 30.0)
-        accumulated_time = 0.0
-        for clip in self.clips:
-            if clip['start_frame'] <= source_frame < clip['end_frame']:
-                offset_frames = source_frame - clip['start_frame']
-                return accumulated_time + (offset_frames / fps)
-            accumulated_time += (clip['end_frame'] - clip['start_frame']) / fps
-        return accumulated_time
+        return self.edit_list.project_time_of(source_frame, self.video_info.get('fps', 30.0))
 
     def is_frame_in_any_clip(self, frame_pos):
         """检查帧是否在任何片段内"""
-        for clip in self.clips:
-            if clip['start_frame'] <= frame_pos < clip['end_frame']:
-                return True
-        return False
+        return self.edit_list.contains(frame_pos)
 
     def get_next_clip_start_frame(self, current_frame):
         """获取下一个片段的起始帧"""
-        for clip in self.clips:
-            if clip['start_frame'] > current_frame:
-                return clip['start_frame']
-        return None
+        return self.edit_list.next_start_after(current_frame)
 
     # ============ 编辑功能 ============
     
@@ -2292,7 +2154,7 @@ class VideoEditorApp:
             index = self.clip_tree.index(selected[0])
             if 0 <= index < len(self.clips):
                 # 从列表中移除
-                removed_clip = self.clips.pop(index)
+                removed_clip = self.edit_list.delete(index)
                 self.update_status(f"删除片段: {removed_clip['name']}")
                 
                 # 如果没有片段了，自动添加一个覆盖全视频的片段（可选，根据需求）
@@ -2391,23 +2253,42 @@ class VideoEditorApp:
         fps = self.video_info.get('fps', 30.0)
         return self.current_frame_pos / fps if fps > 0 else 0
     
+    def _get_audio_engine(self):
+        """获取进程内音频引擎 (需要 ffmpeg 与 sounddevice，否则返回 None)"""
+        if self.audio_engine is None and AudioEngine.is_supported():
+            self.audio_engine = AudioEngine()
+        return self.audio_engine
+
+    def _audio_source(self):
+        use_external = bool(self.preview_external_audio_var.get() and self.external_audio_path and os.path.exists(self.external_audio_path))
+        return self.external_audio_path if use_external else self.video_path
+
+    def _audio_speed(self):
+        return max(0.5, min(2.0, self.playback_speed))
+
     def start_audio_playback(self, start_time=None):
         if self.is_muted or self.volume <= 0:
             return
-        if not self._has_ffplay():
-            return
         if start_time is None:
             start_time = self._current_time()
+        engine = self._get_audio_engine()
+        if engine is not None:
+            # 引擎只解码一次，之后的播放/跳转/变速/音量都在进程内完成
+            try:
+                engine.open(self._audio_source())
+                engine.set_volume(self.volume)
+                engine.set_speed(self._audio_speed())
+                engine.play(start_time)
+                return
+            except Exception as e:
+                print(f"音频引擎播放失败，回退到 ffplay: {e}")
+        if not self._has_ffplay():
+            return
         try:
             self.stop_audio_playback()
             vol = max(0, min(100, int(self.volume * 100)))
-            spd = self.playback_speed
-            if spd < 0.5:
-                spd = 0.5
-            elif spd > 2.0:
-                spd = 2.0
-            use_external = bool(self.preview_external_audio_var.get() and self.external_audio_path and os.path.exists(self.external_audio_path))
-            src = self.external_audio_path if use_external else self.video_path
+            spd = self._audio_speed()
+            src = self._audio_source()
             cmd = ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'error', '-ss', f'{start_time:.3f}', '-i', src, '-volume', str(vol), '-af', f'atempo={spd}']
             if platform.system() == 'Windows':
                 creationflags = getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
@@ -2418,6 +2299,8 @@ class VideoEditorApp:
             self.audio_proc = None
     
     def stop_audio_playback(self):
+        if self.audio_engine is not None:
+            self.audio_engine.pause()
         if self.audio_proc is not None:
             try:
                 if platform.system() == 'Windows':
@@ -2654,11 +2537,14 @@ class VideoEditorApp:
         
         if hasattr(self, 'ele_profile_rect_rel'):
              config['ele_profile_rect_rel'] = self.ele_profile_rect_rel
+
+        config['grade_window_m'] = self.grade_window_m
+        config['elevation_source'] = self.elevation_source
         
         # Save HUD panels config
         config['hud_panels'] = {}
         for name, panel in self.hud_panels.items():
-            config['hud_panels'][name] = panel.config
+            config['hud_panels'][name] = panel.saved_config()
              
         try:
             config_path = os.path.join(os.getcwd(), 'hud_config.json')
@@ -2682,6 +2568,13 @@ class VideoEditorApp:
                 
             if 'ele_profile_rect_rel' in config:
                 self.ele_profile_rect_rel = config['ele_profile_rect_rel']
+
+            if 'grade_window_m' in config:
+                self.grade_window_m = float(config['grade_window_m'])
+
+            if config.get('elevation_source') in ('gps', 'dem'):
+                self.elevation_source = config['elevation_source']
+                self.elevation_source_var.set(self.elevation_source)
             
             if 'hud_panels' in config:
                 for name, panel_config in config['hud_panels'].items():
@@ -2754,7 +2647,7 @@ class VideoEditorApp:
             return
             
         # 1. 检查高程HUD (绘制在最上层，优先检查)
-        ele_visible = self.hud_panels.get('elevation').config.get('visible', True)
+        ele_visible = self.hud_panels['elevation'].visible
         ex, ey, ew, eh = self._get_ele_profile_rect_px(fw, fh)
         if ele_visible and ex <= mx <= ex+ew and ey <= my <= ey+eh:
             # 检查右下角缩放区域
@@ -2766,7 +2659,7 @@ class VideoEditorApp:
             return
 
         # 2. 检查遥测面板
-        telemetry_visible = self.hud_panels.get('telemetry').config.get('visible', True)
+        telemetry_visible = self.hud_panels['telemetry'].visible
         px, py, pw, ph = self._get_telemetry_rect_px(fw, fh)
         if telemetry_visible and px <= mx <= px+pw and py <= my <= py+ph:
             if (px+pw - mx) <= self.telemetry_resize_margin and (py+ph - my) <= self.telemetry_resize_margin:
@@ -2777,7 +2670,7 @@ class VideoEditorApp:
             return
 
         # 3. Check Speedometer Panel
-        speedometer_visible = self.hud_panels.get('speedometer').config.get('visible', True)
+        speedometer_visible = self.hud_panels['speedometer'].visible
         sx, sy, sw, sh = self._get_speedometer_rect_px(fw, fh)
         if speedometer_visible and sx <= mx <= sx+sw and sy <= my <= sy+sh:
             if (sx+sw - mx) <= self.telemetry_resize_margin and (sy+sh - my) <= self.telemetry_resize_margin:
@@ -2867,74 +2760,50 @@ class VideoEditorApp:
         if not self.gpx_data:
             return
 
-        target_time = current_seconds + self.gpx_offset
-        sample = self._sample_gpx_segment(target_time)
-        if sample is None:
-            speed, hr, lat, lon = 0.0, 0, None, None
-            ele, grade = None, None
-        else:
-            speed = sample['speed']
-            hr = sample['hr']
-            lat = sample['lat']
-            lon = sample['lon']
-            ele = sample['ele']
-            grade = sample['grade']
-            # self.debug_info['target_time'] = target_time
-            # self.debug_info['offset'] = self.gpx_offset
-            # self.debug_info['seg_idx'] = sample['idx']
-            # self.debug_info['seg_start'] = sample['seg']['start']
-            # self.debug_info['seg_end'] = sample['seg']['end']
-            # self.debug_info['ratio'] = sample['ratio']
-            # self.debug_info['lat'] = lat
-            # self.debug_info['lon'] = lon
         h, w = frame.shape[:2]
-        
-        # --- 1. Draw Track Panel ---
-        # Get smoothed state
-        smooth_state = self._get_smoothed_state(current_seconds + self.gpx_offset)
-        
-        track_context = {
-            'gpx_data': self.gpx_data,
-            'current_seconds': current_seconds,
-            'gpx_offset': self.gpx_offset,
-            'smooth_lats': getattr(self, 'smooth_lats', None),
-            'smooth_lons': getattr(self, 'smooth_lons', None),
-            'last_idx': getattr(self, '_last_idx', 0),
-            'current_state': smooth_state,
-            # Pass rect if configured? For now using default dynamic logic in TrackPanel unless overridden
-        }
-        self.hud_panels['track'].draw(frame, track_context)
-
-        # --- 2. Draw Telemetry Panel ---
-        telemetry_rect = self._get_telemetry_rect_px(w, h)
-        
-        telemetry_context = {
-            'rect': telemetry_rect,
-            'current_seconds': current_seconds,
-            'speed': speed,
-            'ele': ele,
-            'grade': grade
-        }
-        self.hud_panels['telemetry'].draw(frame, telemetry_context)
+        target_time = current_seconds + self.gpx_offset
 
-        speedometer_context = {
-            'current_seconds': current_seconds,
-            'speed': speed,
-            'rect': self._get_speedometer_rect_px(w, h)
-        }
-        self.hud_panels['speedometer'].draw(frame, speedometer_context)
-            
-        # --- 3. Draw Elevation Panel ---
-        ele_rect = self._get_ele_profile_rect_px(w, h)
-        ele_context = {
-            'rect': ele_rect,
-            'current_seconds': current_seconds,
-            'gpx_data': self.gpx_data,
-            'video_duration': self.video_info.get('duration', 0),
-            'gpx_offset': self.gpx_offset,
-            'ele': ele
-        }
-        self.hud_panels['elevation'].draw(frame, ele_context)
+        # 按绘制顺序排列的面板及其区域 (track 使用面板自身的默认布局)
+        overlay_panels = [
+            ('track', None),
+            ('telemetry', self._get_telemetry_rect_px),
+            ('speedometer', self._get_speedometer_rect_px),
+            ('elevation', self._get_ele_profile_rect_px),
+        ]
+        overlay_panels = [(name, get_rect) for name, get_rect in overlay_panels if self.hud_panels[name].visible]
+
+        if overlay_panels:
+            # 只组装可见面板声明需要的字段 (见 hud.registry.register_panel)；
+            # 有面板未声明需求时 needs 为 None，按需要全部字段处理
+            needs = required_fields(self.hud_panels[name] for name, _ in overlay_panels)
+            ctx = self._overlay_context
+            ctx.clear()
+            ctx['current_seconds'] = current_seconds
+            ctx['gpx_data'] = self.gpx_data
+            ctx['gpx_offset'] = self.gpx_offset
+            if needs is None or 'video_duration' in needs:
+                ctx['video_duration'] = self.video_info.get('duration', 0)
+
+            if needs is None or not needs.isdisjoint(('speed', 'ele', 'grade')):
+                sample = self._sample_gpx_segment(target_time)
+                if sample is None:
+                    ctx['speed'], ctx['ele'], ctx['grade'] = 0.0, None, None
+                else:
+                    ctx['speed'], ctx['ele'], ctx['grade'] = sample['speed'], sample['ele'], sample['grade']
+
+            if needs is None or not needs.isdisjoint(('current_state', 'last_idx', 'smooth_lats', 'smooth_lons')):
+                # _get_smoothed_state 会更新 _last_idx，须先于读取 last_idx
+                ctx['current_state'] = self._get_smoothed_state(target_time)
+                ctx['smooth_lats'] = getattr(self, 'smooth_lats', None)
+                ctx['smooth_lons'] = getattr(self, 'smooth_lons', None)
+                ctx['last_idx'] = getattr(self, '_last_idx', 0)
+
+            for name, get_rect in overlay_panels:
+                if get_rect is None:
+                    ctx.pop('rect', None)
+                else:
+                    ctx['rect'] = get_rect(w, h)
+                self.hud_panels[name].draw(frame, ctx)
 
         should_draw_debug = self.debug_overlay_enabled and (
             (not self.playing) or (time.monotonic() - self._last_debug_overlay_draw_ts >= self.debug_overlay_interval)
@@ -2968,77 +2837,72 @@ class VideoEditorApp:
         if not (isinstance(self.gpx_data, dict) and 'segments' in self.gpx_data):
             return None
         segs = self.gpx_data['segments']
-        if not segs:
+        n = len(segs)
+        if n == 0:
             return None
         cache = self._frame_gpx_cache
         if cache and abs(cache['target_time'] - target_time) < 1e-6:
             return cache
+        # 直接在分段起止时间列上查找 (先试上次的分段及其前后相邻分段)，不为每次比较生成分段字典
+        starts = segs.starts
+        ends = segs.ends
         idx = None
         last_idx = self._last_gpx_seg_idx
-        if 0 <= last_idx < len(segs):
-            s = segs[last_idx]
-            if s['start'] <= target_time <= s['end']:
-                idx = last_idx
-            elif last_idx + 1 < len(segs):
-                s_next = segs[last_idx + 1]
-                if s_next['start'] <= target_time <= s_next['end']:
-                    idx = last_idx + 1
-            if idx is None and last_idx - 1 >= 0:
-                s_prev = segs[last_idx - 1]
-                if s_prev['start'] <= target_time <= s_prev['end']:
-                    idx = last_idx - 1
+        for i in (last_idx, last_idx + 1, last_idx - 1):
+            if 0 <= i < n and starts[i] <= target_time <= ends[i]:
+                idx = i
+                break
         if idx is None:
-            if target_time <= segs[0]['start']:
+            if target_time <= starts[0]:
                 idx = 0
-            elif target_time >= segs[-1]['end']:
-                idx = len(segs) - 1
+            elif target_time >= ends[n - 1]:
+                idx = n - 1
             else:
-                low, high = 0, len(segs) - 1
-                while low <= high:
-                    mid = (low + high) // 2
-                    s = segs[mid]
-                    if s['start'] <= target_time <= s['end']:
-                        idx = mid
-                        break
-                    if target_time < s['start']:
-                        high = mid - 1
-                    else:
-                        low = mid + 1
-        if idx is None:
-            return None
-        seg = segs[idx]
-        duration = seg['end'] - seg['start']
+                idx = int(np.searchsorted(starts, target_time, side='right')) - 1
+                if target_time > ends[idx]:
+                    # 落在两段之间的空档
+                    return None
+        # 从点列插值 (k 为分段起点在点列中的下标)
+        k = idx if segs.order is None else int(segs.order[idx])
+        c = segs.columns
+        start = float(starts[idx])
+        end = float(ends[idx])
+        duration = end - start
         ratio = 0.0
         if duration > 0.001:
-            ratio = (target_time - seg['start']) / duration
+            ratio = (target_time - start) / duration
         ratio = max(0.0, min(1.0, ratio))
-        lat = seg['lat_start'] + (seg['lat_end'] - seg['lat_start']) * ratio
-        lon = seg['lon_start'] + (seg['lon_end'] - seg['lon_start']) * ratio
-        ele_s = seg.get('ele_start')
-        ele_e = seg.get('ele_end')
-        ele = None
-        if ele_s is not None and ele_e is not None:
-            ele = ele_s + (ele_e - ele_s) * ratio
+        lat_s, lat_e = float(c['lat'][k]), float(c['lat'][k + 1])
+        lon_s, lon_e = float(c['lon'][k]), float(c['lon'][k + 1])
+        ele_s, ele_e = float(c['ele'][k]), float(c['ele'][k + 1])
+        lat = lat_s + (lat_e - lat_s) * ratio
+        lon = lon_s + (lon_e - lon_s) * ratio
+        ele = ele_s + (ele_e - ele_s) * ratio
         grade = None
-        lat1, lon1 = seg.get('lat_start'), seg.get('lon_start')
-        lat2, lon2 = seg.get('lat_end'), seg.get('lon_end')
-        if None not in (lat1, lon1, lat2, lon2) and ele_s is not None and ele_e is not None:
-            dist = self._haversine_distance(lat1, lon1, lat2, lon2)
-            if dist > 1:
-                grade = (ele_e - ele_s) / dist * 100.0
+        distance = None
+        arrays = self.gpx_data.get('arrays')
+        if arrays is not None:
+            # 坡度与累计距离已在加载时按点计算，这里只在分段两端之间插值
+            cum_dist = arrays['cum_dist']
+            smooth_grade = arrays['smooth_grade']
+            distance = float(cum_dist[idx] + (cum_dist[idx + 1] - cum_dist[idx]) * ratio)
+            if arrays['grade_window_m'] > 0:
+                grade = float(smooth_grade[idx] + (smooth_grade[idx + 1] - smooth_grade[idx]) * ratio)
             else:
-                grade = 0.0
+                grade = float(arrays['grade'][idx])
         sample = {
             'target_time': target_time,
             'idx': idx,
-            'seg': seg,
+            'start': start,
+            'end': end,
             'ratio': ratio,
             'lat': lat,
             'lon': lon,
-            'speed': seg['speed'],
-            'hr': seg.get('hr', 0),
+            'speed': float(segs.speeds[k]),
+            'hr': int(c['hr'][k]),
             'ele': ele,
-            'grade': grade
+            'grade': grade,
+            'distance': distance
         }
         self._last_gpx_seg_idx = idx
         self._frame_gpx_cache = sample
@@ -3258,8 +3122,12 @@ class VideoEditorApp:
             self.mute_btn.config(text="🔊")
             self.is_muted = False
         if self.playing:
-            self.stop_audio_playback()
-            self.start_audio_playback(self._current_time())
+            if self.audio_engine is not None and self.audio_engine.playing:
+                # 引擎播放中直接调节增益，无需重启
+                self.audio_engine.set_volume(self.volume)
+            else:
+                self.stop_audio_playback()
+                self.start_audio_playback(self._current_time())
     
     def on_speed_change(self, event):
         """播放速度改变"""
@@ -3267,8 +3135,12 @@ class VideoEditorApp:
         self.playback_speed = float(speed_str.replace('x', ''))
         self.update_status(f"播放速度: {speed_str}")
         if self.playing:
-            self.stop_audio_playback()
-            self.start_audio_playback(self._current_time())
+            if self.audio_engine is not None and self.audio_engine.playing:
+                self.audio_engine.seek(self._current_time())
+                self.audio_engine.set_speed(self._audio_speed())
+            else:
+                self.stop_audio_playback()
+                self.start_audio_playback(self._current_time())
     
     def toggle_loop(self):
         """切换循环播放"""
@@ -3307,28 +3179,17 @@ class VideoEditorApp:
         current_frame = self.current_frame_pos
         
         # 查找当前时间点所在的片段
-        target_clip = None
-        target_index = -1
-        
-        for i, clip in enumerate(self.clips):
-            if clip['start_frame'] < current_frame < clip['end_frame']:
-                target_clip = clip
-                target_index = i
-                break
-        
-        if target_clip:
-            # 创建新片段
-            new_clip = target_clip.copy()
-            new_clip['id'] = f"clip_{len(self.clips)}"
+        target_index = self.edit_list.clip_at_source_frame(current_frame)
+        if target_index >= 0 and self.clips[target_index]['start_frame'] == current_frame:
+            target_index = -1
+        
+        if target_index >= 0:
+            # 创建新片段 (后半段)，并在索引中增量分割
+            new_clip = self.clips[target_index].copy()
+            new_clip['id'] = f"clip_{self.next_clip_id}"
             new_clip['name'] = f"片段_{len(self.clips) + 1}"
-            new_clip['start_frame'] = current_frame
-            new_clip['end_frame'] = target_clip['end_frame']
-            
-            # 修改原片段
-            target_clip['end_frame'] = current_frame
-            
-            # 插入新片段
-            self.clips.insert(target_index + 1, new_clip)
+            self.next_clip_id += 1
+            self.edit_list.split(target_index, current_frame, new_clip)
             
             # 更新列表
             self.update_clip_list()
@@ -3392,7 +3253,7 @@ class VideoEditorApp:
     
     def draw_timeline_ruler(self, duration):
         """绘制时间标尺"""
-        self.ruler_canvas.delete("all")
+        self.timeline_duration = duration
         
         # 计算总宽度
         total_width = duration * self.timeline_scale
@@ -3402,6 +3263,13 @@ class VideoEditorApp:
         # 更新滚动区域
         self.ruler_canvas.config(scrollregion=(0, 0, total_width, 25))
         self.timeline_canvas.config(scrollregion=(0, 0, total_width, 150))
+        self._draw_timeline_ruler_ticks()
+
+    def _draw_timeline_ruler_ticks(self):
+        """只绘制可见范围内的刻度"""
+        self.ruler_canvas.delete("tick")
+        if self.timeline_scale <= 0:
+            return
         
         # 绘制刻度
         # 根据缩放比例决定刻度间隔
@@ -3414,77 +3282,175 @@ class VideoEditorApp:
         else: # 每1秒
             step = 1
             
-        for second in range(0, int(duration) + 1, step):
+        p0, p1 = self._timeline_visible_range()
+        first = max(0, int(p0) // step * step)
+        last = min(int(self.timeline_duration), int(p1))
+        for second in range(first, last + 1, step):
             x = second * self.timeline_scale
-            self.ruler_canvas.create_line(x, 0, x, 25, fill="#666666", width=1)
+            self.ruler_canvas.create_line(x, 0, x, 25, fill="#666666", width=1, tags="tick")
             self.ruler_canvas.create_text(x + 2, 12, text=self.format_time(second),
-                                         anchor=tk.W, font=("Arial", 8))
+                                         anchor=tk.W, font=("Arial", 8), tags="tick")
     
     def draw_timeline_tracks(self):
-        """绘制时间轴轨道 (重排后：紧凑模式)"""
-        self.timeline_canvas.delete("all")
-        
+        """绘制时间轴轨道 (紧凑模式；画布项持久保留，只创建/移动可见范围内的项)"""
+        canvas = self.timeline_canvas
         if not self.video_info:
+            canvas.delete("thumb", "clip", "clip_label")
+            self.timeline_thumb_items = {}
+            self.timeline_clip_items = {}
             return
             
-        # 绘制剪辑片段
-        fps = self.video_info.get('fps', 30.0)
         track_height = 40
         track_y = 10
-        
-        # 1. 绘制缩略图背景 (只绘制存在于片段中的缩略图，并按紧凑模式排列)
-        has_thumbs = hasattr(self, 'timeline_thumbnails') and self.timeline_thumbnails
-        if has_thumbs:
-            # 预先计算所有有效的时间段及其在项目时间轴上的映射
-            # (source_start, source_end, project_start)
-            clip_mappings = []
-            curr_project_start = 0.0
-            for clip in self.clips:
-                duration = (clip['end_frame'] - clip['start_frame']) / fps
-                clip_mappings.append({
-                    's_start': clip['start_frame'] / fps,
-                    's_end': clip['end_frame'] / fps,
-                    'p_start': curr_project_start
-                })
-                curr_project_start += duration
-            
-            # 遍历所有缩略图
-            for t_sec, photo in self.timeline_thumbnails.items():
-                # 检查该缩略图时间是否在任何片段范围内，如果是，计算其项目时间
-                for mapping in clip_mappings:
-                    if mapping['s_start'] <= t_sec <= mapping['s_end']:
-                        p_t_sec = mapping['p_start'] + (t_sec - mapping['s_start'])
-                        x = p_t_sec * self.timeline_scale
-                        self.timeline_canvas.create_image(x, track_y + track_height/2, image=photo, anchor=tk.W)
-                        break
-        
-        curr_p_start = 0.0
-        for i, clip in enumerate(self.clips):
-            duration = (clip['end_frame'] - clip['start_frame']) / fps
-            
-            x1 = curr_p_start * self.timeline_scale
-            x2 = (curr_p_start + duration) * self.timeline_scale
+        fps = self.video_info.get('fps', 30.0)
+        offsets = self.edit_list.offsets
+        p0, p1 = self._timeline_visible_range()
+        
+        # 1. 绘制缩略图背景 (按当前缩放选择层级，只绘制可见范围内的缩略图，并按紧凑模式排列)
+        interval, slots = self._visible_thumbnail_slots(p0, p1)
+        has_thumbs = bool(self.timeline_thumbnails)
+        drawn = set()
+        thumb_items = {}
+        for t_sec, p_t_sec in slots:
+            key = time_key(t_sec)
+            photo = self.timeline_thumbnails.get(key)
+            if photo is None:
+                continue
+            self.timeline_thumbnails.move_to_end(key)
+            drawn.add(key)
+            x = p_t_sec * self.timeline_scale
+            slot = (key, time_key(p_t_sec))
+            item = self.timeline_thumb_items.pop(slot, None)
+            if item is None:
+                item = canvas.create_image(x, track_y + track_height/2, image=photo, anchor=tk.W, tags="thumb")
+            else:
+                canvas.coords(item, x, track_y + track_height/2)
+                canvas.itemconfig(item, image=photo)
+            thumb_items[slot] = item
+        # 移出可见范围的缩略图项直接删除，画布项数量只与可见范围有关
+        for item in self.timeline_thumb_items.values():
+            canvas.delete(item)
+        self.timeline_thumb_items = thumb_items
+        self._trim_timeline_thumbnails(drawn)
+        self.request_visible_thumbnails(interval, slots)
+        
+        # 2. 绘制可见范围内的剪辑片段 (按项目起点二分查找第一个可见片段)
+        clip_items = {}
+        first = max(0, self.edit_list.clip_at_project_frame(p0 * fps))
+        for i in range(first, len(self.clips)):
+            if offsets[i] / fps > p1:
+                break
+            if offsets[i + 1] / fps < p0:
+                continue
+            clip = self.clips[i]
+            x1 = offsets[i] / fps * self.timeline_scale
+            x2 = offsets[i + 1] / fps * self.timeline_scale
             
-            # 绘制片段矩形
+            # 片段矩形
             if has_thumbs:
-                self.timeline_canvas.create_rectangle(x1, track_y, x2, track_y + track_height,
-                                                     fill="", outline="#4a90e2", width=2, tags=("clip", clip['id']))
+                style = dict(fill="", outline="#4a90e2", width=2)
             else:
-                color = "#4a90e2" if i % 2 == 0 else "#357abd"
-                self.timeline_canvas.create_rectangle(x1, track_y, x2, track_y + track_height,
-                                                     fill=color, outline="white", tags=("clip", clip['id']))
-            
-            # 绘制片段名称
-            if x2 - x1 > 20:
-                self.timeline_canvas.create_text(x1 + 6, track_y + track_height/2 + 1,
-                                                text=clip['name'], anchor=tk.W, fill="black",
-                                                font=("Arial", 9))
-                self.timeline_canvas.create_text(x1 + 5, track_y + track_height/2,
-                                                text=clip['name'], anchor=tk.W, fill="white",
-                                                font=("Arial", 9))
-            
-            curr_p_start += duration
-    
+                style = dict(fill="#4a90e2" if i % 2 == 0 else "#357abd", outline="white", width=1)
+            # 片段名称 (太窄时隐藏)
+            label_state = tk.NORMAL if x2 - x1 > 20 else tk.HIDDEN
+            
+            ids = self.timeline_clip_items.pop(clip['id'], None)
+            if ids is None:
+                rect = canvas.create_rectangle(x1, track_y, x2, track_y + track_height,
+                                               tags=("clip", clip['id']), **style)
+                shadow = canvas.create_text(x1 + 6, track_y + track_height/2 + 1, anchor=tk.W,
+                                            fill="black", font=("Arial", 9), tags="clip_label")
+                label = canvas.create_text(x1 + 5, track_y + track_height/2, anchor=tk.W,
+                                           fill="white", font=("Arial", 9), tags="clip_label")
+            else:
+                rect, shadow, label = ids
+                canvas.coords(rect, x1, track_y, x2, track_y + track_height)
+                canvas.itemconfig(rect, **style)
+                canvas.coords(shadow, x1 + 6, track_y + track_height/2 + 1)
+                canvas.coords(label, x1 + 5, track_y + track_height/2)
+            canvas.itemconfig(shadow, text=clip['name'], state=label_state)
+            canvas.itemconfig(label, text=clip['name'], state=label_state)
+            clip_items[clip['id']] = (rect, shadow, label)
+        for ids in self.timeline_clip_items.values():
+            canvas.delete(*ids)
+        self.timeline_clip_items = clip_items
+        
+        # 层次：缩略图 < 片段 < 名称 < 播放头
+        canvas.tag_raise("clip")
+        canvas.tag_raise("clip_label")
+        canvas.tag_raise("playhead")
+    
+    def schedule_timeline_tracks_redraw(self):
+        """滚动时合并重绘请求 (可见范围变化后重新绘制并请求缩略图)"""
+        if self._tracks_redraw_job:
+            return
+        def redraw():
+            self._tracks_redraw_job = None
+            self._draw_timeline_ruler_ticks()
+            self.draw_timeline_tracks()
+        self._tracks_redraw_job = self.root.after(50, redraw)
+
+    def _timeline_visible_range(self):
+        """时间轴可见的项目时间范围 (左右各预取半屏)"""
+        if self.timeline_scale <= 0:
+            return 0.0, 0.0
+        view_w = self.timeline_canvas.winfo_width()
+        if view_w <= 1:
+            view_w = 1200
+        x0 = self.timeline_canvas.canvasx(0)
+        return (x0 - view_w / 2) / self.timeline_scale, (x0 + view_w * 1.5) / self.timeline_scale
+
+    def _visible_thumbnail_slots(self, p0, p1):
+        """计算当前缩放下的缩略图层级及 [p0, p1] 内的 (源时间, 项目时间) 列表"""
+        if not self.video_info or self.timeline_scale <= 0:
+            return None, []
+        fps = self.video_info.get('fps', 30.0)
+        thumb_w = thumbnail_size(self.video_info.get('width', 0), self.video_info.get('height', 0))[0]
+        interval = pick_level(self.timeline_scale, thumb_w)
+        # 缩略图从取样点向右延伸，左侧多留一张的宽度
+        p0 -= thumb_w / self.timeline_scale
+
+        slots = []
+        offsets = self.edit_list.offsets
+        first = max(0, self.edit_list.clip_at_project_frame(p0 * fps))
+        for i in range(first, len(self.clips)):
+            p_start = offsets[i] / fps
+            if p_start > p1:
+                break
+            duration = (offsets[i + 1] - offsets[i]) / fps
+            if p_start + duration < p0:
+                continue
+            s_start = self.clips[i]['start_frame'] / fps
+            lo = s_start + max(0.0, p0 - p_start)
+            hi = s_start + min(duration, p1 - p_start)
+            for t in level_times(interval, lo, hi):
+                slots.append((t, p_start + (t - s_start)))
+        return interval, slots
+
+    def _trim_timeline_thumbnails(self, keep):
+        """按 LRU 淘汰多余的 PhotoImage (当前正在显示的不淘汰)"""
+        limit = max(self.timeline_thumb_limit, len(keep))
+        while len(self.timeline_thumbnails) > limit:
+            key = next(iter(self.timeline_thumbnails))
+            if key in keep:
+                self.timeline_thumbnails.move_to_end(key)
+                continue
+            del self.timeline_thumbnails[key]
+
+    def request_visible_thumbnails(self, interval, slots):
+        """将可见范围内缺失的缩略图交给工作线程 (与上次请求相同或为其子集时跳过)"""
+        if self.thumbnail_requests is None or not slots:
+            return
+        needed = sorted({t for t, _ in slots if time_key(t) not in self.timeline_thumbnails})
+        if not needed:
+            return
+        keys = {time_key(t) for t in needed}
+        last = self.thumbnail_last_request
+        if last and last[0] == interval and keys <= last[1]:
+            return
+        self.thumbnail_last_request = (interval, keys)
+        self.thumbnail_requests.put((interval, needed))
+
     def draw_playhead(self, current_time):
         """绘制播放头"""
         self.timeline_canvas.delete("playhead")
@@ -3617,103 +3583,105 @@ class VideoEditorApp:
                 self.update_timeline()
 
     def start_timeline_thumbnail_generation(self):
-        """开始生成时间轴缩略图"""
+        """开始生成时间轴缩略图 (按需：只生成当前缩放层级下可见范围内的缩略图)"""
         if not HAS_CV2 or not HAS_PIL:
             return
             
-        # 停止之前的线程（如果可能）
-        # Python线程难以强制停止，这里我们通过检查 video_path 是否一致来控制退出
+        # Python线程难以强制停止：旧线程发现自己的请求队列不再是当前队列时退出
+        # (重新打开同一视频时 video_path 不变，不能以它作为退出条件)
+        previous = self.thumbnail_thread
         
-        self.timeline_thumbnails = {}
+        self.timeline_thumbnails = OrderedDict()
+        self.thumbnail_requests = queue.Queue()
+        self.thumbnail_last_request = None
         
         # 启动新线程
         self.thumbnail_thread = threading.Thread(
             target=self._generate_timeline_thumbnails_worker,
-            args=(self.video_path,),
+            args=(self.video_path, self.thumbnail_requests, previous),
             daemon=True
         )
         self.thumbnail_thread.start()
+        self.draw_timeline_tracks()
         
-    def _generate_timeline_thumbnails_worker(self, current_video_path):
-        """生成时间轴缩略图的工作线程"""
+    def _generate_timeline_thumbnails_worker(self, current_video_path, requests, previous=None):
+        """生成时间轴缩略图的工作线程 (处理可见范围请求；优先读取磁盘缓存，只解码缺失的时间点)"""
+        cache = None
         try:
-            cap = cv2.VideoCapture(current_video_path)
-            if not cap.isOpened():
-                return
-                
-            duration = self.video_info.get('duration', 0)
-            if duration <= 0:
-                return
-
-            # 根据时长决定采样间隔
-            # 目标是生成适量的缩略图，既不影响性能又能覆盖全长
-            # 例如每隔一定像素生成一个缩略图
-            # 假设缩略图宽度为 60px
-            # 但我们在后台生成，不知道当前的 timeline_scale
-            # 所以我们可以固定生成一定数量，或者按时间间隔
-            
-            # 策略：每隔 5-30 秒生成一张，取决于总时长
-            # 如果视频短于 1 分钟，每 1 秒一张
-            # 如果视频长于 1 小时，每 30 秒一张
-            
-            if duration < 60:
-                interval = 1.0
-            elif duration < 600: # 10分钟
-                interval = 5.0
-            elif duration < 3600: # 1小时
-                interval = 10.0
-            else:
-                interval = 30.0
-            
+            # 等旧线程退出并落盘，避免两个线程写同一张精灵图、也能读到它刚保存的缩略图
+            if previous is not None:
+                previous.join()
+            cache = ThumbnailCache(current_video_path)
+            cache.load()
             fps = self.video_info.get('fps', 30.0)
-            current_time = 0.0
-            
-            count = 0
-            batch_size = 5 # 每生成5张刷新一次界面
-            
-            while current_time < duration:
-                # 检查是否切换了视频
-                if self.video_path != current_video_path:
-                    break
-                    
-                frame_pos = int(current_time * fps)
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_pos)
-                ret, frame = cap.read()
-                
-                if ret:
-                    # 调整大小
-                    h, w = frame.shape[:2]
-                    target_h = 40 # 轨道高度
-                    target_w = int(w * (target_h / h))
-                    
-                    frame_resized = cv2.resize(frame, (target_w, target_h))
-                    
-                    # 转换为 RGB
-                    frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-                    image = Image.fromarray(frame_rgb)
-                    photo = ImageTk.PhotoImage(image)
-                    
-                    # 存储 (需要在主线程使用，但 ImageTk 对象必须在创建它的线程使用? 不，Tkinter对象通常线程不安全)
-                    # ImageTk.PhotoImage 可以在任何线程创建吗？
-                    # 文档建议在主线程创建 Tkinter 对象。
-                    # 但 Image 对象可以在线程中创建。
-                    # 我们可以只存储 Image 对象，在主线程转换为 PhotoImage。
-                    # 或者使用 after 将创建操作调度到主线程。
-                    
-                    # 为了安全，我们将 Image 对象传给主线程
-                    count += 1
-                    should_refresh = (count % batch_size == 0)
-                    self.root.after(0, self._add_thumbnail_to_timeline, current_time, image, should_refresh)
-                
-                current_time += interval
-                time.sleep(0.01) # 避免占用过多CPU
-                
-            cap.release()
-            # 最后确保刷新一次
-            self.root.after(0, lambda: self.draw_timeline_tracks())
-            
+            frame_size = (self.video_info.get('width', 0), self.video_info.get('height', 0))
+            use_ffmpeg = has_ffmpeg()
+
+            while self.thumbnail_requests is requests:
+                try:
+                    interval, times = requests.get(timeout=2.0)
+                except queue.Empty:
+                    # 空闲时把新生成的缩略图落盘
+                    cache.save()
+                    continue
+                # 只处理最新的请求 (滚动/缩放后旧的可见范围已过期)
+                while True:
+                    try:
+                        interval, times = requests.get_nowait()
+                    except queue.Empty:
+                        break
+
+                # 1. 磁盘缓存命中的缩略图一次性交给主线程
+                cached = []
+                for t in times:
+                    frame_small = cache.get(t)
+                    if frame_small is not None:
+                        cached.append((t, Image.fromarray(cv2.cvtColor(frame_small, cv2.COLOR_BGR2RGB))))
+                if cached:
+                    self.root.after(0, self._add_thumbnails_to_timeline, cached)
+
+                # 2. 只为缺失的时间点解码：每段连续时间点用 ffmpeg 顺序解码一次，无 ffmpeg 时回退到逐点跳转
+                batch = []
+                batch_size = 5 # 每生成5张刷新一次界面
+                for run in contiguous_runs(cache.missing(times), interval):
+                    if use_ffmpeg:
+                        source = iter_thumbnails_ffmpeg(
+                            current_video_path, frame_size, interval,
+                            start=run[0], end=run[-1] + interval * 0.5,
+                            # 间隔较大时只解码关键帧即可，精度在一个 GOP 内
+                            keyframes_only=interval >= 5.0
+                        )
+                    else:
+                        source = iter_thumbnails_cv2(current_video_path, run, fps)
+                    try:
+                        for t, frame_small in source:
+                            # 切换了视频或有新的可见范围请求时中止
+                            if self.thumbnail_requests is not requests or not requests.empty():
+                                break
+                            cache.put(t, frame_small)
+                            # Tk 对象只能在主线程创建，这里只生成 PIL Image
+                            batch.append((t, Image.fromarray(cv2.cvtColor(frame_small, cv2.COLOR_BGR2RGB))))
+                            if len(batch) >= batch_size:
+                                self.root.after(0, self._add_thumbnails_to_timeline, batch)
+                                batch = []
+                    finally:
+                        source.close()
+                    if self.thumbnail_requests is not requests or not requests.empty():
+                        break
+                if batch:
+                    self.root.after(0, self._add_thumbnails_to_timeline, batch)
+
         except Exception as e:
             print(f"生成缩略图出错: {e}")
+        finally:
+            if cache is not None:
+                cache.save()
+
+    def _add_thumbnails_to_timeline(self, items):
+        """在主线程批量添加缩略图并刷新一次"""
+        for time_sec, pil_image in items:
+            self._add_thumbnail_to_timeline(time_sec, pil_image, refresh=False)
+        self.draw_timeline_tracks()
 
     def _add_thumbnail_to_timeline(self, time_sec, pil_image, refresh=True):
         """在主线程添加缩略图并刷新"""
@@ -3722,12 +3690,7 @@ class VideoEditorApp:
             
         try:
             photo = ImageTk.PhotoImage(pil_image)
-            self.timeline_thumbnails[time_sec] = photo
-            
-            # 刷新显示
-            # 不要在每次添加都完全重绘，可以分批或者直接绘制这个
-            # 但为了简单，我们调用 draw_timeline_tracks
-            # 为了避免过于频繁，可以检查是否需要重绘
+            self.timeline_thumbnails[time_key(time_sec)] = photo
             if refresh:
                 self.draw_timeline_tracks()
         except Exception as e:
@@ -3965,6 +3928,9 @@ class VideoEditorApp:
         # 停止播放
         self.playing = False
         self.stop_audio_playback()
+        if self.audio_engine is not None:
+            self.audio_engine.close()
+            self.audio_engine = None
         
         # 等待播放线程结束
         if self.play_thread is not None and self.play_thread.is_alive():